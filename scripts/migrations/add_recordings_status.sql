@@ -0,0 +1,5 @@
+-- Processing status of a recording, written by nodus-adk-runtime
+-- (pending -> transcribing -> processing -> done | error).
+-- Apply with the recordings schema migrations before deploying the runtime
+-- version that reports GET /api/recordings/{id}; idempotent.
+ALTER TABLE recordings ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'done';
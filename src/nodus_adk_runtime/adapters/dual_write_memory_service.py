@@ -66,7 +66,7 @@ class DualWriteMemoryService(BaseMemoryService):
         # Initialize LiteLLM client for embeddings
         self.llm_client = AsyncOpenAI(
             api_key=settings.litellm_proxy_api_key,
-            base_url=f"{settings.litellm_proxy_api_base}/v1",
+            base_url=f"{settings.litellm_base_normalized}/v1",
         )
         
         # Queue for batching Qdrant writes
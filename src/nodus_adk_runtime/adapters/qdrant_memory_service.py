@@ -64,12 +64,12 @@ class QdrantMemoryService(BaseMemoryService):
         if self.openai_api_key:
             self.openai_client = OpenAI(
                 api_key=self.openai_api_key,
-                base_url=settings.litellm_proxy_api_base + "/v1",
+                base_url=settings.litellm_base_normalized + "/v1",
             )
             self.use_real_embeddings = True
             logger.info(
                 "OpenAI embeddings enabled via LiteLLM proxy",
-                base_url=settings.litellm_proxy_api_base,
+                base_url=settings.litellm_base_normalized,
             )
         else:
             self.openai_client = None
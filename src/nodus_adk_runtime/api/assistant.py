@@ -4,15 +4,15 @@ Assistant API Routes
 Endpoints for managing assistant sessions and messages.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from typing import Optional, Dict, Any
 import structlog
 import uuid
 
-from .schemas import SessionCreateRequest, MessageRequest, SessionResponse
+from .schemas import SessionCreateRequest, MessageRequest, SessionResponse, SESSION_RESPONSE_ADAPTER
 from ..middleware.auth import get_current_user, UserContext
 from ..config import settings
-from ..langfuse_tracer import start_trace, end_trace
+from ..langfuse_tracer import langfuse_trace
 
 logger = structlog.get_logger()
 
@@ -153,6 +153,18 @@ async def _build_agent_for_user(user_ctx: UserContext) -> tuple[Any, Any]:
     return agent, memory_service
 
 
+def _json_response(model: SessionResponse) -> Response:
+    """
+    Serialize a response model with pydantic-core.
+    
+    Returning a Response directly skips FastAPI's second validation pass over the
+    response_model and its jsonable_encoder + json.dumps round-trip; response_model
+    is still declared on the routes for the OpenAPI schema. The module-level adapter
+    writes bytes, so the body is not re-encoded from str.
+    """
+    return Response(content=SESSION_RESPONSE_ADAPTER.dump_json(model), media_type="application/json")
+
+
 @router.post("/sessions", response_model=SessionResponse)
 async def create_session(
     request: SessionCreateRequest,
@@ -164,15 +176,6 @@ async def create_session(
     If conversation_id is provided, reuses that conversation.
     Otherwise, creates a new session.
     """
-    # Start Langfuse trace
-    session_id_for_trace = request.conversation_id or f"session_{user_ctx.sub}"
-    trace = start_trace(
-        "create_session",
-        user_ctx=user_ctx,
-        session_id=session_id_for_trace,
-        input_data={"message": request.message[:100] if request.message else None}
-    )
-    
     logger.info(
         "Creating session",
         user_id=user_ctx.sub,
@@ -181,465 +184,467 @@ async def create_session(
     )
     
     try:
-        # Build agent for user
-        agent, memory_service = await _build_agent_for_user(user_ctx)
+        with langfuse_trace(
+            "create_session",
+            user_ctx=user_ctx,
+            session_id=request.conversation_id or f"session_{user_ctx.sub}",
+            input_data={"message": request.message[:100] if request.message else None},
+        ):
+            # Build agent for user
+            agent, memory_service = await _build_agent_for_user(user_ctx)
         
-        # Create session ID
-        session_id = request.conversation_id or f"session_{user_ctx.sub}_{uuid.uuid4().hex[:8]}"
-        conversation_id = request.conversation_id or session_id
+            # Create session ID
+            session_id = request.conversation_id or f"session_{user_ctx.sub}_{uuid.uuid4().hex[:8]}"
+            conversation_id = request.conversation_id or session_id
         
-        # Run agent with user message
-        from google.adk.runners import Runner
-        from google.adk.apps.app import App, ResumabilityConfig
-        from google.genai import types
+            # Run agent with user message
+            from google.adk.runners import Runner
+            from google.adk.apps.app import App, ResumabilityConfig
+            from google.genai import types
         
-        # 🔥 FIX: Use shared persistent session service to maintain conversation context
-        session_service = get_session_service()
+            # 🔥 FIX: Use shared persistent session service to maintain conversation context
+            session_service = get_session_service()
         
-        # Enable ADK resumability for HITL support (allows pause/resume on long-running tools)
-        resumability_config = ResumabilityConfig(is_resumable=True)
+            # Enable ADK resumability for HITL support (allows pause/resume on long-running tools)
+            resumability_config = ResumabilityConfig(is_resumable=True)
         
-        # Create App instance with resumability config (required for Runner)
-        app = App(
-            name="personal_assistant",
-            root_agent=agent,
-            resumability_config=resumability_config,
-        )
+            # Create App instance with resumability config (required for Runner)
+            app = App(
+                name="personal_assistant",
+                root_agent=agent,
+                resumability_config=resumability_config,
+            )
         
-        runner = Runner(
-            app=app,
-            session_service=session_service,
-            memory_service=memory_service,
-        )
+            runner = Runner(
+                app=app,
+                session_service=session_service,
+                memory_service=memory_service,
+            )
         
-        # 🔥 FIX: Try to get existing session first, create only if it doesn't exist
-        logger.info("Session lookup", 
-                   requested_session_id=session_id, 
-                   conversation_id=conversation_id,
-                   user_id=user_ctx.sub)
+            # 🔥 FIX: Try to get existing session first, create only if it doesn't exist
+            logger.info("Session lookup", 
+                       requested_session_id=session_id, 
+                       conversation_id=conversation_id,
+                       user_id=user_ctx.sub)
         
-        try:
-            session = await runner.session_service.get_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session_id,
-            )
-            if session:
-                logger.info("✅ Reusing existing session", 
+            try:
+                session = await runner.session_service.get_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session_id,
+                )
+                if session:
+                    logger.info("✅ Reusing existing session", 
+                               requested_session_id=session_id,
+                               actual_session_id=session.id,
+                               user_id=user_ctx.sub)
+                else:
+                    raise ValueError("Session not found")
+            except Exception as e:
+                # Session doesn't exist, create it
+                logger.info("Creating new session", 
+                           requested_session_id=session_id, 
+                           user_id=user_ctx.sub,
+                           error=str(e))
+                session = await runner.session_service.create_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session_id,
+                    state={'tenant_id': user_ctx.tenant_id or 'default'},
+                )
+                logger.info("Session created", 
                            requested_session_id=session_id,
                            actual_session_id=session.id,
-                           user_id=user_ctx.sub)
-            else:
-                raise ValueError("Session not found")
-        except Exception as e:
-            # Session doesn't exist, create it
-            logger.info("Creating new session", 
-                       requested_session_id=session_id, 
-                       user_id=user_ctx.sub,
-                       error=str(e))
-            session = await runner.session_service.create_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session_id,
-                state={'tenant_id': user_ctx.tenant_id or 'default'},
-            )
-            logger.info("Session created", 
-                       requested_session_id=session_id,
-                       actual_session_id=session.id,
-                       match=session.id == session_id)
+                           match=session.id == session_id)
         
-        # Add user message
-        user_content = types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=request.message)],
-        )
+            # Add user message
+            user_content = types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=request.message)],
+            )
         
-        # Run agent and collect response data
-        response_parts = []
-        citations = []
-        tool_calls = []
-        memories = []
-        intent = None
-        structured_data = []
+            # Run agent and collect response data
+            response_parts = []
+            citations = []
+            tool_calls = []
+            memories = []
+            intent = None
+            structured_data = []
         
-        logger.info("🔄 Starting agent run_async", session_id=session.id, message=request.message[:50])
-        event_count = 0
-        last_event = None
-        invocation_id = None  # Will be captured from events
+            logger.info("🔄 Starting agent run_async", session_id=session.id, message=request.message[:50])
+            event_count = 0
+            last_event = None
+            invocation_id = None  # Will be captured from events
         
-        async for event in runner.run_async(
-            user_id=user_ctx.sub,
-            session_id=session.id,
-            new_message=user_content,
-        ):
-            event_count += 1
-            last_event = event  # Keep track of last event for invocation_id
+            async for event in runner.run_async(
+                user_id=user_ctx.sub,
+                session_id=session.id,
+                new_message=user_content,
+            ):
+                event_count += 1
+                last_event = event  # Keep track of last event for invocation_id
             
-            # Capture invocation_id from event (ADK sets this automatically)
-            if hasattr(event, 'invocation_id') and event.invocation_id:
-                invocation_id = event.invocation_id
-                logger.debug("Captured invocation_id from event", invocation_id=invocation_id)
+                # Capture invocation_id from event (ADK sets this automatically)
+                if hasattr(event, 'invocation_id') and event.invocation_id:
+                    invocation_id = event.invocation_id
+                    logger.debug("Captured invocation_id from event", invocation_id=invocation_id)
             
-            # 🔍 DEBUG: Log event details
-            event_type = type(event).__name__
-            logger.info(f"📨 Event #{event_count}", event_type=event_type)
+                # 🔍 DEBUG: Log event details
+                event_type = type(event).__name__
+                logger.info(f"📨 Event #{event_count}", event_type=event_type)
             
-            # Extract text content
-            if hasattr(event, 'content') and event.content:
-                logger.info(f"  📦 Content with {len(event.content.parts)} parts")
-                for idx, part in enumerate(event.content.parts):
-                    part_info = []
-                    if hasattr(part, 'text') and part.text:
-                        part_info.append(f"text({len(part.text)} chars)")
-                    if hasattr(part, 'function_call'):
-                        part_info.append(f"function_call({part.function_call.name})")
-                    if hasattr(part, 'function_response'):
-                        part_info.append(f"function_response({part.function_response.name})")
-                    logger.info(f"    Part {idx}: {', '.join(part_info)}")
+                # Extract text content
+                if hasattr(event, 'content') and event.content:
+                    logger.info(f"  📦 Content with {len(event.content.parts)} parts")
+                    for idx, part in enumerate(event.content.parts):
+                        part_info = []
+                        if hasattr(part, 'text') and part.text:
+                            part_info.append(f"text({len(part.text)} chars)")
+                        if hasattr(part, 'function_call'):
+                            part_info.append(f"function_call({part.function_call.name})")
+                        if hasattr(part, 'function_response'):
+                            part_info.append(f"function_response({part.function_response.name})")
+                        logger.info(f"    Part {idx}: {', '.join(part_info)}")
                 
-                for part in event.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        response_parts.append(part.text)
-                        logger.info(f"  ✅ Added text response", text_preview=part.text[:100])
+                    for part in event.content.parts:
+                        if hasattr(part, 'text') and part.text:
+                            response_parts.append(part.text)
+                            logger.info(f"  ✅ Added text response", text_preview=part.text[:100])
                     
-                    # 🔥 NEW: Check for HITL markers in function responses
-                    if hasattr(part, 'function_response') and part.function_response:
-                        try:
-                            response_data = part.function_response.response
-                            if isinstance(response_data, dict) and response_data.get('_hitl_required'):
-                                # 🔥 CRITICAL: Capture function_call_id for resumability
-                                function_call_id = part.function_response.id
-                                function_name = part.function_response.name
-                                logger.info(
-                                    "HITL marker detected in function response",
-                                    agent=response_data.get('agent'),
-                                    action=response_data.get('action_description'),
-                                    function_call_id=function_call_id,
-                                    function_name=function_name
-                                )
-                                # Store function_call_id in response_data for later use
-                                response_data['_function_call_id'] = function_call_id
-                                response_data['_function_name'] = function_name
-                                tool_calls.append(response_data)
-                        except Exception as e:
-                            logger.debug("Error parsing function_response", error=str(e))
+                        # 🔥 NEW: Check for HITL markers in function responses
+                        if hasattr(part, 'function_response') and part.function_response:
+                            try:
+                                response_data = part.function_response.response
+                                if isinstance(response_data, dict) and response_data.get('_hitl_required'):
+                                    # 🔥 CRITICAL: Capture function_call_id for resumability
+                                    function_call_id = part.function_response.id
+                                    function_name = part.function_response.name
+                                    logger.info(
+                                        "HITL marker detected in function response",
+                                        agent=response_data.get('agent'),
+                                        action=response_data.get('action_description'),
+                                        function_call_id=function_call_id,
+                                        function_name=function_name
+                                    )
+                                    # Store function_call_id in response_data for later use
+                                    response_data['_function_call_id'] = function_call_id
+                                    response_data['_function_name'] = function_name
+                                    tool_calls.append(response_data)
+                            except Exception as e:
+                                logger.debug("Error parsing function_response", error=str(e))
             
-            # Extract tool calls and citations from custom_metadata
-            if hasattr(event, 'custom_metadata') and event.custom_metadata:
-                metadata = event.custom_metadata
+                # Extract tool calls and citations from custom_metadata
+                if hasattr(event, 'custom_metadata') and event.custom_metadata:
+                    metadata = event.custom_metadata
                 
-                # Tool calls
-                if 'tool_calls' in metadata:
-                    tool_calls.extend(metadata['tool_calls'])
+                    # Tool calls
+                    if 'tool_calls' in metadata:
+                        tool_calls.extend(metadata['tool_calls'])
                 
-                # Citations/sources
-                if 'citations' in metadata:
-                    citations.extend(metadata['citations'])
+                    # Citations/sources
+                    if 'citations' in metadata:
+                        citations.extend(metadata['citations'])
                 
-                # Memories
-                if 'memories' in metadata:
-                    memories.extend(metadata['memories'])
+                    # Memories
+                    if 'memories' in metadata:
+                        memories.extend(metadata['memories'])
                 
-                # Intent
-                if 'intent' in metadata:
-                    intent = metadata['intent']
+                    # Intent
+                    if 'intent' in metadata:
+                        intent = metadata['intent']
                 
-                # Structured data from tools
-                if 'structured_data' in metadata:
-                    structured_data.extend(metadata['structured_data'])
+                    # Structured data from tools
+                    if 'structured_data' in metadata:
+                        structured_data.extend(metadata['structured_data'])
         
-        reply = " ".join(response_parts) if response_parts else "I received your message."
+            reply = " ".join(response_parts) if response_parts else "I received your message."
         
-        # 🔥 NEW: After loop ends, check session for ToolConfirmation requests
-        # (ADK may have paused the invocation, so we need to check session events)
-        try:
-            reloaded_session = await session_service.get_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session.id,
-            )
-            if reloaded_session and reloaded_session.events:
-                # Check last events for ToolConfirmation requests
-                for event in reversed(reloaded_session.events[-5:]):  # Check last 5 events
-                    if hasattr(event, 'actions') and event.actions:
-                        if hasattr(event.actions, 'requested_tool_confirmations'):
-                            confirmations = event.actions.requested_tool_confirmations
-                            if confirmations:
-                                logger.info(
-                                    "ADK ToolConfirmation detected in session events (after loop)",
-                                    count=len(confirmations),
-                                    function_call_ids=list(confirmations.keys())
-                                )
-                                # Process confirmations
-                                for function_call_id, tool_confirmation in confirmations.items():
-                                    # Handle both ToolConfirmation object and dict
-                                    if isinstance(tool_confirmation, dict):
-                                        hint = tool_confirmation.get("hint", "Confirmation required")
-                                        payload = tool_confirmation.get("payload") or {}
-                                    else:
-                                        # ToolConfirmation object
-                                        hint = getattr(tool_confirmation, 'hint', None) or "Confirmation required"
-                                        payload = getattr(tool_confirmation, 'payload', None) or {}
+            # 🔥 NEW: After loop ends, check session for ToolConfirmation requests
+            # (ADK may have paused the invocation, so we need to check session events)
+            try:
+                reloaded_session = await session_service.get_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session.id,
+                )
+                if reloaded_session and reloaded_session.events:
+                    # Check last events for ToolConfirmation requests
+                    for event in reversed(reloaded_session.events[-5:]):  # Check last 5 events
+                        if hasattr(event, 'actions') and event.actions:
+                            if hasattr(event.actions, 'requested_tool_confirmations'):
+                                confirmations = event.actions.requested_tool_confirmations
+                                if confirmations:
+                                    logger.info(
+                                        "ADK ToolConfirmation detected in session events (after loop)",
+                                        count=len(confirmations),
+                                        function_call_ids=list(confirmations.keys())
+                                    )
+                                    # Process confirmations
+                                    for function_call_id, tool_confirmation in confirmations.items():
+                                        # Handle both ToolConfirmation object and dict
+                                        if isinstance(tool_confirmation, dict):
+                                            hint = tool_confirmation.get("hint", "Confirmation required")
+                                            payload = tool_confirmation.get("payload") or {}
+                                        else:
+                                            # ToolConfirmation object
+                                            hint = getattr(tool_confirmation, 'hint', None) or "Confirmation required"
+                                            payload = getattr(tool_confirmation, 'payload', None) or {}
                                     
-                                    # Find the function call in previous events
-                                    function_call_name = None
-                                    for prev_event in reloaded_session.events:
-                                        if hasattr(prev_event, 'content') and prev_event.content:
-                                            for part in prev_event.content.parts:
-                                                if hasattr(part, 'function_call') and part.function_call:
-                                                    if part.function_call.id == function_call_id:
-                                                        function_call_name = part.function_call.name
-                                                        break
-                                        if function_call_name:
-                                            break
+                                        # Find the function call in previous events
+                                        function_call_name = None
+                                        for prev_event in reloaded_session.events:
+                                            if hasattr(prev_event, 'content') and prev_event.content:
+                                                for part in prev_event.content.parts:
+                                                    if hasattr(part, 'function_call') and part.function_call:
+                                                        if part.function_call.id == function_call_id:
+                                                            function_call_name = part.function_call.name
+                                                            break
+                                            if function_call_name:
+                                                break
                                     
-                                    # Detect if this is a recorder tool
-                                    is_recorder = function_call_name == "open_recorder"
+                                        # Detect if this is a recorder tool
+                                        is_recorder = function_call_name == "open_recorder"
                                     
-                                    # Create HITL marker
-                                    if is_recorder:
-                                        # Recorder tool: include recorder-specific data
-                                        hitl_marker = {
-                                            "_hitl_required": True,
-                                            "agent": "root_agent",
-                                            "method": "open_recorder",
-                                            "action_type": "open_recorder",
-                                            "action_description": hint,
-                                            "action_data": {
-                                                "recorder_url": payload.get("recorder_url") if isinstance(payload, dict) else None,
-                                                "recording_id": payload.get("recording_id") if isinstance(payload, dict) else None,
-                                                "recording_type": payload.get("recording_type") if isinstance(payload, dict) else "audio",
-                                                "title": payload.get("title") if isinstance(payload, dict) else None,
-                                                "duration_minutes": payload.get("duration_minutes") if isinstance(payload, dict) else 60,
-                                            },
-                                            "metadata": {
-                                                "tool": "open_recorder",
-                                                "function_call_id": function_call_id,
-                                                "function_name": "open_recorder",
-                                            },
-                                        }
-                                    else:
-                                        # Generic user input tool
-                                        hitl_marker = {
-                                            "_hitl_required": True,
-                                            "agent": "root_agent",
-                                            "method": function_call_name or "request_user_input",
-                                            "action_type": "request_user_input",
-                                            "action_description": hint,
-                                            "action_data": {
+                                        # Create HITL marker
+                                        if is_recorder:
+                                            # Recorder tool: include recorder-specific data
+                                            hitl_marker = {
+                                                "_hitl_required": True,
+                                                "agent": "root_agent",
+                                                "method": "open_recorder",
+                                                "action_type": "open_recorder",
+                                                "action_description": hint,
+                                                "action_data": {
+                                                    "recorder_url": payload.get("recorder_url") if isinstance(payload, dict) else None,
+                                                    "recording_id": payload.get("recording_id") if isinstance(payload, dict) else None,
+                                                    "recording_type": payload.get("recording_type") if isinstance(payload, dict) else "audio",
+                                                    "title": payload.get("title") if isinstance(payload, dict) else None,
+                                                    "duration_minutes": payload.get("duration_minutes") if isinstance(payload, dict) else 60,
+                                                },
+                                                "metadata": {
+                                                    "tool": "open_recorder",
+                                                    "function_call_id": function_call_id,
+                                                    "function_name": "open_recorder",
+                                                },
+                                            }
+                                        else:
+                                            # Generic user input tool
+                                            hitl_marker = {
+                                                "_hitl_required": True,
+                                                "agent": "root_agent",
+                                                "method": function_call_name or "request_user_input",
+                                                "action_type": "request_user_input",
+                                                "action_description": hint,
+                                                "action_data": {
+                                                    "question": hint,
+                                                    "input_type": payload.get("input_type", "text") if isinstance(payload, dict) else "text",
+                                                    "default_value": payload.get("value") if isinstance(payload, dict) else None,
+                                                    "choices": payload.get("choices") if isinstance(payload, dict) else None,
+                                                },
+                                                "metadata": {
+                                                    "tool": "request_user_input",
+                                                    "function_call_id": function_call_id,
+                                                    "function_name": function_call_name or "request_user_input",
+                                                },
                                                 "question": hint,
-                                                "input_type": payload.get("input_type", "text") if isinstance(payload, dict) else "text",
-                                                "default_value": payload.get("value") if isinstance(payload, dict) else None,
-                                                "choices": payload.get("choices") if isinstance(payload, dict) else None,
-                                            },
-                                            "metadata": {
-                                                "tool": "request_user_input",
-                                                "function_call_id": function_call_id,
-                                                "function_name": function_call_name or "request_user_input",
-                                            },
-                                            "question": hint,
-                                        }
-                                    tool_calls.append(hitl_marker)
-                                    break  # Process only first confirmation for now
-        except Exception as e:
-            logger.warning("Could not check session for ToolConfirmation", error=str(e))
+                                            }
+                                        tool_calls.append(hitl_marker)
+                                        break  # Process only first confirmation for now
+            except Exception as e:
+                logger.warning("Could not check session for ToolConfirmation", error=str(e))
         
-        # 🔥 NEW: Check if any tool returned HITL requirement
-        hitl_required = False
-        hitl_data = None
+            # 🔥 NEW: Check if any tool returned HITL requirement
+            hitl_required = False
+            hitl_data = None
         
-        for tool_call in tool_calls:
-            if isinstance(tool_call, dict) and tool_call.get('_hitl_required'):
-                hitl_required = True
-                hitl_data = tool_call
-                logger.info(
-                    "HITL required detected in tool response",
-                    agent=hitl_data.get('agent'),
-                    action=hitl_data.get('action_description'),
-                    action_type=hitl_data.get('action'),
-                    action_keys=list(hitl_data.keys()) if isinstance(hitl_data, dict) else [],
-                    has_recorder_url=bool(hitl_data.get('recorder_url')),
-                    session_id=session.id
-                )
-                break
+            for tool_call in tool_calls:
+                if isinstance(tool_call, dict) and tool_call.get('_hitl_required'):
+                    hitl_required = True
+                    hitl_data = tool_call
+                    logger.info(
+                        "HITL required detected in tool response",
+                        agent=hitl_data.get('agent'),
+                        action=hitl_data.get('action_description'),
+                        action_type=hitl_data.get('action'),
+                        action_keys=list(hitl_data.keys()) if isinstance(hitl_data, dict) else [],
+                        has_recorder_url=bool(hitl_data.get('recorder_url')),
+                        session_id=session.id
+                    )
+                    break
         
-        # Special handling for RecorderTool: Pass data directly without confirmation
-        # Check for both 'action' === 'start_recording' and presence of 'recorder_url'
-        is_recorder_tool = (
-            hitl_required and hitl_data and (
-                hitl_data.get('action') == 'start_recording' or
-                bool(hitl_data.get('recorder_url')) or
-                (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
+            # Special handling for RecorderTool: Pass data directly without confirmation
+            # Check for both 'action' === 'start_recording' and presence of 'recorder_url'
+            is_recorder_tool = (
+                hitl_required and hitl_data and (
+                    hitl_data.get('action') == 'start_recording' or
+                    bool(hitl_data.get('recorder_url')) or
+                    (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
+                )
             )
-        )
         
-        if is_recorder_tool:
-            logger.info(
-                "RecorderTool detected - passing data directly to frontend",
-                recording_id=hitl_data.get('recording_id'),
-                recorder_url=hitl_data.get('recorder_url'),
-                action=hitl_data.get('action'),
-                ui_action_type=hitl_data.get('ui_action', {}).get('type') if isinstance(hitl_data.get('ui_action'), dict) else None
-            )
-            # Use the message from the tool or generate a default one
-            reply = hitl_data.get('message_to_user', reply)
-        # If HITL is required (for other tools), create confirmation request WITHOUT blocking
-        # ADK will pause automatically because the tool is marked as long_running
-        elif hitl_required and hitl_data:
-            from nodus_adk_runtime.services.hitl_service import get_hitl_service
-            import uuid as uuid_lib
-            
-            hitl_service = get_hitl_service()
-            event_id = f"hitl_{uuid_lib.uuid4().hex[:12]}"
+            if is_recorder_tool:
+                logger.info(
+                    "RecorderTool detected - passing data directly to frontend",
+                    recording_id=hitl_data.get('recording_id'),
+                    recorder_url=hitl_data.get('recorder_url'),
+                    action=hitl_data.get('action'),
+                    ui_action_type=hitl_data.get('ui_action', {}).get('type') if isinstance(hitl_data.get('ui_action'), dict) else None
+                )
+                # Use the message from the tool or generate a default one
+                reply = hitl_data.get('message_to_user', reply)
+            # If HITL is required (for other tools), create confirmation request WITHOUT blocking
+            # ADK will pause automatically because the tool is marked as long_running
+            elif hitl_required and hitl_data:
+                from nodus_adk_runtime.services.hitl_service import get_hitl_service
+                import uuid as uuid_lib
             
-            # Get invocation_id from last event (ADK sets this when pausing)
-            # If not available from event, try to get from session
-            if not invocation_id and last_event and hasattr(last_event, 'invocation_id'):
-                invocation_id = last_event.invocation_id
+                hitl_service = get_hitl_service()
+                event_id = f"hitl_{uuid_lib.uuid4().hex[:12]}"
             
-            # If still not available, reload session to get latest invocation_id
-            if not invocation_id:
-                try:
-                    reloaded_session = await session_service.get_session(
-                        app_name="personal_assistant",
-                        user_id=user_ctx.sub,
-                        session_id=session.id,
-                    )
-                    if reloaded_session and reloaded_session.events:
-                        # Get invocation_id from last event in session
-                        last_session_event = reloaded_session.events[-1]
-                        if hasattr(last_session_event, 'invocation_id'):
-                            invocation_id = last_session_event.invocation_id
-                except Exception as e:
-                    logger.warning("Could not get invocation_id from session", error=str(e))
+                # Get invocation_id from last event (ADK sets this when pausing)
+                # If not available from event, try to get from session
+                if not invocation_id and last_event and hasattr(last_event, 'invocation_id'):
+                    invocation_id = last_event.invocation_id
             
-            logger.info(
-                "Creating HITL event (non-blocking, ADK will pause automatically)",
-                event_id=event_id,
-                user_id=user_ctx.sub,
-                invocation_id=invocation_id,
-                action=hitl_data.get('action_description')
-            )
+                # If still not available, reload session to get latest invocation_id
+                if not invocation_id:
+                    try:
+                        reloaded_session = await session_service.get_session(
+                            app_name="personal_assistant",
+                            user_id=user_ctx.sub,
+                            session_id=session.id,
+                        )
+                        if reloaded_session and reloaded_session.events:
+                            # Get invocation_id from last event in session
+                            last_session_event = reloaded_session.events[-1]
+                            if hasattr(last_session_event, 'invocation_id'):
+                                invocation_id = last_session_event.invocation_id
+                    except Exception as e:
+                        logger.warning("Could not get invocation_id from session", error=str(e))
             
-            # Create HITL event WITHOUT waiting (non-blocking)
-            # ADK has already paused the invocation because the tool is long_running
-            try:
-                # Merge original metadata from agent with session metadata
-                merged_metadata = {
-                    'agent': hitl_data.get('agent'),
-                    'method': hitl_data.get('method'),
-                    'session_id': session.id,
-                    'original_message': request.message,
-                    'invocation_id': invocation_id,  # ← Critical: Save for resuming
-                    'function_call_id': hitl_data.get('_function_call_id'),  # ← Critical: Save for FunctionResponse
-                    'function_name': hitl_data.get('_function_name'),  # ← Critical: Save for FunctionResponse
-                }
-                # Add agent's metadata (tool, input_type, etc.)
-                if hitl_data.get('metadata'):
-                    merged_metadata.update(hitl_data.get('metadata'))
-                
-                # Create event WITHOUT waiting (non-blocking)
-                await hitl_service.create_event_async(
-                    user_id=user_ctx.sub,
-                    event_id=event_id,
-                    action_description=hitl_data.get('action_description', 'Unknown action'),
-                    action_data=hitl_data.get('action_data', {}),
-                    metadata=merged_metadata,
-                )
-                
-                # Return immediately with HITL pending status
-                # ADK has already paused the invocation
-                reply = hitl_data.get('message_to_user', reply)
-                
                 logger.info(
-                    "HITL event created, returning immediately (invocation paused by ADK)",
+                    "Creating HITL event (non-blocking, ADK will pause automatically)",
                     event_id=event_id,
+                    user_id=user_ctx.sub,
                     invocation_id=invocation_id,
-                    session_id=session.id
+                    action=hitl_data.get('action_description')
                 )
+            
+                # Create HITL event WITHOUT waiting (non-blocking)
+                # ADK has already paused the invocation because the tool is long_running
+                try:
+                    # Merge original metadata from agent with session metadata
+                    merged_metadata = {
+                        'agent': hitl_data.get('agent'),
+                        'method': hitl_data.get('method'),
+                        'session_id': session.id,
+                        'original_message': request.message,
+                        'invocation_id': invocation_id,  # ← Critical: Save for resuming
+                        'function_call_id': hitl_data.get('_function_call_id'),  # ← Critical: Save for FunctionResponse
+                        'function_name': hitl_data.get('_function_name'),  # ← Critical: Save for FunctionResponse
+                    }
+                    # Add agent's metadata (tool, input_type, etc.)
+                    if hitl_data.get('metadata'):
+                        merged_metadata.update(hitl_data.get('metadata'))
+                
+                    # Create event WITHOUT waiting (non-blocking)
+                    await hitl_service.create_event_async(
+                        user_id=user_ctx.sub,
+                        event_id=event_id,
+                        action_description=hitl_data.get('action_description', 'Unknown action'),
+                        action_data=hitl_data.get('action_data', {}),
+                        metadata=merged_metadata,
+                    )
+                
+                    # Return immediately with HITL pending status
+                    # ADK has already paused the invocation
+                    reply = hitl_data.get('message_to_user', reply)
                 
-                # Skip the rest of the HITL handling (execution will happen after user confirms)
-                # This will be handled in Phase 3 (resume after confirmation)
-                # For now, just return the intermediate reply
-                # NOTE: The old blocking code is removed for Phase 2
-                # Phase 3 will implement resume logic
+                    logger.info(
+                        "HITL event created, returning immediately (invocation paused by ADK)",
+                        event_id=event_id,
+                        invocation_id=invocation_id,
+                        session_id=session.id
+                    )
+                
+                    # Skip the rest of the HITL handling (execution will happen after user confirms)
+                    # This will be handled in Phase 3 (resume after confirmation)
+                    # For now, just return the intermediate reply
+                    # NOTE: The old blocking code is removed for Phase 2
+                    # Phase 3 will implement resume logic
             
-            except Exception as hitl_error:
-                logger.error("HITL event creation failed", error=str(hitl_error), event_id=event_id)
-                reply = f"Action could not be completed: {str(hitl_error)}"
+                except Exception as hitl_error:
+                    logger.error("HITL event creation failed", error=str(hitl_error), event_id=event_id)
+                    reply = f"Action could not be completed: {str(hitl_error)}"
         
-        # Save session to memory after processing
-        try:
-            # RELOAD session to get latest events
-            session = await session_service.get_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session.id,
-            )
+            # Save session to memory after processing
+            try:
+                # RELOAD session to get latest events
+                session = await session_service.get_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session.id,
+                )
             
-            await memory_service.add_session_to_memory(session)
-            logger.info("Session saved to memory (create)", session_id=session.id, tenant_id=user_ctx.tenant_id)
-        except Exception as e:
-            logger.error("Failed to save session to memory", error=str(e), session_id=session.id)
+                await memory_service.add_session_to_memory(session)
+                logger.info("Session saved to memory (create)", session_id=session.id, tenant_id=user_ctx.tenant_id)
+            except Exception as e:
+                logger.error("Failed to save session to memory", error=str(e), session_id=session.id)
         
-        # Build response metadata - include hitl_data if it's a RecorderTool
-        response_metadata = {**request.metadata}
-        is_recorder_tool_response = (
-            hitl_required and hitl_data and (
-                hitl_data.get('action') == 'start_recording' or
-                bool(hitl_data.get('recorder_url')) or
-                (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
-            )
-        )
-        if is_recorder_tool_response:
-            # Include all RecorderTool fields in metadata for Llibreta
-            logger.info(
-                "Including RecorderTool fields in response metadata",
-                recording_id=hitl_data.get('recording_id'),
-                recorder_url=hitl_data.get('recorder_url')
+            # Build response metadata - include hitl_data if it's a RecorderTool
+            response_metadata = {**request.metadata}
+            is_recorder_tool_response = (
+                hitl_required and hitl_data and (
+                    hitl_data.get('action') == 'start_recording' or
+                    bool(hitl_data.get('recorder_url')) or
+                    (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
+                )
             )
-            response_metadata.update({
-                '_hitl_required': True,
-                'ui_action': hitl_data.get('ui_action'),
-                'recording_id': hitl_data.get('recording_id'),
-                'recorder_url': hitl_data.get('recorder_url'),
-                'recording_type': hitl_data.get('recording_type'),
-                'title': hitl_data.get('title'),
-                'duration_minutes': hitl_data.get('duration_minutes'),
-                'auto_transcribe': hitl_data.get('auto_transcribe'),
-            })
-        
-        # End Langfuse trace (success)
-        end_trace(trace, success=True)
+            if is_recorder_tool_response:
+                # Include all RecorderTool fields in metadata for Llibreta
+                logger.info(
+                    "Including RecorderTool fields in response metadata",
+                    recording_id=hitl_data.get('recording_id'),
+                    recorder_url=hitl_data.get('recorder_url')
+                )
+                response_metadata.update({
+                    '_hitl_required': True,
+                    'ui_action': hitl_data.get('ui_action'),
+                    'recording_id': hitl_data.get('recording_id'),
+                    'recorder_url': hitl_data.get('recorder_url'),
+                    'recording_type': hitl_data.get('recording_type'),
+                    'title': hitl_data.get('title'),
+                    'duration_minutes': hitl_data.get('duration_minutes'),
+                    'auto_transcribe': hitl_data.get('auto_transcribe'),
+                })
         
-        return SessionResponse(
-            session_id=session_id,
-            conversation_id=conversation_id,
-            reply=reply,
-            metadata=response_metadata,
-            memories=memories,
-            citations=citations,
-            structured_data=structured_data,
-            intent=intent,
-            tool_calls=tool_calls,
-        )
+            response = SessionResponse(
+                session_id=session_id,
+                conversation_id=conversation_id,
+                reply=reply,
+                metadata=response_metadata,
+                memories=memories,
+                citations=citations,
+                structured_data=structured_data,
+                intent=intent,
+                tool_calls=tool_calls,
+            )
+            return _json_response(response)
         
     except Exception as e:
         logger.error("Failed to create session", error=str(e), user_id=user_ctx.sub)
         
-        # End Langfuse trace (error)
-        end_trace(trace, success=False, error=str(e))
-        
         # Fallback to stub response
         session_id = request.conversation_id or f"session_{user_ctx.sub}_{uuid.uuid4().hex[:8]}"
         conversation_id = request.conversation_id or session_id
         
-        return SessionResponse(
+        response = SessionResponse(
             session_id=session_id,
             conversation_id=conversation_id,
             reply="Hello! I'm your assistant. There was an error processing your request.",
             metadata={**request.metadata, "error": str(e)},
         )
+        return _json_response(response)
 
 
 @router.post("/sessions/{session_id}/messages", response_model=SessionResponse)
@@ -651,14 +656,6 @@ async def add_message(
     """
     Add a message to an existing session.
     """
-    # Start Langfuse trace
-    trace = start_trace(
-        "add_message",
-        user_ctx=user_ctx,
-        session_id=session_id,
-        input_data={"message": request.message[:100] if request.message else None}
-    )
-    
     logger.info(
         "Adding message to session",
         session_id=session_id,
@@ -667,510 +664,512 @@ async def add_message(
     )
     
     try:
-        # Build agent for user
-        agent, memory_service = await _build_agent_for_user(user_ctx)
+        with langfuse_trace(
+            "add_message",
+            user_ctx=user_ctx,
+            session_id=session_id,
+            input_data={"message": request.message[:100] if request.message else None},
+        ):
+            # Build agent for user
+            agent, memory_service = await _build_agent_for_user(user_ctx)
         
-        # Run agent with user message
-        from google.adk.runners import Runner
-        from google.adk.apps.app import App, ResumabilityConfig
-        from google.genai import types
+            # Run agent with user message
+            from google.adk.runners import Runner
+            from google.adk.apps.app import App, ResumabilityConfig
+            from google.genai import types
         
-        # 🔥 FIX: Use shared persistent session service
-        session_service = get_session_service()
+            # 🔥 FIX: Use shared persistent session service
+            session_service = get_session_service()
         
-        # Enable ADK resumability for HITL support (allows pause/resume on long-running tools)
-        resumability_config = ResumabilityConfig(is_resumable=True)
+            # Enable ADK resumability for HITL support (allows pause/resume on long-running tools)
+            resumability_config = ResumabilityConfig(is_resumable=True)
         
-        # Create App instance with resumability config (required for Runner)
-        app = App(
-            name="personal_assistant",
-            root_agent=agent,
-            resumability_config=resumability_config,
-        )
+            # Create App instance with resumability config (required for Runner)
+            app = App(
+                name="personal_assistant",
+                root_agent=agent,
+                resumability_config=resumability_config,
+            )
         
-        runner = Runner(
-            app=app,
-            session_service=session_service,
-            memory_service=memory_service,
-        )
+            runner = Runner(
+                app=app,
+                session_service=session_service,
+                memory_service=memory_service,
+            )
         
-        # 🔥 FIX: Get or create session using the session_id from path
-        logger.info("Session lookup (add_message)", 
-                   session_id=session_id,
-                   user_id=user_ctx.sub)
+            # 🔥 FIX: Get or create session using the session_id from path
+            logger.info("Session lookup (add_message)", 
+                       session_id=session_id,
+                       user_id=user_ctx.sub)
         
-        try:
-            session = await runner.session_service.get_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session_id,
-            )
-            if session:
-                logger.info("✅ Reusing existing session (add_message)", 
+            try:
+                session = await runner.session_service.get_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session_id,
+                )
+                if session:
+                    logger.info("✅ Reusing existing session (add_message)", 
+                               session_id=session_id,
+                               actual_session_id=session.id,
+                               user_id=user_ctx.sub)
+                else:
+                    raise ValueError("Session not found")
+            except Exception as e:
+                # Session doesn't exist, create it with the provided session_id
+                logger.info("Creating new session (add_message)", 
+                           session_id=session_id,
+                           user_id=user_ctx.sub,
+                           error=str(e))
+                session = await runner.session_service.create_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session_id,  # ← CRITICAL: Pass the session_id!
+                    state={'tenant_id': user_ctx.tenant_id or 'default'},
+                )
+                logger.info("Session created (add_message)", 
                            session_id=session_id,
                            actual_session_id=session.id,
-                           user_id=user_ctx.sub)
-            else:
-                raise ValueError("Session not found")
-        except Exception as e:
-            # Session doesn't exist, create it with the provided session_id
-            logger.info("Creating new session (add_message)", 
-                       session_id=session_id,
-                       user_id=user_ctx.sub,
-                       error=str(e))
-            session = await runner.session_service.create_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session_id,  # ← CRITICAL: Pass the session_id!
-                state={'tenant_id': user_ctx.tenant_id or 'default'},
-            )
-            logger.info("Session created (add_message)", 
-                       session_id=session_id,
-                       actual_session_id=session.id,
-                       match=session.id == session_id)
+                           match=session.id == session_id)
         
-        # Add user message
-        user_content = types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=request.message)],
-        )
+            # Add user message
+            user_content = types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=request.message)],
+            )
         
-        # Run agent and collect response data
-        response_parts = []
-        citations = []
-        tool_calls = []
-        memories = []
-        intent = None
-        structured_data = []
-        last_event = None
-        invocation_id = None  # Will be captured from events
+            # Run agent and collect response data
+            response_parts = []
+            citations = []
+            tool_calls = []
+            memories = []
+            intent = None
+            structured_data = []
+            last_event = None
+            invocation_id = None  # Will be captured from events
         
-        async for event in runner.run_async(
-            user_id=user_ctx.sub,
-            session_id=session.id,
-            new_message=user_content,
-        ):
-            last_event = event  # Keep track of last event for invocation_id
+            async for event in runner.run_async(
+                user_id=user_ctx.sub,
+                session_id=session.id,
+                new_message=user_content,
+            ):
+                last_event = event  # Keep track of last event for invocation_id
             
-            # Capture invocation_id from event (ADK sets this automatically)
-            if hasattr(event, 'invocation_id') and event.invocation_id:
-                invocation_id = event.invocation_id
-                logger.debug("Captured invocation_id from event", invocation_id=invocation_id)
+                # Capture invocation_id from event (ADK sets this automatically)
+                if hasattr(event, 'invocation_id') and event.invocation_id:
+                    invocation_id = event.invocation_id
+                    logger.debug("Captured invocation_id from event", invocation_id=invocation_id)
             
-            # Extract text content
-            if hasattr(event, 'content') and event.content:
-                for part in event.content.parts:
-                    if hasattr(part, 'text') and part.text:
-                        response_parts.append(part.text)
+                # Extract text content
+                if hasattr(event, 'content') and event.content:
+                    for part in event.content.parts:
+                        if hasattr(part, 'text') and part.text:
+                            response_parts.append(part.text)
                     
-                    # 🔥 NEW: Check for HITL markers in function responses
-                    if hasattr(part, 'function_response') and part.function_response:
-                        try:
-                            response_data = part.function_response.response
-                            if isinstance(response_data, dict) and response_data.get('_hitl_required'):
-                                logger.info(
-                                    "HITL marker detected in function response",
-                                    agent=response_data.get('agent'),
-                                    action=response_data.get('action_description')
-                                )
-                                tool_calls.append(response_data)
-                        except Exception as e:
-                            logger.debug("Error parsing function_response", error=str(e))
+                        # 🔥 NEW: Check for HITL markers in function responses
+                        if hasattr(part, 'function_response') and part.function_response:
+                            try:
+                                response_data = part.function_response.response
+                                if isinstance(response_data, dict) and response_data.get('_hitl_required'):
+                                    logger.info(
+                                        "HITL marker detected in function response",
+                                        agent=response_data.get('agent'),
+                                        action=response_data.get('action_description')
+                                    )
+                                    tool_calls.append(response_data)
+                            except Exception as e:
+                                logger.debug("Error parsing function_response", error=str(e))
             
-            # 🔥 NEW: Check for ADK ToolConfirmation requests
-            if hasattr(event, 'actions') and event.actions:
-                if hasattr(event.actions, 'requested_tool_confirmations'):
-                    confirmations = event.actions.requested_tool_confirmations
-                    if confirmations:
-                        logger.info(
-                            "ADK ToolConfirmation detected",
-                            count=len(confirmations),
-                            function_call_ids=list(confirmations.keys())
-                        )
-                        # Store confirmations for later processing
-                        for function_call_id, tool_confirmation in confirmations.items():
-                            # Handle both ToolConfirmation object and dict
-                            if isinstance(tool_confirmation, dict):
-                                hint = tool_confirmation.get("hint", "Confirmation required")
-                                payload = tool_confirmation.get("payload") or {}
-                            else:
-                                # ToolConfirmation object
-                                hint = getattr(tool_confirmation, 'hint', None) or "Confirmation required"
-                                payload = getattr(tool_confirmation, 'payload', None) or {}
+                # 🔥 NEW: Check for ADK ToolConfirmation requests
+                if hasattr(event, 'actions') and event.actions:
+                    if hasattr(event.actions, 'requested_tool_confirmations'):
+                        confirmations = event.actions.requested_tool_confirmations
+                        if confirmations:
+                            logger.info(
+                                "ADK ToolConfirmation detected",
+                                count=len(confirmations),
+                                function_call_ids=list(confirmations.keys())
+                            )
+                            # Store confirmations for later processing
+                            for function_call_id, tool_confirmation in confirmations.items():
+                                # Handle both ToolConfirmation object and dict
+                                if isinstance(tool_confirmation, dict):
+                                    hint = tool_confirmation.get("hint", "Confirmation required")
+                                    payload = tool_confirmation.get("payload") or {}
+                                else:
+                                    # ToolConfirmation object
+                                    hint = getattr(tool_confirmation, 'hint', None) or "Confirmation required"
+                                    payload = getattr(tool_confirmation, 'payload', None) or {}
                             
-                            # Get function call info from event content
-                            function_call_name = None
-                            function_call_args = {}
+                                # Get function call info from event content
+                                function_call_name = None
+                                function_call_args = {}
                             
-                            if hasattr(event, 'content') and event.content:
-                                for part in event.content.parts:
-                                    if hasattr(part, 'function_call') and part.function_call:
-                                        if part.function_call.id == function_call_id:
-                                            function_call_name = part.function_call.name
-                                            function_call_args = part.function_call.args or {}
-                                            break
+                                if hasattr(event, 'content') and event.content:
+                                    for part in event.content.parts:
+                                        if hasattr(part, 'function_call') and part.function_call:
+                                            if part.function_call.id == function_call_id:
+                                                function_call_name = part.function_call.name
+                                                function_call_args = part.function_call.args or {}
+                                                break
                             
-                            # Detect if this is a recorder tool
-                            is_recorder = function_call_name == "open_recorder"
+                                # Detect if this is a recorder tool
+                                is_recorder = function_call_name == "open_recorder"
                             
-                            # Create HITL marker compatible with existing system
-                            if is_recorder:
-                                # Recorder tool: include recorder-specific data
-                                hitl_marker = {
-                                    "_hitl_required": True,
-                                    "agent": "root_agent",
-                                    "method": "open_recorder",
-                                    "action_type": "open_recorder",
-                                    "action_description": hint,
-                                    "action_data": {
-                                        "recorder_url": payload.get("recorder_url") if isinstance(payload, dict) else None,
-                                        "recording_id": payload.get("recording_id") if isinstance(payload, dict) else None,
-                                        "recording_type": payload.get("recording_type") if isinstance(payload, dict) else "audio",
-                                        "title": payload.get("title") if isinstance(payload, dict) else None,
-                                        "duration_minutes": payload.get("duration_minutes") if isinstance(payload, dict) else 60,
-                                    },
-                                    "metadata": {
-                                        "tool": "open_recorder",  # Per activar recorder handling a AdkHitlCard
-                                        "function_call_id": function_call_id,  # Critical per FunctionResponse
-                                        "function_name": "open_recorder",
-                                    },
-                                }
-                            else:
-                                # Generic user input tool
-                                hitl_marker = {
-                                    "_hitl_required": True,
-                                    "agent": "root_agent",  # Generic tool, not A2A
-                                    "method": function_call_name or "request_user_input",
-                                    "action_type": "request_user_input",
-                                    "action_description": hint,
-                                    "action_data": {
+                                # Create HITL marker compatible with existing system
+                                if is_recorder:
+                                    # Recorder tool: include recorder-specific data
+                                    hitl_marker = {
+                                        "_hitl_required": True,
+                                        "agent": "root_agent",
+                                        "method": "open_recorder",
+                                        "action_type": "open_recorder",
+                                        "action_description": hint,
+                                        "action_data": {
+                                            "recorder_url": payload.get("recorder_url") if isinstance(payload, dict) else None,
+                                            "recording_id": payload.get("recording_id") if isinstance(payload, dict) else None,
+                                            "recording_type": payload.get("recording_type") if isinstance(payload, dict) else "audio",
+                                            "title": payload.get("title") if isinstance(payload, dict) else None,
+                                            "duration_minutes": payload.get("duration_minutes") if isinstance(payload, dict) else 60,
+                                        },
+                                        "metadata": {
+                                            "tool": "open_recorder",  # Per activar recorder handling a AdkHitlCard
+                                            "function_call_id": function_call_id,  # Critical per FunctionResponse
+                                            "function_name": "open_recorder",
+                                        },
+                                    }
+                                else:
+                                    # Generic user input tool
+                                    hitl_marker = {
+                                        "_hitl_required": True,
+                                        "agent": "root_agent",  # Generic tool, not A2A
+                                        "method": function_call_name or "request_user_input",
+                                        "action_type": "request_user_input",
+                                        "action_description": hint,
+                                        "action_data": {
+                                            "question": hint,
+                                            "input_type": payload.get("input_type", "text") if isinstance(payload, dict) else "text",
+                                            "default_value": payload.get("value") if isinstance(payload, dict) else None,
+                                            "choices": payload.get("choices") if isinstance(payload, dict) else None,
+                                        },
+                                        "metadata": {
+                                            "tool": "request_user_input",  # Per activar input field a AdkHitlCard
+                                            "function_call_id": function_call_id,  # Critical per FunctionResponse
+                                            "function_name": function_call_name or "request_user_input",
+                                        },
                                         "question": hint,
-                                        "input_type": payload.get("input_type", "text") if isinstance(payload, dict) else "text",
-                                        "default_value": payload.get("value") if isinstance(payload, dict) else None,
-                                        "choices": payload.get("choices") if isinstance(payload, dict) else None,
-                                    },
-                                    "metadata": {
-                                        "tool": "request_user_input",  # Per activar input field a AdkHitlCard
-                                        "function_call_id": function_call_id,  # Critical per FunctionResponse
-                                        "function_name": function_call_name or "request_user_input",
-                                    },
-                                    "question": hint,
-                                }
-                            tool_calls.append(hitl_marker)
+                                    }
+                                tool_calls.append(hitl_marker)
             
-            # Extract tool calls and citations from custom_metadata
-            if hasattr(event, 'custom_metadata') and event.custom_metadata:
-                metadata = event.custom_metadata
+                # Extract tool calls and citations from custom_metadata
+                if hasattr(event, 'custom_metadata') and event.custom_metadata:
+                    metadata = event.custom_metadata
                 
-                # Tool calls
-                if 'tool_calls' in metadata:
-                    tool_calls.extend(metadata['tool_calls'])
+                    # Tool calls
+                    if 'tool_calls' in metadata:
+                        tool_calls.extend(metadata['tool_calls'])
                 
-                # Citations/sources
-                if 'citations' in metadata:
-                    citations.extend(metadata['citations'])
+                    # Citations/sources
+                    if 'citations' in metadata:
+                        citations.extend(metadata['citations'])
                 
-                # Memories
-                if 'memories' in metadata:
-                    memories.extend(metadata['memories'])
+                    # Memories
+                    if 'memories' in metadata:
+                        memories.extend(metadata['memories'])
                 
-                # Intent
-                if 'intent' in metadata:
-                    intent = metadata['intent']
+                    # Intent
+                    if 'intent' in metadata:
+                        intent = metadata['intent']
                 
-                # Structured data from tools
-                if 'structured_data' in metadata:
-                    structured_data.extend(metadata['structured_data'])
+                    # Structured data from tools
+                    if 'structured_data' in metadata:
+                        structured_data.extend(metadata['structured_data'])
         
-        reply = " ".join(response_parts) if response_parts else "I received your message."
+            reply = " ".join(response_parts) if response_parts else "I received your message."
         
-        # 🔥 NEW: After loop ends, check session for ToolConfirmation requests
-        # (ADK may have paused the invocation, so we need to check session events)
-        try:
-            reloaded_session = await session_service.get_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session.id,
-            )
-            if reloaded_session and reloaded_session.events:
-                # Check last events for ToolConfirmation requests
-                for event in reversed(reloaded_session.events[-5:]):  # Check last 5 events
-                    if hasattr(event, 'actions') and event.actions:
-                        if hasattr(event.actions, 'requested_tool_confirmations'):
-                            confirmations = event.actions.requested_tool_confirmations
-                            if confirmations:
-                                logger.info(
-                                    "ADK ToolConfirmation detected in session events (after loop)",
-                                    count=len(confirmations),
-                                    function_call_ids=list(confirmations.keys())
-                                )
-                                # Process confirmations
-                                for function_call_id, tool_confirmation in confirmations.items():
-                                    # Handle both ToolConfirmation object and dict
-                                    if isinstance(tool_confirmation, dict):
-                                        hint = tool_confirmation.get("hint", "Confirmation required")
-                                        payload = tool_confirmation.get("payload") or {}
-                                    else:
-                                        # ToolConfirmation object
-                                        hint = getattr(tool_confirmation, 'hint', None) or "Confirmation required"
-                                        payload = getattr(tool_confirmation, 'payload', None) or {}
+            # 🔥 NEW: After loop ends, check session for ToolConfirmation requests
+            # (ADK may have paused the invocation, so we need to check session events)
+            try:
+                reloaded_session = await session_service.get_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session.id,
+                )
+                if reloaded_session and reloaded_session.events:
+                    # Check last events for ToolConfirmation requests
+                    for event in reversed(reloaded_session.events[-5:]):  # Check last 5 events
+                        if hasattr(event, 'actions') and event.actions:
+                            if hasattr(event.actions, 'requested_tool_confirmations'):
+                                confirmations = event.actions.requested_tool_confirmations
+                                if confirmations:
+                                    logger.info(
+                                        "ADK ToolConfirmation detected in session events (after loop)",
+                                        count=len(confirmations),
+                                        function_call_ids=list(confirmations.keys())
+                                    )
+                                    # Process confirmations
+                                    for function_call_id, tool_confirmation in confirmations.items():
+                                        # Handle both ToolConfirmation object and dict
+                                        if isinstance(tool_confirmation, dict):
+                                            hint = tool_confirmation.get("hint", "Confirmation required")
+                                            payload = tool_confirmation.get("payload") or {}
+                                        else:
+                                            # ToolConfirmation object
+                                            hint = getattr(tool_confirmation, 'hint', None) or "Confirmation required"
+                                            payload = getattr(tool_confirmation, 'payload', None) or {}
                                     
-                                    # Find the function call in previous events
-                                    function_call_name = None
-                                    for prev_event in reloaded_session.events:
-                                        if hasattr(prev_event, 'content') and prev_event.content:
-                                            for part in prev_event.content.parts:
-                                                if hasattr(part, 'function_call') and part.function_call:
-                                                    if part.function_call.id == function_call_id:
-                                                        function_call_name = part.function_call.name
-                                                        break
-                                        if function_call_name:
-                                            break
+                                        # Find the function call in previous events
+                                        function_call_name = None
+                                        for prev_event in reloaded_session.events:
+                                            if hasattr(prev_event, 'content') and prev_event.content:
+                                                for part in prev_event.content.parts:
+                                                    if hasattr(part, 'function_call') and part.function_call:
+                                                        if part.function_call.id == function_call_id:
+                                                            function_call_name = part.function_call.name
+                                                            break
+                                            if function_call_name:
+                                                break
                                     
-                                    # Detect if this is a recorder tool
-                                    is_recorder = function_call_name == "open_recorder"
+                                        # Detect if this is a recorder tool
+                                        is_recorder = function_call_name == "open_recorder"
                                     
-                                    # Create HITL marker
-                                    if is_recorder:
-                                        # Recorder tool: include recorder-specific data
-                                        hitl_marker = {
-                                            "_hitl_required": True,
-                                            "agent": "root_agent",
-                                            "method": "open_recorder",
-                                            "action_type": "open_recorder",
-                                            "action_description": hint,
-                                            "action_data": {
-                                                "recorder_url": payload.get("recorder_url") if isinstance(payload, dict) else None,
-                                                "recording_id": payload.get("recording_id") if isinstance(payload, dict) else None,
-                                                "recording_type": payload.get("recording_type") if isinstance(payload, dict) else "audio",
-                                                "title": payload.get("title") if isinstance(payload, dict) else None,
-                                                "duration_minutes": payload.get("duration_minutes") if isinstance(payload, dict) else 60,
-                                            },
-                                            "metadata": {
-                                                "tool": "open_recorder",
-                                                "function_call_id": function_call_id,
-                                                "function_name": "open_recorder",
-                                            },
-                                        }
-                                    else:
-                                        # Generic user input tool
-                                        hitl_marker = {
-                                            "_hitl_required": True,
-                                            "agent": "root_agent",
-                                            "method": function_call_name or "request_user_input",
-                                            "action_type": "request_user_input",
-                                            "action_description": hint,
-                                            "action_data": {
+                                        # Create HITL marker
+                                        if is_recorder:
+                                            # Recorder tool: include recorder-specific data
+                                            hitl_marker = {
+                                                "_hitl_required": True,
+                                                "agent": "root_agent",
+                                                "method": "open_recorder",
+                                                "action_type": "open_recorder",
+                                                "action_description": hint,
+                                                "action_data": {
+                                                    "recorder_url": payload.get("recorder_url") if isinstance(payload, dict) else None,
+                                                    "recording_id": payload.get("recording_id") if isinstance(payload, dict) else None,
+                                                    "recording_type": payload.get("recording_type") if isinstance(payload, dict) else "audio",
+                                                    "title": payload.get("title") if isinstance(payload, dict) else None,
+                                                    "duration_minutes": payload.get("duration_minutes") if isinstance(payload, dict) else 60,
+                                                },
+                                                "metadata": {
+                                                    "tool": "open_recorder",
+                                                    "function_call_id": function_call_id,
+                                                    "function_name": "open_recorder",
+                                                },
+                                            }
+                                        else:
+                                            # Generic user input tool
+                                            hitl_marker = {
+                                                "_hitl_required": True,
+                                                "agent": "root_agent",
+                                                "method": function_call_name or "request_user_input",
+                                                "action_type": "request_user_input",
+                                                "action_description": hint,
+                                                "action_data": {
+                                                    "question": hint,
+                                                    "input_type": payload.get("input_type", "text") if isinstance(payload, dict) else "text",
+                                                    "default_value": payload.get("value") if isinstance(payload, dict) else None,
+                                                    "choices": payload.get("choices") if isinstance(payload, dict) else None,
+                                                },
+                                                "metadata": {
+                                                    "tool": "request_user_input",
+                                                    "function_call_id": function_call_id,
+                                                    "function_name": function_call_name or "request_user_input",
+                                                },
                                                 "question": hint,
-                                                "input_type": payload.get("input_type", "text") if isinstance(payload, dict) else "text",
-                                                "default_value": payload.get("value") if isinstance(payload, dict) else None,
-                                                "choices": payload.get("choices") if isinstance(payload, dict) else None,
-                                            },
-                                            "metadata": {
-                                                "tool": "request_user_input",
-                                                "function_call_id": function_call_id,
-                                                "function_name": function_call_name or "request_user_input",
-                                            },
-                                            "question": hint,
-                                        }
-                                    tool_calls.append(hitl_marker)
-                                    break  # Process only first confirmation for now
-        except Exception as e:
-            logger.warning("Could not check session for ToolConfirmation", error=str(e))
+                                            }
+                                        tool_calls.append(hitl_marker)
+                                        break  # Process only first confirmation for now
+            except Exception as e:
+                logger.warning("Could not check session for ToolConfirmation", error=str(e))
         
-        # 🔥 NEW: Check if any tool returned HITL requirement
-        hitl_required = False
-        hitl_data = None
+            # 🔥 NEW: Check if any tool returned HITL requirement
+            hitl_required = False
+            hitl_data = None
         
-        for tool_call in tool_calls:
-            if isinstance(tool_call, dict) and tool_call.get('_hitl_required'):
-                hitl_required = True
-                hitl_data = tool_call
-                logger.info(
-                    "HITL required detected in tool response",
-                    agent=hitl_data.get('agent'),
-                    action=hitl_data.get('action_description'),
-                    action_type=hitl_data.get('action'),
-                    action_keys=list(hitl_data.keys()) if isinstance(hitl_data, dict) else [],
-                    has_recorder_url=bool(hitl_data.get('recorder_url')),
-                    session_id=session.id
-                )
-                break
+            for tool_call in tool_calls:
+                if isinstance(tool_call, dict) and tool_call.get('_hitl_required'):
+                    hitl_required = True
+                    hitl_data = tool_call
+                    logger.info(
+                        "HITL required detected in tool response",
+                        agent=hitl_data.get('agent'),
+                        action=hitl_data.get('action_description'),
+                        action_type=hitl_data.get('action'),
+                        action_keys=list(hitl_data.keys()) if isinstance(hitl_data, dict) else [],
+                        has_recorder_url=bool(hitl_data.get('recorder_url')),
+                        session_id=session.id
+                    )
+                    break
         
-        # Special handling for RecorderTool: Pass data directly without confirmation
-        # Check for both 'action' === 'start_recording' and presence of 'recorder_url'
-        is_recorder_tool = (
-            hitl_required and hitl_data and (
-                hitl_data.get('action') == 'start_recording' or
-                bool(hitl_data.get('recorder_url')) or
-                (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
+            # Special handling for RecorderTool: Pass data directly without confirmation
+            # Check for both 'action' === 'start_recording' and presence of 'recorder_url'
+            is_recorder_tool = (
+                hitl_required and hitl_data and (
+                    hitl_data.get('action') == 'start_recording' or
+                    bool(hitl_data.get('recorder_url')) or
+                    (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
+                )
             )
-        )
         
-        if is_recorder_tool:
-            logger.info(
-                "RecorderTool detected - passing data directly to frontend",
-                recording_id=hitl_data.get('recording_id'),
-                recorder_url=hitl_data.get('recorder_url'),
-                action=hitl_data.get('action'),
-                ui_action_type=hitl_data.get('ui_action', {}).get('type') if isinstance(hitl_data.get('ui_action'), dict) else None
-            )
-            # Use the message from the tool or generate a default one
-            reply = hitl_data.get('message_to_user', reply)
-        # If HITL is required (for other tools), create confirmation request WITHOUT blocking
-        # ADK will pause automatically because the tool is marked as long_running
-        elif hitl_required and hitl_data:
-            from nodus_adk_runtime.services.hitl_service import get_hitl_service
-            import uuid as uuid_lib
-            
-            hitl_service = get_hitl_service()
-            event_id = f"hitl_{uuid_lib.uuid4().hex[:12]}"
+            if is_recorder_tool:
+                logger.info(
+                    "RecorderTool detected - passing data directly to frontend",
+                    recording_id=hitl_data.get('recording_id'),
+                    recorder_url=hitl_data.get('recorder_url'),
+                    action=hitl_data.get('action'),
+                    ui_action_type=hitl_data.get('ui_action', {}).get('type') if isinstance(hitl_data.get('ui_action'), dict) else None
+                )
+                # Use the message from the tool or generate a default one
+                reply = hitl_data.get('message_to_user', reply)
+            # If HITL is required (for other tools), create confirmation request WITHOUT blocking
+            # ADK will pause automatically because the tool is marked as long_running
+            elif hitl_required and hitl_data:
+                from nodus_adk_runtime.services.hitl_service import get_hitl_service
+                import uuid as uuid_lib
             
-            # Get invocation_id from last event (ADK sets this when pausing)
-            # If not available from event, try to get from session
-            if not invocation_id and last_event and hasattr(last_event, 'invocation_id'):
-                invocation_id = last_event.invocation_id
+                hitl_service = get_hitl_service()
+                event_id = f"hitl_{uuid_lib.uuid4().hex[:12]}"
             
-            # If still not available, reload session to get latest invocation_id
-            if not invocation_id:
-                try:
-                    reloaded_session = await session_service.get_session(
-                        app_name="personal_assistant",
-                        user_id=user_ctx.sub,
-                        session_id=session.id,
-                    )
-                    if reloaded_session and reloaded_session.events:
-                        # Get invocation_id from last event in session
-                        last_session_event = reloaded_session.events[-1]
-                        if hasattr(last_session_event, 'invocation_id'):
-                            invocation_id = last_session_event.invocation_id
-                except Exception as e:
-                    logger.warning("Could not get invocation_id from session", error=str(e))
+                # Get invocation_id from last event (ADK sets this when pausing)
+                # If not available from event, try to get from session
+                if not invocation_id and last_event and hasattr(last_event, 'invocation_id'):
+                    invocation_id = last_event.invocation_id
             
-            logger.info(
-                "Creating HITL event (non-blocking, ADK will pause automatically)",
-                event_id=event_id,
-                user_id=user_ctx.sub,
-                invocation_id=invocation_id,
-                action=hitl_data.get('action_description')
-            )
+                # If still not available, reload session to get latest invocation_id
+                if not invocation_id:
+                    try:
+                        reloaded_session = await session_service.get_session(
+                            app_name="personal_assistant",
+                            user_id=user_ctx.sub,
+                            session_id=session.id,
+                        )
+                        if reloaded_session and reloaded_session.events:
+                            # Get invocation_id from last event in session
+                            last_session_event = reloaded_session.events[-1]
+                            if hasattr(last_session_event, 'invocation_id'):
+                                invocation_id = last_session_event.invocation_id
+                    except Exception as e:
+                        logger.warning("Could not get invocation_id from session", error=str(e))
             
-            # Create HITL event WITHOUT waiting (non-blocking)
-            # ADK has already paused the invocation because the tool is long_running
-            try:
-                # Merge original metadata from agent with session metadata
-                merged_metadata = {
-                    'agent': hitl_data.get('agent'),
-                    'method': hitl_data.get('method'),
-                    'session_id': session.id,
-                    'original_message': request.message,
-                    'invocation_id': invocation_id,  # ← Critical: Save for resuming
-                    'function_call_id': hitl_data.get('_function_call_id'),  # ← Critical: Save for FunctionResponse
-                    'function_name': hitl_data.get('_function_name'),  # ← Critical: Save for FunctionResponse
-                }
-                # Add agent's metadata (tool, input_type, etc.)
-                if hitl_data.get('metadata'):
-                    merged_metadata.update(hitl_data.get('metadata'))
-                
-                # Create event WITHOUT waiting (non-blocking)
-                await hitl_service.create_event_async(
-                    user_id=user_ctx.sub,
-                    event_id=event_id,
-                    action_description=hitl_data.get('action_description', 'Unknown action'),
-                    action_data=hitl_data.get('action_data', {}),
-                    metadata=merged_metadata,
-                )
-                
-                # Return immediately with HITL pending status
-                # ADK has already paused the invocation
-                reply = hitl_data.get('message_to_user', reply)
-                
                 logger.info(
-                    "HITL event created, returning immediately (invocation paused by ADK)",
+                    "Creating HITL event (non-blocking, ADK will pause automatically)",
                     event_id=event_id,
+                    user_id=user_ctx.sub,
                     invocation_id=invocation_id,
-                    session_id=session.id
+                    action=hitl_data.get('action_description')
                 )
+            
+                # Create HITL event WITHOUT waiting (non-blocking)
+                # ADK has already paused the invocation because the tool is long_running
+                try:
+                    # Merge original metadata from agent with session metadata
+                    merged_metadata = {
+                        'agent': hitl_data.get('agent'),
+                        'method': hitl_data.get('method'),
+                        'session_id': session.id,
+                        'original_message': request.message,
+                        'invocation_id': invocation_id,  # ← Critical: Save for resuming
+                        'function_call_id': hitl_data.get('_function_call_id'),  # ← Critical: Save for FunctionResponse
+                        'function_name': hitl_data.get('_function_name'),  # ← Critical: Save for FunctionResponse
+                    }
+                    # Add agent's metadata (tool, input_type, etc.)
+                    if hitl_data.get('metadata'):
+                        merged_metadata.update(hitl_data.get('metadata'))
+                
+                    # Create event WITHOUT waiting (non-blocking)
+                    await hitl_service.create_event_async(
+                        user_id=user_ctx.sub,
+                        event_id=event_id,
+                        action_description=hitl_data.get('action_description', 'Unknown action'),
+                        action_data=hitl_data.get('action_data', {}),
+                        metadata=merged_metadata,
+                    )
+                
+                    # Return immediately with HITL pending status
+                    # ADK has already paused the invocation
+                    reply = hitl_data.get('message_to_user', reply)
+                
+                    logger.info(
+                        "HITL event created, returning immediately (invocation paused by ADK)",
+                        event_id=event_id,
+                        invocation_id=invocation_id,
+                        session_id=session.id
+                    )
                 
-                # Skip the rest of the HITL handling (execution will happen after user confirms)
-                # This will be handled in Phase 3 (resume after confirmation)
-                # For now, just return the intermediate reply
-                # NOTE: The old blocking code is removed for Phase 2
-                # Phase 3 will implement resume logic
+                    # Skip the rest of the HITL handling (execution will happen after user confirms)
+                    # This will be handled in Phase 3 (resume after confirmation)
+                    # For now, just return the intermediate reply
+                    # NOTE: The old blocking code is removed for Phase 2
+                    # Phase 3 will implement resume logic
             
-            except Exception as hitl_error:
-                logger.error("HITL event creation failed", error=str(hitl_error), event_id=event_id)
-                reply = f"Action could not be completed: {str(hitl_error)}"
+                except Exception as hitl_error:
+                    logger.error("HITL event creation failed", error=str(hitl_error), event_id=event_id)
+                    reply = f"Action could not be completed: {str(hitl_error)}"
         
-        # Save session to memory after processing
-        try:
-            # RELOAD session to get latest events (including the ones just generated)
-            # The local 'session' object might be stale after run_async
-            session = await session_service.get_session(
-                app_name="personal_assistant",
-                user_id=user_ctx.sub,
-                session_id=session.id,
-            )
+            # Save session to memory after processing
+            try:
+                # RELOAD session to get latest events (including the ones just generated)
+                # The local 'session' object might be stale after run_async
+                session = await session_service.get_session(
+                    app_name="personal_assistant",
+                    user_id=user_ctx.sub,
+                    session_id=session.id,
+                )
             
-            await memory_service.add_session_to_memory(session)
-            logger.info("Session saved to memory (add_message)", session_id=session.id, tenant_id=user_ctx.tenant_id)
-        except Exception as e:
-            logger.error("Failed to save session to memory", error=str(e), session_id=session.id)
+                await memory_service.add_session_to_memory(session)
+                logger.info("Session saved to memory (add_message)", session_id=session.id, tenant_id=user_ctx.tenant_id)
+            except Exception as e:
+                logger.error("Failed to save session to memory", error=str(e), session_id=session.id)
         
-        # Build response metadata - include hitl_data if it's a RecorderTool
-        response_metadata = {**request.metadata}
-        is_recorder_tool_response = (
-            hitl_required and hitl_data and (
-                hitl_data.get('action') == 'start_recording' or
-                bool(hitl_data.get('recorder_url')) or
-                (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
-            )
-        )
-        if is_recorder_tool_response:
-            # Include all RecorderTool fields in metadata for Llibreta
-            logger.info(
-                "Including RecorderTool fields in response metadata",
-                recording_id=hitl_data.get('recording_id'),
-                recorder_url=hitl_data.get('recorder_url')
+            # Build response metadata - include hitl_data if it's a RecorderTool
+            response_metadata = {**request.metadata}
+            is_recorder_tool_response = (
+                hitl_required and hitl_data and (
+                    hitl_data.get('action') == 'start_recording' or
+                    bool(hitl_data.get('recorder_url')) or
+                    (isinstance(hitl_data.get('ui_action'), dict) and hitl_data.get('ui_action', {}).get('type') == 'open_recorder')
+                )
             )
-            response_metadata.update({
-                '_hitl_required': True,
-                'ui_action': hitl_data.get('ui_action'),
-                'recording_id': hitl_data.get('recording_id'),
-                'recorder_url': hitl_data.get('recorder_url'),
-                'recording_type': hitl_data.get('recording_type'),
-                'title': hitl_data.get('title'),
-                'duration_minutes': hitl_data.get('duration_minutes'),
-                'auto_transcribe': hitl_data.get('auto_transcribe'),
-            })
-        
-        # End Langfuse trace (success)
-        end_trace(trace, success=True)
+            if is_recorder_tool_response:
+                # Include all RecorderTool fields in metadata for Llibreta
+                logger.info(
+                    "Including RecorderTool fields in response metadata",
+                    recording_id=hitl_data.get('recording_id'),
+                    recorder_url=hitl_data.get('recorder_url')
+                )
+                response_metadata.update({
+                    '_hitl_required': True,
+                    'ui_action': hitl_data.get('ui_action'),
+                    'recording_id': hitl_data.get('recording_id'),
+                    'recorder_url': hitl_data.get('recorder_url'),
+                    'recording_type': hitl_data.get('recording_type'),
+                    'title': hitl_data.get('title'),
+                    'duration_minutes': hitl_data.get('duration_minutes'),
+                    'auto_transcribe': hitl_data.get('auto_transcribe'),
+                })
         
-        return SessionResponse(
-            session_id=session_id,
-            conversation_id=session_id,
-            reply=reply,
-            metadata=response_metadata,
-            memories=memories,
-            citations=citations,
-            structured_data=structured_data,
-            intent=intent,
-            tool_calls=tool_calls,
-        )
+            response = SessionResponse(
+                session_id=session_id,
+                conversation_id=session_id,
+                reply=reply,
+                metadata=response_metadata,
+                memories=memories,
+                citations=citations,
+                structured_data=structured_data,
+                intent=intent,
+                tool_calls=tool_calls,
+            )
+            return _json_response(response)
         
     except Exception as e:
         import traceback
         logger.error("Failed to add message", error=str(e), session_id=session_id, traceback=traceback.format_exc())
         
-        # End Langfuse trace (error)
-        end_trace(trace, success=False, error=str(e))
-        
         # Fallback to stub response
-        return SessionResponse(
+        response = SessionResponse(
             session_id=session_id,
             conversation_id=session_id,
             reply=f"Received your message: {request.message}. There was an error processing it.",
             metadata={**request.metadata, "error": str(e)},
         )
+        return _json_response(response)
 
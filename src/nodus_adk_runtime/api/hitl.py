@@ -6,9 +6,10 @@ Provides Server-Sent Events for real-time HITL confirmations
 from fastapi import APIRouter, Depends, HTTPException
 from sse_starlette.sse import EventSourceResponse
 import asyncio
-from typing import AsyncGenerator, Dict
+from typing import AsyncGenerator, Union
 import structlog
 import json
+import re
 
 from nodus_adk_runtime.middleware.auth import get_current_user, UserContext
 from nodus_adk_runtime.services.hitl_service import (
@@ -17,22 +18,27 @@ from nodus_adk_runtime.services.hitl_service import (
     HITLDecision,
     get_hitl_service
 )
+from nodus_adk_runtime.services.hitl_queues import (
+    dropped_event_count,
+    get_user_queue,
+    hitl_event_queues,
+)
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/v1/hitl", tags=["hitl"])
 
-# In-memory event queue (per user)
-# In production: use Redis pub/sub
-hitl_event_queues: Dict[str, asyncio.Queue] = {}
+# Pre-serialized "connected" payload: user_id is the only dynamic field
+_CONNECTED_PREFIX = '{"status":"connected","user_id":"'
+_CONNECTED_SUFFIX = '"}'
+_JSON_UNSAFE_RE = re.compile(r'["\\\x00-\x1f]')
 
 
-def get_user_queue(user_id: str) -> asyncio.Queue:
-    """Get or create event queue for user"""
-    if user_id not in hitl_event_queues:
-        hitl_event_queues[user_id] = asyncio.Queue()
-        logger.info("Created event queue for user", user_id=user_id)
-    return hitl_event_queues[user_id]
+def _connected_payload(user_id: str) -> str:
+    """Build the "connected" event data without a dict + json.dumps per client"""
+    if _JSON_UNSAFE_RE.search(user_id):
+        return json.dumps({"status": "connected", "user_id": user_id})
+    return _CONNECTED_PREFIX + user_id + _CONNECTED_SUFFIX
 
 
 @router.get("/events")
@@ -52,56 +58,31 @@ async def hitl_events_stream(
     user_id = user_ctx.sub
     logger.info("HITL SSE client connected", user_id=user_id)
     
-    async def event_generator() -> AsyncGenerator[dict, None]:
-        queue = get_user_queue(user_id)
-        
-        # Send initial connection event
-        yield {
-            "event": "connected",
-            "data": json.dumps({"status": "connected", "user_id": user_id})
-        }
+    async def event_generator() -> AsyncGenerator[Union[dict, bytes], None]:
+        # Each stream gets its own buffer, so every open tab/device sees every event
+        channel = get_user_queue(user_id)
+        queue = channel.subscribe()
         
         try:
+            # Send initial connection event
+            yield {
+                "event": "connected",
+                "data": _connected_payload(user_id)
+            }
+            
             while True:
                 # Wait for events (with timeout for heartbeat)
                 try:
-                    event = await asyncio.wait_for(
+                    # Events arrive as ready-made SSE frames (see HITLEvent.to_sse_bytes)
+                    frame = await asyncio.wait_for(
                         queue.get(),
                         timeout=30.0
                     )
                     
-                    # Obtener event_type (puede ser HITLEvent o SSEEvent para grabaciones)
-                    event_type = getattr(event, 'event_type', None)
-                    if event_type is None:
-                        # Si no tiene event_type, intentar como HITLEvent
-                        if hasattr(event, 'event_type'):
-                            event_type = event.event_type
-                        else:
-                            logger.warning("Event without event_type, skipping", user_id=user_id)
-                            continue
-                    
-                    # Logging (solo para HITL events que tienen event_id)
-                    if hasattr(event, 'event_id'):
-                        logger.info(
-                            "Sending HITL event via SSE",
-                            user_id=user_id,
-                            event_type=event_type,
-                            event_id=event.event_id,
-                            metadata=getattr(event, 'metadata', None),
-                            action_data=getattr(event, 'action_data', None)
-                        )
-                    else:
-                        logger.info(
-                            "Sending recording event via SSE",
-                            user_id=user_id,
-                            event_type=event_type
-                        )
+                    logger.debug("Sending event via SSE", user_id=user_id, size=len(frame))
                     
-                    # Send event to client
-                    yield {
-                        "event": event_type,
-                        "data": event.model_dump_json()
-                    }
+                    # Send event to client as-is, no re-encoding
+                    yield frame
                     
                 except asyncio.TimeoutError:
                     # Heartbeat ping to keep connection alive
@@ -116,6 +97,8 @@ async def hitl_events_stream(
         except Exception as e:
             logger.error("Error in HITL SSE stream", user_id=user_id, error=str(e))
             raise
+        finally:
+            channel.unsubscribe(queue)
     
     return EventSourceResponse(event_generator())
 
@@ -456,5 +439,7 @@ async def hitl_health_check():
     return {
         "status": "healthy",
         "service": "hitl",
-        "active_queues": len(hitl_event_queues)
+        "active_queues": len(hitl_event_queues),
+        "dropped_events": dropped_event_count(),
+        "unknown_decisions": get_hitl_service().unknown_decisions,
     }
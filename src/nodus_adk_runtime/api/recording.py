@@ -5,23 +5,34 @@ Según RECORDING_INTEGRATION_GUIDE.md
 """
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request, Query
-from typing import Optional, Dict, Any
+from typing import IO, Optional, Dict, Any, List, NamedTuple, Set, Tuple
+import asyncio
 import structlog
 import httpx
 import asyncpg
+import hashlib
 import uuid
 import json
-from io import BytesIO
+import orjson
+import os
+import re
+import tempfile
+import time
 import boto3
 from botocore.client import Config
 from botocore.exceptions import ClientError
-from datetime import datetime
-from pydantic import BaseModel, Field
+
+from google.adk.runners import Runner
+from google.genai import types
 
 from ..config import settings
 from ..middleware.auth import get_current_user, UserContext, validate_token
+from ..services.hitl_queues import get_user_queue
+from ..services.hitl_service import sse_frame
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from .hitl import get_user_queue
+from .assistant import _build_agent_for_user, get_session_service
+from .responses import ORJSONResponse
+from .schemas import RecordingCompleteEvent
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/recordings", tags=["recordings"])
@@ -30,6 +41,84 @@ security = HTTPBearer(auto_error=False)
 # Máximo número de caracteres de la transcripción a enviar en la respuesta
 MAX_TRANSCRIPT_PREVIEW_LENGTH = 500
 
+# Texto para el usuario cuando no hay ni transcripción ni resumen utilizable
+UNAVAILABLE_SUMMARY = "No se pudo procesar la grabación. La transcripción no está disponible."
+
+# Decoder reutilizable para extraer el JSON de la respuesta del agente
+_JSON_DECODER = json.JSONDecoder()
+
+# Tamaño de cada parte en el multipart upload a MinIO (mínimo S3: 5 MiB)
+S3_PART_SIZE = 8 * 1024 * 1024
+
+# Por encima de este tamaño el audio pendiente de transcribir se vuelca a disco
+AUDIO_SPOOL_MAX_MEMORY = 16 * 1024 * 1024
+
+# Content type por extensión de archivo de audio
+_EXT_CONTENT_TYPES = {
+    "webm": "audio/webm",
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+}
+
+# Batching de prompts al agente: ventana de espera y tamaño máximo de lote
+AGENT_BATCH_WINDOW_SECONDS = 0.2
+AGENT_BATCH_MAX_SIZE = 16
+
+# Tiempo que se reutiliza el agente construido para un usuario
+AGENT_CACHE_TTL_SECONDS = 300
+
+# Estados de procesamiento de una grabación (columna recordings.status)
+RECORDING_STATUS_PENDING = "pending"
+RECORDING_STATUS_TRANSCRIBING = "transcribing"
+RECORDING_STATUS_PROCESSING = "processing"
+RECORDING_STATUS_DONE = "done"
+RECORDING_STATUS_ERROR = "error"
+
+
+class RecordingJob:
+    """Trabajo de procesamiento de una grabación ya subida a storage"""
+    
+    def __init__(
+        self,
+        recording_id: str,
+        session_id: str,
+        user_id: str,
+        recording_type: str,
+        title: str,
+        duration_seconds: int,
+        user_ctx: UserContext,
+        audio_url: Optional[str] = None,
+        audio_file: Optional[IO[bytes]] = None,
+        filename: Optional[str] = None,
+        content_type: Optional[str] = None,
+        transcript: Optional[str] = None,
+    ):
+        self.recording_id = recording_id
+        self.session_id = session_id
+        self.user_id = user_id
+        self.recording_type = recording_type
+        self.title = title
+        self.duration_seconds = duration_seconds
+        self.user_ctx = user_ctx
+        self.audio_url = audio_url
+        self.audio_file = audio_file
+        self.filename = filename
+        self.content_type = content_type
+        self.transcript = transcript
+
+
+# Cola (acotada) de trabajos + workers en background (arrancados en el lifespan de la app)
+_job_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+# Trabajos que un worker está procesando (para marcarlos como error si se para la app)
+_active_jobs: Set["RecordingJob"] = set()
+
+
+class _TokenCredentials(NamedTuple):
+    """Minimal stand-in for HTTPAuthorizationCredentials (validate_token only reads .credentials)"""
+    credentials: str
+
 
 async def get_current_user_with_query_fallback(
     request: Request,
@@ -42,88 +131,136 @@ async def get_current_user_with_query_fallback(
     This allows the token to be passed either in the Authorization header
     or as a query parameter (for FormData uploads from browser).
     """
-    logger.info("Getting user context", 
-                has_credentials=bool(credentials and credentials.credentials),
-                has_query_token=bool(token),
-                query_params=dict(request.query_params))
+    logger.debug("Getting user context", 
+                 has_credentials=bool(credentials and credentials.credentials),
+                 has_query_token=bool(token))
     
     # Try to get token from Authorization header first
     if credentials and credentials.credentials:
-        logger.info("Using token from Authorization header")
+        logger.debug("Using token from Authorization header")
         return await validate_token(credentials)
     
     # Fallback: try to get token from query string parameter
     if token:
-        logger.info("Using token from query parameter")
-        # Create a mock credentials object for validate_token
-        class MockCredentials:
-            def __init__(self, token: str):
-                self.credentials = token
-        
-        mock_creds = MockCredentials(token)
-        return await validate_token(mock_creds)
-    
-    # Also try to get from query string directly from request (fallback)
-    query_token = request.query_params.get("token")
-    if query_token:
-        logger.info("Using token from request.query_params")
-        class MockCredentials:
-            def __init__(self, token: str):
-                self.credentials = token
-        
-        mock_creds = MockCredentials(query_token)
-        return await validate_token(mock_creds)
+        logger.debug("Using token from query parameter")
+        return await validate_token(_TokenCredentials(token))
     
     # If no token found, raise error
     logger.warning("No token found in request", 
                    method=request.method,
-                   path=request.url.path,
-                   query_params=dict(request.query_params))
+                   path=request.url.path)
     raise HTTPException(
         status_code=401,
         detail="Authentication required. Provide token in Authorization header or 'token' query parameter.",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-# Database connection pool (reuse from memory adapter pattern)
-_db_pool: Optional[asyncpg.Pool] = None
+# Upsert de una grabación; constante de módulo para que asyncpg la prepare una vez
+_SQL_UPSERT_RECORDING = """
+    INSERT INTO recordings (
+        id, session_id, user_id, title, recording_type,
+        duration_seconds, audio_url, transcript, summary,
+        action_items, topics, status, created_at, updated_at
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, NOW(), NOW())
+    ON CONFLICT (id) DO UPDATE SET
+        session_id = EXCLUDED.session_id,
+        user_id = EXCLUDED.user_id,
+        title = EXCLUDED.title,
+        recording_type = EXCLUDED.recording_type,
+        duration_seconds = EXCLUDED.duration_seconds,
+        audio_url = EXCLUDED.audio_url,
+        transcript = EXCLUDED.transcript,
+        summary = EXCLUDED.summary,
+        action_items = EXCLUDED.action_items,
+        topics = EXCLUDED.topics,
+        status = EXCLUDED.status,
+        updated_at = NOW()
+"""
 
 
-async def _get_db_pool() -> asyncpg.Pool:
-    """Get or create database connection pool."""
-    global _db_pool
-    if _db_pool is None:
-        # Convert SQLAlchemy URL to asyncpg format
-        # asyncpg uses postgresql:// not postgresql+asyncpg://
-        db_url = settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
-        _db_pool = await asyncpg.create_pool(db_url)
-        logger.info("Database connection pool created", db_url=db_url.split("@")[1] if "@" in db_url else "***")
-    return _db_pool
+# Estado de una grabación del usuario autenticado (GET /{recording_id})
+_SQL_SELECT_RECORDING_STATUS = """
+    SELECT id, status, title, transcript, summary, action_items, topics, updated_at
+    FROM recordings WHERE id = $1::uuid AND user_id = $2::uuid
+"""
+
+
+# Transiciones intermedias de estado: la fila ya existe (se inserta como pending)
+_SQL_UPDATE_RECORDING_STATUS = """
+    UPDATE recordings SET status = $2, updated_at = NOW() WHERE id = $1::uuid
+"""
+
 
+def _orjson_dumps_str(value: Any) -> str:
+    """orjson.dumps devuelve bytes; los codecs de texto de asyncpg esperan str."""
+    return orjson.dumps(value).decode()
 
-async def save_to_storage(recording_id: str, audio_content: bytes, filename: str, content_type: str, user_ctx: UserContext) -> str:
+
+async def _init_db_connection(conn: asyncpg.Connection) -> None:
+    """Registrar codecs JSON/JSONB: asyncpg codifica listas/dicts directamente."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=_orjson_dumps_str,
+            decoder=orjson.loads,
+            schema="pg_catalog",
+            format="text",
+        )
+
+
+async def create_db_pool() -> Optional[asyncpg.Pool]:
     """
-    Guardar archivo de audio en MinIO.
+    Create the database connection pool (called from the app lifespan).
     
-    Args:
-        recording_id: ID de la grabación
-        audio_content: Contenido del archivo de audio (bytes)
-        filename: Nombre del archivo (ya limpio)
-        content_type: Tipo MIME del archivo
-        user_ctx: Contexto del usuario para autenticación
-        
     Returns:
-        URL del archivo guardado en MinIO (s3://bucket/key)
+        asyncpg pool, or None if DATABASE_URL is not configured or the database
+        is unreachable (only recordings are disabled; the rest of the app starts)
     """
-    logger.info("Saving audio to storage", recording_id=recording_id)
-    
+    if not settings.database_url:
+        logger.warning("DATABASE_URL not configured, recordings persistence disabled")
+        return None
+    # Convert SQLAlchemy URL to asyncpg format
+    # asyncpg uses postgresql:// not postgresql+asyncpg://
+    db_url = settings.database_url.replace("postgresql+asyncpg://", "postgresql://")
     try:
-        # Construir la clave S3
-        s3_key = f"recordings/{recording_id}/{filename}"
-        
-        # Configurar cliente S3 para MinIO
+        # Cache de prepared statements sin caducidad (el SQL es fijo)
+        pool = await asyncpg.create_pool(
+            db_url,
+            init=_init_db_connection,
+            min_size=5,
+            max_size=20,
+            statement_cache_size=1024,
+            max_cached_statement_lifetime=0,
+        )
+    except Exception as e:
+        logger.error(
+            "Failed to create database connection pool, recordings persistence disabled",
+            error=str(e),
+        )
+        return None
+    logger.info("Database connection pool created", db_url=db_url.split("@")[1] if "@" in db_url else "***")
+    return pool
+
+
+def get_db_pool(request: Request) -> asyncpg.Pool:
+    """FastAPI dependency returning the pool created in the app lifespan."""
+    pool = getattr(request.app.state, "db_pool", None)
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return pool
+
+
+# Cliente S3/MinIO compartido (boto3 clients son thread-safe) y buckets ya verificados
+_s3_client: Optional[Any] = None
+_ensured_buckets: Set[str] = set()
+
+
+def get_s3_client() -> Any:
+    """Get or create the shared S3 client for MinIO."""
+    global _s3_client
+    if _s3_client is None:
         # MinIO requiere use_path_style=True para path-style addressing
-        s3_client = boto3.client(
+        _s3_client = boto3.client(
             's3',
             endpoint_url=settings.s3_endpoint_url,
             aws_access_key_id=settings.aws_access_key_id,
@@ -134,47 +271,192 @@ async def save_to_storage(recording_id: str, audio_content: bytes, filename: str
                 s3={'addressing_style': 'path'}
             )
         )
+        logger.info("S3 client created", endpoint_url=settings.s3_endpoint_url)
+    return _s3_client
+
+
+def close_s3_client() -> None:
+    """Close the shared S3 client (called on app shutdown)."""
+    global _s3_client
+    if _s3_client is not None:
+        _s3_client.close()
+        _s3_client = None
+        _ensured_buckets.clear()
+
+
+async def _ensure_bucket(s3_client: Any, bucket: str) -> None:
+    """Asegurar que el bucket existe (head_bucket solo una vez por proceso)."""
+    if bucket in _ensured_buckets:
+        return
+    try:
+        await asyncio.to_thread(s3_client.head_bucket, Bucket=bucket)
+    except ClientError as e:
+        error_code = e.response.get('Error', {}).get('Code', '')
+        if error_code == '404':
+            # Bucket no existe, crearlo
+            logger.info("Creating bucket", bucket=bucket)
+            await asyncio.to_thread(s3_client.create_bucket, Bucket=bucket)
+        else:
+            raise
+    _ensured_buckets.add(bucket)
+
+
+async def save_to_storage(
+    recording_id: str,
+    upload_file: UploadFile,
+    filename: str,
+    content_type: str,
+    user_ctx: UserContext,
+    spool: Optional[IO[bytes]] = None,
+) -> Optional[str]:
+    """
+    Guardar archivo de audio en MinIO en streaming (S3 multipart upload).
+    
+    Lee el UploadFile por trozos de S3_PART_SIZE para que la memoria usada sea
+    O(part_size) y no O(tamaño del archivo). Archivos que caben en un solo trozo
+    se suben con un put_object normal.
+    
+    Args:
+        recording_id: ID de la grabación
+        upload_file: Archivo subido por el cliente
+        filename: Nombre del archivo (ya limpio)
+        content_type: Tipo MIME del archivo
+        user_ctx: Contexto del usuario para autenticación
+        spool: Fichero opcional donde copiar los trozos (p.ej. para transcribir después)
         
-        # Asegurar que el bucket existe
-        try:
-            s3_client.head_bucket(Bucket=settings.s3_bucket)
-        except ClientError as e:
-            error_code = e.response.get('Error', {}).get('Code', '')
-            if error_code == '404':
-                # Bucket no existe, crearlo
-                logger.info("Creating bucket", bucket=settings.s3_bucket)
-                s3_client.create_bucket(Bucket=settings.s3_bucket)
-            else:
-                raise
+    Returns:
+        URL del archivo guardado en MinIO (s3://bucket/key), o None si el archivo está vacío
+    """
+    logger.info("Saving audio to storage", recording_id=recording_id)
+    
+    upload_id = None
+    s3_client = get_s3_client()
+    s3_key = f"recordings/{recording_id}/{filename}"
+    
+    try:
+        await _ensure_bucket(s3_client, settings.s3_bucket)
         
-        # Subir archivo a MinIO
-        s3_client.put_object(
-            Bucket=settings.s3_bucket,
-            Key=s3_key,
-            Body=audio_content,
-            ContentType=content_type
-        )
+        chunk = await upload_file.read(S3_PART_SIZE)
+        if not chunk:
+            logger.warning("Empty audio file, skipping storage", recording_id=recording_id)
+            return None
+        
+        file_size = 0
+        next_chunk = await upload_file.read(S3_PART_SIZE)
+        
+        if not next_chunk:
+            # Un solo trozo: put_object directo, sin multipart
+            if spool is not None:
+                spool.write(chunk)
+            await asyncio.to_thread(
+                s3_client.put_object,
+                Bucket=settings.s3_bucket,
+                Key=s3_key,
+                Body=chunk,
+                ContentType=content_type
+            )
+            file_size = len(chunk)
+        else:
+            upload_id = (await asyncio.to_thread(
+                s3_client.create_multipart_upload,
+                Bucket=settings.s3_bucket,
+                Key=s3_key,
+                ContentType=content_type
+            ))["UploadId"]
+            
+            parts = []
+            part_number = 1
+            while chunk:
+                if spool is not None:
+                    spool.write(chunk)
+                response = await asyncio.to_thread(
+                    s3_client.upload_part,
+                    Bucket=settings.s3_bucket,
+                    Key=s3_key,
+                    PartNumber=part_number,
+                    UploadId=upload_id,
+                    Body=chunk
+                )
+                parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+                file_size += len(chunk)
+                part_number += 1
+                if next_chunk:
+                    chunk, next_chunk = next_chunk, b""
+                else:
+                    chunk = await upload_file.read(S3_PART_SIZE)
+            
+            await asyncio.to_thread(
+                s3_client.complete_multipart_upload,
+                Bucket=settings.s3_bucket,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts}
+            )
+            upload_id = None
+        
+        if spool is not None:
+            spool.seek(0)
         
         audio_url = f"s3://{settings.s3_bucket}/{s3_key}"
         logger.info("Audio saved to storage", 
                    recording_id=recording_id, 
                    audio_url=audio_url,
-                   file_size=len(audio_content),
+                   file_size=file_size,
                    s3_key=s3_key)
         
         return audio_url
         
     except Exception as e:
         logger.error("Failed to save audio to storage", recording_id=recording_id, error=str(e))
+        if upload_id is not None:
+            try:
+                await asyncio.to_thread(
+                    s3_client.abort_multipart_upload,
+                    Bucket=settings.s3_bucket,
+                    Key=s3_key,
+                    UploadId=upload_id
+                )
+            except Exception as abort_error:
+                logger.warning("Failed to abort multipart upload", recording_id=recording_id, error=str(abort_error))
         raise HTTPException(status_code=500, detail=f"Failed to save audio: {str(e)}")
 
 
-async def transcribe_audio(audio_content: bytes, filename: str, content_type: str, user_ctx: UserContext) -> str:
+# Cliente HTTP compartido para backoffice (connection pooling + keep-alive)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared HTTP client used for backoffice calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.transcription_timeout_seconds,
+                connect=settings.transcription_connect_timeout_seconds,
+            ),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+        logger.info("HTTP client created for backoffice")
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def transcribe_audio(audio_file: IO[bytes], filename: str, content_type: str, user_ctx: UserContext) -> str:
     """
     Transcribir audio usando backoffice /api/transcribe.
     
+    El audio se envía en streaming: httpx lee el fichero por trozos al construir
+    el multipart, sin copiarlo entero en memoria.
+    
     Args:
-        audio_content: Contenido del archivo de audio (bytes)
+        audio_file: Fichero con el audio (p.ej. SpooledTemporaryFile), se lee desde el inicio
         filename: Nombre del archivo (ya limpio)
         content_type: Tipo MIME del archivo
         user_ctx: Contexto del usuario para autenticación
@@ -185,56 +467,56 @@ async def transcribe_audio(audio_content: bytes, filename: str, content_type: st
     logger.info("Transcribing audio", filename=filename)
     
     try:
+        # Tamaño sin leer el contenido
+        file_size = audio_file.seek(0, os.SEEK_END)
+        audio_file.seek(0)
+        
         logger.info("Sending audio to backoffice", 
                    filename=filename,
                    content_type=content_type,
-                   file_size=len(audio_content))
+                   file_size=file_size)
         
         # Llamar a backoffice /api/transcribe
         # El backoffice espera recibir el archivo como multipart/form-data
         # con el campo "audio" usando multer
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            # httpx requiere que el contenido del archivo sea un objeto file-like
-            # Usamos BytesIO que es compatible con httpx
-            # El formato es: (filename, file_like_object, content_type)
-            # IMPORTANTE: El objeto BytesIO debe estar en el inicio del stream
-            audio_file = BytesIO(audio_content)
-            audio_file.seek(0)  # Asegurar que estamos al inicio
-            
-            files = {
-                "audio": (filename, audio_file, content_type)
-            }
-            headers = {
-                "Authorization": f"Bearer {user_ctx.raw_token}"
-            }
-            
-            logger.info("Sending transcription request to backoffice",
-                       url=f"{settings.backoffice_url}/api/transcribe",
-                       filename=filename,
-                       content_type=content_type,
-                       file_size=len(audio_content))
-            
-            # No establecer Content-Type manualmente, httpx lo hace automáticamente
-            # para multipart/form-data
-            response = await client.post(
-                f"{settings.backoffice_url}/api/transcribe",
-                files=files,
-                headers=headers
-            )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            logger.info("Backoffice transcription response", 
-                       status_code=response.status_code,
-                       result_keys=list(result.keys()) if isinstance(result, dict) else None,
-                       result_preview=str(result)[:200] if result else None)
-            
-            # El backoffice devuelve 'text', no 'transcript'
-            transcript = result.get("text", result.get("transcript", ""))
-            logger.info("Audio transcribed", filename=filename, transcript_length=len(transcript))
-            
-            return transcript
+        client = get_http_client()
+        
+        # El formato es: (filename, file_like_object, content_type)
+        # httpx lee el objeto file-like por trozos al enviar la petición
+        files = {
+            "audio": (filename, audio_file, content_type)
+        }
+        headers = {
+            "Authorization": f"Bearer {user_ctx.raw_token}"
+        }
+        
+        logger.info("Sending transcription request to backoffice",
+                   url=f"{settings.backoffice_url}/api/transcribe",
+                   filename=filename,
+                   content_type=content_type,
+                   file_size=file_size)
+        
+        # No establecer Content-Type manualmente, httpx lo hace automáticamente
+        # para multipart/form-data
+        response = await client.post(
+            f"{settings.backoffice_url}/api/transcribe",
+            files=files,
+            headers=headers
+        )
+        
+        response.raise_for_status()
+        result = orjson.loads(response.content)
+        
+        # El backoffice devuelve 'text', no 'transcript'
+        transcript = result.get("text", result.get("transcript", ""))
+        
+        logger.info("Backoffice transcription response", 
+                   status_code=response.status_code,
+                   result_keys=list(result.keys()) if isinstance(result, dict) else None,
+                   transcript_preview=transcript[:200] if transcript else None)
+        logger.info("Audio transcribed", filename=filename, transcript_length=len(transcript))
+        
+        return transcript
             
     except httpx.HTTPStatusError as e:
         logger.error("Backoffice transcription failed", status=e.response.status_code, error=e.response.text)
@@ -247,6 +529,173 @@ async def transcribe_audio(audio_content: bytes, filename: str, content_type: st
         raise HTTPException(status_code=500, detail=f"Transcription error: {str(e)}")
 
 
+async def _run_agent_prompt(runner: Any, recording_id: str, prompt: str, user_ctx: UserContext) -> str:
+    """Ejecutar un prompt en una sesión temporal del runner y devolver el texto."""
+    # Crear sesión temporal para este procesamiento
+    session_id = f"recording_{recording_id}_{uuid.uuid4().hex[:8]}"
+    session = await runner.session_service.create_session(
+        app_name="personal_assistant",
+        user_id=user_ctx.sub,
+        session_id=session_id,
+        state={'tenant_id': user_ctx.tenant_id or 'default'},
+    )
+    
+    # Ejecutar agente con el prompt
+    user_content = types.Content(
+        role="user",
+        parts=[types.Part.from_text(text=prompt)],
+    )
+    
+    # Ejecutar y obtener respuesta
+    response_parts = []
+    async for event in runner.run_async(
+        user_id=user_ctx.sub,
+        session_id=session.id,
+        new_message=user_content,
+    ):
+        if hasattr(event, "content") and event.content:
+            for part in event.content.parts:
+                if hasattr(part, "text") and part.text:
+                    response_parts.append(part.text)
+    
+    return "".join(response_parts)
+
+
+# Cache de agentes por (user, tenant, huella del token, scopes): {key: (agent, memory_service, expires_at)}
+# El agente y su memory service llevan el token y los permisos con los que se construyeron:
+# un token nuevo (renovado, con otros scopes o rol) construye su propio agente
+_agent_cache: Dict[Tuple[str, Optional[str], bytes, Tuple[str, ...]], Tuple[Any, Any, float]] = {}
+
+
+async def _get_agent_for_user(user_ctx: UserContext) -> Tuple[Any, Any]:
+    """
+    Devolver (agent, memory_service) para el usuario, reutilizando el construido
+    en los últimos AGENT_CACHE_TTL_SECONDS.
+    """
+    key = (
+        user_ctx.sub,
+        user_ctx.tenant_id,
+        hashlib.sha256(user_ctx.raw_token.encode()).digest(),
+        tuple(user_ctx.scopes),
+    )
+    now = time.monotonic()
+    cached = _agent_cache.get(key)
+    if cached is not None and cached[2] > now:
+        return cached[0], cached[1]
+    
+    agent, memory_service = await _build_agent_for_user(user_ctx)
+    _agent_cache[key] = (agent, memory_service, now + AGENT_CACHE_TTL_SECONDS)
+    
+    # Purgar entradas caducadas para que el cache no crezca sin límite
+    for expired_key in [k for k, v in _agent_cache.items() if v[2] <= now]:
+        del _agent_cache[expired_key]
+    
+    return agent, memory_service
+
+
+class _AgentBatcher:
+    """
+    Agrupa los prompts de grabaciones que llegan a la vez.
+    
+    Cada AGENT_BATCH_WINDOW_SECONDS (o al llegar a AGENT_BATCH_MAX_SIZE prompts)
+    recoge los pendientes, construye UN agente + Runner por usuario y ejecuta
+    sus prompts en paralelo con asyncio.gather sobre ese runner compartido.
+    Cada lote de usuario corre en su propia tarea: el colector vuelve a leer
+    la cola enseguida y un lote lento no retiene las grabaciones de los demás.
+    """
+    
+    def __init__(self, max_size: int = AGENT_BATCH_MAX_SIZE, window: float = AGENT_BATCH_WINDOW_SECONDS):
+        self.max_size = max_size
+        self.window = window
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch_tasks: Set[asyncio.Task] = set()
+    
+    async def submit(self, recording_id: str, prompt: str, user_ctx: UserContext) -> str:
+        """Encolar un prompt y esperar su respuesta."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+        
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        await self._queue.put((recording_id, prompt, user_ctx, future))
+        return await future
+    
+    async def stop(self) -> None:
+        """Parar el bucle de batching y los lotes en curso."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        batch_tasks = list(self._batch_tasks)
+        for task in batch_tasks:
+            task.cancel()
+        if batch_tasks:
+            await asyncio.gather(*batch_tasks, return_exceptions=True)
+        self._batch_tasks.clear()
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Agrupar por usuario y token: un agente/runner por credenciales y lote
+            by_user: Dict[Tuple[str, str], list] = {}
+            for item in batch:
+                by_user.setdefault((item[2].sub, item[2].raw_token), []).append(item)
+            
+            logger.info("Processing agent batch", batch_size=len(batch), users=len(by_user))
+            for items in by_user.values():
+                task = asyncio.create_task(self._run_user_batch(items))
+                self._batch_tasks.add(task)
+                task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _run_user_batch(self, items: list) -> None:
+        try:
+            # Invocar agente usando el mismo patrón que assistant.py
+            # Agente para el usuario (cacheado entre lotes, ver _get_agent_for_user)
+            agent, memory_service = await _get_agent_for_user(items[0][2])
+            runner = Runner(
+                app_name="personal_assistant",
+                agent=agent,
+                session_service=get_session_service(),
+                memory_service=memory_service,
+            )
+            
+            results = await asyncio.gather(
+                *(_run_agent_prompt(runner, recording_id, prompt, user_ctx)
+                  for recording_id, prompt, user_ctx, _ in items),
+                return_exceptions=True,
+            )
+        except asyncio.CancelledError:
+            # Parada: no dejar a nadie esperando una respuesta que no llegará
+            for _, _, _, future in items:
+                future.cancel()
+            raise
+        except Exception as e:
+            results = [e] * len(items)
+        
+        for (_, _, _, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_agent_batcher = _AgentBatcher()
+
+
 async def process_with_agent(
     recording_id: str,
     transcript: str,
@@ -289,51 +738,8 @@ Responde en formato JSON:
   "topics": ["tema1", "tema2"]
 }}"""
 
-        # Invocar agente usando el mismo patrón que assistant.py
-        from google.adk.runners import Runner
-        from google.genai import types
-        from ..api.assistant import _build_agent_for_user
-        
-        # Construir agente para el usuario
-        agent, memory_service = await _build_agent_for_user(user_ctx)
-        
-        # Crear runner
-        from ..api.assistant import get_session_service
-        session_service = get_session_service()
-        
-        runner = Runner(
-            app_name="personal_assistant",
-            agent=agent,
-            session_service=session_service,
-            memory_service=memory_service,
-        )
-        
-        # Crear sesión temporal para este procesamiento
-        session_id = f"recording_{recording_id}_{uuid.uuid4().hex[:8]}"
-        session = await runner.session_service.create_session(
-            app_name="personal_assistant",
-            user_id=user_ctx.sub,
-            session_id=session_id,
-            state={'tenant_id': user_ctx.tenant_id or 'default'},
-        )
-        
-        # Ejecutar agente con el prompt
-        user_content = types.Content(
-            role="user",
-            parts=[types.Part.from_text(text=prompt)],
-        )
-        
-        # Ejecutar y obtener respuesta
-        response_text = ""
-        async for event in runner.run_async(
-            user_id=user_ctx.sub,
-            session_id=session.id,
-            new_message=user_content,
-        ):
-            if hasattr(event, "content") and event.content:
-                for part in event.content.parts:
-                    if hasattr(part, "text") and part.text:
-                        response_text += part.text
+        # Ejecutar en lote con otras grabaciones pendientes (runner compartido por usuario)
+        response_text = await _agent_batcher.submit(recording_id, prompt, user_ctx)
         
         # Parsear respuesta JSON
         logger.info("Agent response received", 
@@ -341,12 +747,15 @@ Responde en formato JSON:
                    response_length=len(response_text),
                    response_preview=response_text[:500] if response_text else None)
         
+        result = None
         try:
-            # Intentar extraer JSON de la respuesta
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
+            # Intentar extraer JSON de la respuesta: decodificar desde el primer '{'
+            # (raw_decode es O(n) y admite texto extra después del objeto)
+            json_start = response_text.find("{")
+            if json_start >= 0:
+                result, _ = _JSON_DECODER.raw_decode(response_text, json_start)
+                if not isinstance(result, dict):
+                    raise json.JSONDecodeError("Expected a JSON object", response_text, json_start)
                 logger.info("JSON parsed successfully", 
                            recording_id=recording_id,
                            has_summary="summary" in result,
@@ -355,17 +764,15 @@ Responde en formato JSON:
             else:
                 # Si no hay JSON, crear estructura básica
                 logger.warning("No JSON found in response, using fallback", recording_id=recording_id)
-                result = {
-                    "summary": response_text[:200] if response_text else "No se pudo generar resumen",
-                    "action_items": [],
-                    "topics": []
-                }
         except json.JSONDecodeError as e:
             # Si falla el parseo, crear estructura básica
             logger.warning("JSON parsing failed, using fallback", 
                          recording_id=recording_id,
                          error=str(e),
-                         json_match_preview=json_match.group()[:200] if json_match else None)
+                         json_preview=response_text[json_start:json_start + 200])
+            result = None
+        
+        if result is None:
             result = {
                 "summary": response_text[:200] if response_text else "No se pudo generar resumen",
                 "action_items": [],
@@ -392,7 +799,32 @@ Responde en formato JSON:
         }
 
 
+_UUID_RE = re.compile(
+    r"\A[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z", re.IGNORECASE
+)
+
+
+def _ensure_uuid(value: str, field: str) -> str:
+    """Devolver value si es un UUID válido; si no, generar uno nuevo."""
+    if _UUID_RE.match(value):
+        return value
+    logger.warning(f"{field} is not a valid UUID, generating new one", **{field: value})
+    return str(uuid.uuid4())
+
+
+def _owner_id(user_ctx: UserContext) -> Optional[str]:
+    """Propietario de las grabaciones: el sub del token si es un UUID (None si no)."""
+    return user_ctx.sub if _UUID_RE.match(user_ctx.sub) else None
+
+
+async def _set_status(pool: asyncpg.Pool, recording_id: str, status: str) -> None:
+    """Actualizar solo el estado de una grabación ya registrada."""
+    await pool.execute(_SQL_UPDATE_RECORDING_STATUS, recording_id, status)
+    logger.info("Recording status updated", recording_id=recording_id, status=status)
+
+
 async def save_to_database(
+    pool: asyncpg.Pool,
     recording_id: str,
     session_id: str,
     user_id: str,
@@ -404,11 +836,13 @@ async def save_to_database(
     summary: Optional[str],
     action_items: list,
     topics: list,
-) -> None:
+    status: str = RECORDING_STATUS_DONE,
+) -> str:
     """
     Guardar grabación en tabla recordings de PostgreSQL.
     
     Args:
+        pool: Pool de conexiones asyncpg
         recording_id: ID de la grabación (se usa como UUID primary key)
         session_id: ID de la sesión (text/UUID)
         user_id: ID del usuario (text/UUID)
@@ -420,73 +854,136 @@ async def save_to_database(
         summary: Resumen
         action_items: Lista de action items
         topics: Lista de temas
+        status: Estado del procesamiento (pending/transcribing/processing/done/error)
+        
+    Returns:
+        recording_id efectivo (puede cambiar si el original no era un UUID válido)
     """
-    logger.info("Saving recording to database", recording_id=recording_id)
+    logger.info("Saving recording to database", recording_id=recording_id, status=status)
     
     try:
-        pool = await _get_db_pool()
+        # Validar que los IDs sean UUIDs válidos, si no, generar uno nuevo
+        recording_id = _ensure_uuid(recording_id, "recording_id")
+        session_id = _ensure_uuid(session_id, "session_id")
+        user_id = _ensure_uuid(user_id, "user_id")
         
-        # Validar que recording_id sea un UUID válido, si no, generar uno
-        try:
-            uuid.UUID(recording_id)
-        except ValueError:
-            # Si no es un UUID válido, generar uno nuevo
-            logger.warning("recording_id is not a valid UUID, generating new one", recording_id=recording_id)
-            recording_id = str(uuid.uuid4())
+        await pool.execute(
+            _SQL_UPSERT_RECORDING,
+            recording_id,
+            session_id,
+            user_id,
+            title,
+            recording_type,
+            duration_seconds,
+            audio_url,
+            transcript,
+            summary,
+            action_items or [],
+            topics or [],
+            status,
+        )
         
-        # Validar que session_id sea un UUID válido, si no, generar uno
-        try:
-            uuid.UUID(session_id)
-        except ValueError:
-            # Si no es un UUID válido, generar uno nuevo
-            logger.warning("session_id is not a valid UUID, generating new one", session_id=session_id)
-            session_id = str(uuid.uuid4())
+        logger.info("Recording saved to database", recording_id=recording_id, status=status)
+        return recording_id
         
-        # Validar que user_id sea un UUID válido, si no, generar uno
-        try:
-            uuid.UUID(user_id)
-        except ValueError:
-            # Si no es un UUID válido, generar uno nuevo
-            logger.warning("user_id is not a valid UUID, generating new one", user_id=user_id)
-            user_id = str(uuid.uuid4())
+    except Exception as e:
+        logger.error("Failed to save recording to database", recording_id=recording_id, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Failed to save to database: {str(e)}")
+
+
+# Columnas (en orden) de las filas que acepta save_many_to_database
+RECORDING_COPY_COLUMNS = (
+    "id", "session_id", "user_id", "title", "recording_type",
+    "duration_seconds", "audio_url", "transcript", "summary",
+    "action_items", "topics", "status",
+)
+
+# Tabla temporal con los tipos de recordings pero sin constraints
+_SQL_CREATE_RECORDINGS_IMPORT = """
+    CREATE TEMP TABLE _recordings_import ON COMMIT DROP AS
+    SELECT
+        id, session_id, user_id, title, recording_type,
+        duration_seconds, audio_url, transcript, summary,
+        action_items::text AS action_items, topics::text AS topics, status
+    FROM recordings
+    WITH NO DATA
+"""
+
+_SQL_UPSERT_RECORDINGS_FROM_IMPORT = """
+    INSERT INTO recordings (
+        id, session_id, user_id, title, recording_type,
+        duration_seconds, audio_url, transcript, summary,
+        action_items, topics, status, created_at, updated_at
+    )
+    SELECT
+        id, session_id, user_id, title, recording_type,
+        duration_seconds, audio_url, transcript, summary,
+        action_items::jsonb, topics::jsonb, status, NOW(), NOW()
+    FROM _recordings_import
+    ON CONFLICT (id) DO UPDATE SET
+        session_id = EXCLUDED.session_id,
+        user_id = EXCLUDED.user_id,
+        title = EXCLUDED.title,
+        recording_type = EXCLUDED.recording_type,
+        duration_seconds = EXCLUDED.duration_seconds,
+        audio_url = EXCLUDED.audio_url,
+        transcript = EXCLUDED.transcript,
+        summary = EXCLUDED.summary,
+        action_items = EXCLUDED.action_items,
+        topics = EXCLUDED.topics,
+        status = EXCLUDED.status,
+        updated_at = NOW()
+"""
+
+
+async def save_many_to_database(pool: asyncpg.Pool, rows: List[tuple]) -> int:
+    """
+    Guardar muchas grabaciones de golpe (p.ej. backfill de históricos).
+    
+    Usa COPY (protocolo binario) a una tabla temporal y un único
+    INSERT ... SELECT ... ON CONFLICT, con la misma semántica de upsert que
+    save_to_database pero en un solo round-trip por lote.
+    
+    Args:
+        pool: Pool de conexiones asyncpg
+        rows: Tuplas en el orden de RECORDING_COPY_COLUMNS; action_items y topics
+            como listas. Los IDs deben ser UUIDs válidos (no se regeneran).
         
+    Returns:
+        Número de filas guardadas
+    """
+    if not rows:
+        return 0
+    
+    action_items_idx = RECORDING_COPY_COLUMNS.index("action_items")
+    topics_idx = RECORDING_COPY_COLUMNS.index("topics")
+    
+    # Las columnas JSON van como texto en la tabla temporal (COPY binario no usa los codecs de texto)
+    records = []
+    for row in rows:
+        record = list(row)
+        record[action_items_idx] = _orjson_dumps_str(record[action_items_idx] or [])
+        record[topics_idx] = _orjson_dumps_str(record[topics_idx] or [])
+        records.append(record)
+    
+    logger.info("Saving recordings batch to database", count=len(records))
+    
+    try:
         async with pool.acquire() as conn:
-            await conn.execute("""
-                INSERT INTO recordings (
-                    id, session_id, user_id, title, recording_type,
-                    duration_seconds, audio_url, transcript, summary,
-                    action_items, topics, created_at, updated_at
-                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, NOW(), NOW())
-                ON CONFLICT (id) DO UPDATE SET
-                    session_id = EXCLUDED.session_id,
-                    user_id = EXCLUDED.user_id,
-                    title = EXCLUDED.title,
-                    recording_type = EXCLUDED.recording_type,
-                    duration_seconds = EXCLUDED.duration_seconds,
-                    audio_url = EXCLUDED.audio_url,
-                    transcript = EXCLUDED.transcript,
-                    summary = EXCLUDED.summary,
-                    action_items = EXCLUDED.action_items,
-                    topics = EXCLUDED.topics,
-                    updated_at = NOW()
-            """,
-                recording_id,
-                session_id,
-                user_id,
-                title,
-                recording_type,
-                duration_seconds,
-                audio_url,
-                transcript,
-                summary,
-                json.dumps(action_items) if action_items else "[]",
-                json.dumps(topics) if topics else "[]",
-            )
+            async with conn.transaction():
+                await conn.execute(_SQL_CREATE_RECORDINGS_IMPORT)
+                await conn.copy_records_to_table(
+                    "_recordings_import",
+                    records=records,
+                    columns=RECORDING_COPY_COLUMNS,
+                )
+                await conn.execute(_SQL_UPSERT_RECORDINGS_FROM_IMPORT)
         
-        logger.info("Recording saved to database", recording_id=recording_id)
+        logger.info("Recordings batch saved to database", count=len(records))
+        return len(records)
         
     except Exception as e:
-        logger.error("Failed to save recording to database", recording_id=recording_id, error=str(e))
+        logger.error("Failed to save recordings batch to database", count=len(records), error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to save to database: {str(e)}")
 
 
@@ -522,54 +1019,25 @@ async def notify_completion(
         # Obtener la cola de eventos del usuario (mismo sistema que HITL)
         queue = get_user_queue(user_id)
         
-        # Usar transcripción truncada en lugar del resumen si está disponible
-        # Priorizar transcript SIEMPRE, especialmente si el agente falló o el summary contiene un error
-        agent_failed = result.get("agent_failed", False)
-        summary_text = result.get("summary", "")
-        is_error_summary = "Error al procesar" in summary_text or "error" in summary_text.lower()
-        
-        # Si hay transcripción disponible, usarla siempre (especialmente si el agente falló)
+        # Texto a mostrar: transcripción truncada si existe (ver _display_summary)
+        display_summary = _display_summary(result, transcript)
         if transcript and transcript.strip():
-            # Truncar transcripción al principio hasta MAX_TRANSCRIPT_PREVIEW_LENGTH caracteres
-            transcript_preview = transcript[:MAX_TRANSCRIPT_PREVIEW_LENGTH]
-            if len(transcript) > MAX_TRANSCRIPT_PREVIEW_LENGTH:
-                transcript_preview += "..."
-            display_summary = transcript_preview
             logger.info(
                 "Using transcript for display_summary",
                 user_id=user_id,
                 recording_id=recording_id,
                 transcript_length=len(transcript),
-                agent_failed=agent_failed
+                agent_failed=result.get("agent_failed", False)
             )
-        elif agent_failed or is_error_summary:
-            # Si el agente falló y no hay transcripción, usar un mensaje más amigable
-            display_summary = "No se pudo procesar la grabación. La transcripción no está disponible."
+        elif display_summary != result.get("summary", ""):
             logger.warning(
                 "Agent failed and no transcript available",
                 user_id=user_id,
                 recording_id=recording_id,
-                agent_failed=agent_failed,
-                is_error_summary=is_error_summary
+                agent_failed=result.get("agent_failed", False)
             )
-        else:
-            # Fallback: usar el summary del agente si no hay transcripción
-            display_summary = summary_text
         
-        # Crear evento de grabación completada
         # El frontend espera un evento SSE con event="recording_complete" y data como JSON
-        # Necesitamos crear un objeto similar a HITLEvent pero para grabaciones
-        class RecordingCompleteEvent(BaseModel):
-            """Evento de grabación completada para SSE"""
-            type: str = "recording_complete"
-            recording_id: str
-            session_id: str
-            title: str
-            summary: str
-            action_items: list
-            topics: list
-            timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
-        
         event = RecordingCompleteEvent(
             recording_id=recording_id,
             session_id=session_id,
@@ -578,24 +1046,10 @@ async def notify_completion(
             action_items=result.get("action_items", []),
             topics=result.get("topics", []),
         )
+        frame = sse_frame("recording_complete", orjson.dumps(event.model_dump()))
         
-        # Crear un objeto compatible con el sistema SSE
-        # El sistema SSE espera objetos con event_type y model_dump_json()
-        class SSEEvent:
-            def __init__(self, event_type: str, data: dict):
-                self.event_type = event_type
-                self._data = data
-            
-            def model_dump_json(self) -> str:
-                return json.dumps(self._data)
-        
-        sse_event = SSEEvent(
-            event_type="recording_complete",
-            data=event.model_dump()
-        )
-        
-        # Enviar evento a la cola (será entregado vía SSE)
-        await queue.put(sse_event)
+        # Enviar el frame SSE ya codificado a la cola (será entregado vía SSE)
+        queue.put_nowait(frame)
         
         logger.info(
             "Recording completion event queued for SSE",
@@ -615,7 +1069,228 @@ async def notify_completion(
         # No lanzar excepción - la notificación es opcional, no debe romper el flujo
 
 
-@router.post("/complete")
+def _display_summary(result: Dict[str, Any], transcript: Optional[str]) -> str:
+    """
+    Texto a mostrar al usuario: transcripción truncada si existe, si no el summary.
+    
+    Prioriza la transcripción SIEMPRE, especialmente si el agente falló o el summary
+    contiene un error.
+    """
+    agent_failed = result.get("agent_failed", False)
+    summary_text = result.get("summary", "")
+    is_error_summary = "Error al procesar" in summary_text or "error" in summary_text.lower()
+    
+    if transcript and transcript.strip():
+        transcript_preview = transcript[:MAX_TRANSCRIPT_PREVIEW_LENGTH]
+        if len(transcript) > MAX_TRANSCRIPT_PREVIEW_LENGTH:
+            transcript_preview += "..."
+        return transcript_preview
+    if agent_failed or is_error_summary:
+        return UNAVAILABLE_SUMMARY
+    return summary_text
+
+
+async def _process_job(job: RecordingJob, pool: asyncpg.Pool) -> None:
+    """
+    Procesar una grabación en background.
+    
+    Flujo:
+    1. Transcribir si es necesario
+    2. Procesar con agent
+    3. Guardar en DB
+    4. Notificar a Llibreta vía SSE
+    """
+    recording_id = job.recording_id
+    transcript = job.transcript
+    
+    try:
+        # 1. Transcribir si necesario (manejar errores de rate limit)
+        if not transcript and job.audio_file is not None:
+            await _set_status(pool, recording_id, RECORDING_STATUS_TRANSCRIBING)
+            try:
+                transcript = await transcribe_audio(job.audio_file, job.filename, job.content_type, job.user_ctx)
+            except HTTPException as e:
+                if e.status_code == 429 or "rate limit" in str(e.detail).lower():
+                    logger.warning("Transcription rate limited, continuing without transcript", recording_id=recording_id)
+                    transcript = None
+                else:
+                    raise
+            finally:
+                # Liberar el audio (memoria o fichero temporal) en cuanto ya no hace falta
+                job.audio_file.close()
+                job.audio_file = None
+        
+        # 2. Procesar con agent (solo si hay una transcripción con contenido suficiente)
+        await _set_status(pool, recording_id, RECORDING_STATUS_PROCESSING)
+        if transcript and len(transcript.strip()) >= settings.min_transcript_chars_for_agent:
+            result = await process_with_agent(
+                recording_id=recording_id,
+                transcript=transcript,
+                duration=job.duration_seconds,
+                user_ctx=job.user_ctx,
+            )
+        else:
+            # Sin transcripción útil no vale la pena gastar una llamada al LLM
+            logger.info(
+                "Transcript missing or too short, skipping agent",
+                recording_id=recording_id,
+                transcript_length=len(transcript) if transcript else 0,
+            )
+            # Sin transcripción tampoco hay nada que mostrar: el mensaje para el usuario
+            # se guarda como summary para que GET /{recording_id} lo devuelva igual que el SSE
+            if transcript and transcript.strip():
+                result = {"summary": "", "action_items": [], "topics": []}
+            else:
+                result = {"summary": UNAVAILABLE_SUMMARY, "action_items": [], "topics": [], "agent_failed": True}
+        
+        # 3. Guardar en DB
+        await save_to_database(
+            pool,
+            recording_id=recording_id,
+            session_id=job.session_id,
+            user_id=job.user_id,
+            title=job.title,
+            recording_type=job.recording_type,
+            duration_seconds=job.duration_seconds,
+            audio_url=job.audio_url,
+            transcript=transcript,
+            summary=result.get("summary"),
+            action_items=result.get("action_items", []),
+            topics=result.get("topics", []),
+            status=RECORDING_STATUS_DONE,
+        )
+        
+        # 4. Notificar vía SSE (mismo sistema que HITL)
+        # Usar user_ctx.sub en lugar de user_id del Form para que coincida con el SSE
+        await notify_completion(
+            session_id=job.session_id,
+            user_id=job.user_ctx.sub,  # Usar el user_id del contexto autenticado, no del Form
+            recording_id=recording_id,
+            title=job.title,
+            result=result,
+            transcript=transcript
+        )
+        
+    except Exception as e:
+        logger.error("Error processing recording job", error=str(e), recording_id=recording_id)
+        await _fail_job(job, pool, transcript)
+
+
+async def _fail_job(job: RecordingJob, pool: asyncpg.Pool, transcript: Optional[str] = None) -> None:
+    """Liberar el audio del trabajo y marcar la grabación como error (sin lanzar)."""
+    if job.audio_file is not None:
+        job.audio_file.close()
+        job.audio_file = None
+    try:
+        await save_to_database(
+            pool,
+            recording_id=job.recording_id,
+            session_id=job.session_id,
+            user_id=job.user_id,
+            title=job.title,
+            recording_type=job.recording_type,
+            duration_seconds=job.duration_seconds,
+            audio_url=job.audio_url,
+            transcript=transcript if transcript is not None else job.transcript,
+            summary=None,
+            action_items=[],
+            topics=[],
+            status=RECORDING_STATUS_ERROR,
+        )
+    except Exception as db_error:
+        logger.error("Failed to mark recording as errored", error=str(db_error), recording_id=job.recording_id)
+
+
+async def _worker(queue: asyncio.Queue, pool: asyncpg.Pool, worker_id: int) -> None:
+    """Consumir trabajos de la cola hasta que se cancele el worker."""
+    logger.info("Recording worker started", worker_id=worker_id)
+    while True:
+        job = await queue.get()
+        _active_jobs.add(job)
+        try:
+            await _process_job(job, pool)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # _process_job ya captura sus errores; esto es solo una red de seguridad
+            logger.error("Recording worker error", worker_id=worker_id, error=str(e))
+        finally:
+            _active_jobs.discard(job)
+            queue.task_done()
+
+
+async def start_recording_workers(pool: Optional[asyncpg.Pool], count: Optional[int] = None) -> None:
+    """
+    Arrancar los workers de procesamiento de grabaciones (desde el lifespan).
+    
+    Idempotente: si ya hay workers vivos no hace nada. La columna recordings.status
+    la crea la migración scripts/migrations/add_recordings_status.sql.
+    
+    Args:
+        pool: Pool de conexiones creado en el lifespan (None = sin base de datos)
+        count: Número de workers (por defecto settings.recording_worker_count)
+    """
+    global _job_queue
+    if pool is None:
+        logger.warning("No database pool, recording workers not started")
+        return
+    if _workers and not all(w.done() for w in _workers):
+        return
+    
+    if _job_queue is None:
+        _job_queue = asyncio.Queue(maxsize=settings.recording_queue_max_size)
+    
+    count = count or settings.recording_worker_count
+    _workers.clear()
+    for worker_id in range(count):
+        _workers.append(asyncio.create_task(_worker(_job_queue, pool, worker_id)))
+    logger.info("Recording workers started", count=count)
+
+
+async def stop_recording_workers(pool: Optional[asyncpg.Pool] = None) -> None:
+    """
+    Cancelar los workers de procesamiento de grabaciones.
+    
+    Los trabajos interrumpidos y los que seguían en cola no se van a procesar:
+    se cierra su audio y, si hay pool, su grabación se marca como error en lugar
+    de quedarse en pending para siempre.
+    """
+    unfinished = list(_active_jobs)
+    for worker in _workers:
+        worker.cancel()
+    if _workers:
+        await asyncio.gather(*_workers, return_exceptions=True)
+        logger.info("Recording workers stopped", count=len(_workers))
+    _workers.clear()
+    _active_jobs.clear()
+    await _agent_batcher.stop()
+    
+    if _job_queue is not None:
+        while not _job_queue.empty():
+            unfinished.append(_job_queue.get_nowait())
+            _job_queue.task_done()
+    if unfinished:
+        logger.warning("Recording jobs left unprocessed at shutdown", count=len(unfinished))
+    for job in unfinished:
+        if pool is not None:
+            await _fail_job(job, pool)
+        elif job.audio_file is not None:
+            job.audio_file.close()
+            job.audio_file = None
+
+
+async def _enqueue_job(job: RecordingJob) -> None:
+    """Encolar un trabajo para los workers arrancados en el lifespan (503 si no caben más)."""
+    if _job_queue is None:
+        raise HTTPException(status_code=503, detail="Recording workers not running")
+    try:
+        _job_queue.put_nowait(job)
+    except asyncio.QueueFull:
+        logger.warning("Recording job queue full", recording_id=job.recording_id, max_size=_job_queue.maxsize)
+        raise HTTPException(status_code=503, detail="Too many recordings being processed, retry later")
+
+
+@router.post("/complete", status_code=202)
 async def recording_complete(
     request: Request,
     recording_id: str = Form(...),
@@ -630,21 +1305,31 @@ async def recording_complete(
     """
     Endpoint llamado por nodus-recorder-pwa cuando completa la grabación.
     
-    Flujo:
-    1. Guardar archivo en storage
-    2. Transcribir si es necesario
-    3. Procesar con agent
-    4. Guardar en DB
-    5. Notificar a Llibreta
+    Solo hace la parte síncrona (auth + guardar en storage) y devuelve 202.
+    La transcripción, el agent, la DB y la notificación SSE se hacen en
+    background (ver _process_job). El estado se consulta en GET /{recording_id}.
+    
+    Los IDs se normalizan una sola vez aquí: la fila y el trabajo usan los mismos
+    valores en todas las escrituras. El propietario es el sub del token (el user_id
+    del Form solo se usa si el sub no es un UUID).
     """
     # Get user context manually to handle FormData + query params
     # FastAPI may have issues reading query params when FormData is present
     try:
-        user_ctx = await get_current_user_with_query_fallback(request, None, None)
+        user_ctx = await get_current_user_with_query_fallback(
+            request, None, request.query_params.get("token")
+        )
     except HTTPException as e:
         logger.error("Authentication failed", status_code=e.status_code, detail=e.detail)
         raise
     
+    # Después de autenticar: sin token es un 401, aunque la DB no esté disponible
+    pool = get_db_pool(request)
+    
+    recording_id = _ensure_uuid(recording_id, "recording_id")
+    session_id = _ensure_uuid(session_id, "session_id")
+    user_id = _owner_id(user_ctx) or _ensure_uuid(user_id, "user_id")
+    
     logger.info(
         "Recording completed",
         recording_id=recording_id,
@@ -656,57 +1341,40 @@ async def recording_complete(
     )
     
     try:
-        # Leer contenido del archivo una sola vez (si existe)
-        audio_content = None
         clean_filename = None
         content_type = None
         
         if audio_file:
-            # Leer contenido
-            audio_content = await audio_file.read()
-            
             # Limpiar el nombre del archivo (remover codecs como ;codecs=opus)
             clean_filename = audio_file.filename or "audio.webm"
             if ";" in clean_filename:
                 clean_filename = clean_filename.split(";")[0]
             
             # Determinar content type basado en la extensión
-            content_type = audio_file.content_type or "audio/webm"
-            if clean_filename.endswith('.webm'):
-                content_type = "audio/webm"
-            elif clean_filename.endswith('.mp3'):
-                content_type = "audio/mpeg"
-            elif clean_filename.endswith('.wav'):
-                content_type = "audio/wav"
-            elif clean_filename.endswith('.ogg'):
-                content_type = "audio/ogg"
-        
-        # 1. Guardar archivo
-        audio_url = None
-        if audio_content:
-            audio_url = await save_to_storage(recording_id, audio_content, clean_filename, content_type, user_ctx)
+            extension = clean_filename.rpartition(".")[2].lower()
+            content_type = _EXT_CONTENT_TYPES.get(extension) or audio_file.content_type or "audio/webm"
         
-        # 2. Transcribir si necesario (manejar errores de rate limit)
-        if not transcript and audio_content:
+        # Guardar archivo en streaming (síncrono: el cliente no debe perder el audio)
+        # Solo si hay que transcribir, los trozos se copian a un SpooledTemporaryFile:
+        # los archivos grandes se vuelcan a disco en lugar de quedarse en RAM
+        audio_url = None
+        spool = None
+        if audio_file:
+            if not transcript:
+                spool = tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_MAX_MEMORY)
             try:
-                transcript = await transcribe_audio(audio_content, clean_filename, content_type, user_ctx)
-            except HTTPException as e:
-                if e.status_code == 429 or "rate limit" in str(e.detail).lower():
-                    logger.warning("Transcription rate limited, continuing without transcript", recording_id=recording_id)
-                    transcript = None
-                else:
-                    raise
-        
-        # 3. Procesar con agent (solo si hay transcripción o si no es requerida)
-        result = await process_with_agent(
-            recording_id=recording_id,
-            transcript=transcript or "",
-            duration=duration_seconds,
-            user_ctx=user_ctx,
-        )
+                audio_url = await save_to_storage(recording_id, audio_file, clean_filename, content_type, user_ctx, spool=spool)
+            except Exception:
+                if spool is not None:
+                    spool.close()
+                raise
+            if audio_url is None and spool is not None:
+                spool.close()
+                spool = None
         
-        # 4. Guardar en DB
+        # Registrar la grabación como pendiente para que el estado sea consultable
         await save_to_database(
+            pool,
             recording_id=recording_id,
             session_id=session_id,
             user_id=user_id,
@@ -715,47 +1383,94 @@ async def recording_complete(
             duration_seconds=duration_seconds,
             audio_url=audio_url,
             transcript=transcript,
-            summary=result.get("summary"),
-            action_items=result.get("action_items", []),
-            topics=result.get("topics", []),
+            summary=None,
+            action_items=[],
+            topics=[],
+            status=RECORDING_STATUS_PENDING,
         )
         
-        # 5. Notificar vía SSE (mismo sistema que HITL)
-        # Usar user_ctx.sub en lugar de user_id del Form para que coincida con el SSE
-        await notify_completion(
-            session_id=session_id,
-            user_id=user_ctx.sub,  # Usar el user_id del contexto autenticado, no del Form
+        job = RecordingJob(
             recording_id=recording_id,
+            session_id=session_id,
+            user_id=user_id,
+            recording_type=recording_type,
             title=title,
-            result=result,
-            transcript=transcript
+            duration_seconds=duration_seconds,
+            user_ctx=user_ctx,
+            audio_url=audio_url,
+            audio_file=spool,
+            filename=clean_filename,
+            content_type=content_type,
+            transcript=transcript,
         )
+        try:
+            await _enqueue_job(job)
+        except HTTPException:
+            # No se procesará: no dejar la fila en pending ni el audio abierto
+            await _fail_job(job, pool)
+            raise
         
-        # Preparar respuesta: usar transcripción truncada en lugar del summary
-        # Misma lógica que en notify_completion para mantener consistencia
-        agent_failed = result.get("agent_failed", False)
-        summary_text = result.get("summary", "")
-        is_error_summary = "Error al procesar" in summary_text or "error" in summary_text.lower()
-        
-        if transcript and transcript.strip():
-            transcript_preview = transcript[:MAX_TRANSCRIPT_PREVIEW_LENGTH]
-            if len(transcript) > MAX_TRANSCRIPT_PREVIEW_LENGTH:
-                transcript_preview += "..."
-            display_summary = transcript_preview
-        elif agent_failed or is_error_summary:
-            display_summary = "No se pudo procesar la grabación. La transcripción no está disponible."
-        else:
-            display_summary = summary_text
+        logger.info("Recording job enqueued", recording_id=recording_id)
         
-        return {
-            "status": "success",
-            "recording_id": recording_id,
-            "summary": display_summary,
-            "action_items": result.get("action_items", []),
-            "topics": result.get("topics", []),
-        }
+        return ORJSONResponse(
+            status_code=202,
+            content={
+                "status": RECORDING_STATUS_PENDING,
+                "recording_id": recording_id,
+                "status_url": f"{router.prefix}/{recording_id}",
+            },
+        )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Error processing recording", error=str(e), recording_id=recording_id)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/{recording_id}")
+async def get_recording_status(
+    recording_id: str,
+    user_ctx: UserContext = Depends(get_current_user_with_query_fallback),
+    pool: asyncpg.Pool = Depends(get_db_pool),
+):
+    """
+    Consultar el estado de procesamiento de una grabación.
+    
+    Returns:
+        status (pending/transcribing/processing/done/error) y, cuando está
+        disponible, summary, action_items y topics.
+    """
+    # Un id que no es UUID no puede existir (y así la consulta usa el índice de la PK)
+    if not _UUID_RE.match(recording_id):
+        raise HTTPException(status_code=404, detail="Recording not found")
+    
+    # Solo las grabaciones del propio usuario: las de otros se ven como inexistentes
+    owner_id = _owner_id(user_ctx)
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    
+    try:
+        row = await pool.fetchrow(_SQL_SELECT_RECORDING_STATUS, recording_id, owner_id)
+    except Exception as e:
+        logger.error("Failed to read recording status", recording_id=recording_id, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Failed to read recording: {str(e)}")
+    
+    if row is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    
+    result = {
+        "summary": row["summary"] or "",
+        "action_items": row["action_items"] or [],
+        "topics": row["topics"] or [],
+    }
+    
+    return {
+        "recording_id": str(row["id"]),
+        "status": row["status"],
+        "title": row["title"],
+        "summary": _display_summary(result, row["transcript"]),
+        "action_items": result["action_items"],
+        "topics": result["topics"],
+        "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+    }
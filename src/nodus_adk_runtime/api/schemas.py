@@ -5,13 +5,25 @@ Pydantic models for request/response validation.
 """
 
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from enum import Enum
 
 
+# Inbound request models: immutable, unknown keys dropped, bounded string sizes
+MAX_REQUEST_STRING_LENGTH = 65536
+REQUEST_MODEL_CONFIG = ConfigDict(
+    extra="ignore",
+    frozen=True,
+    str_max_length=MAX_REQUEST_STRING_LENGTH,
+)
+
+
 class SessionCreateRequest(BaseModel):
     """Request schema for creating a new session."""
     
+    model_config = REQUEST_MODEL_CONFIG
+    
     message: str = Field(..., description="User message")
     conversation_id: Optional[str] = Field(None, description="Existing conversation ID to reuse")
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional metadata")
@@ -20,6 +32,8 @@ class SessionCreateRequest(BaseModel):
 class MessageRequest(BaseModel):
     """Request schema for adding a message to an existing session."""
     
+    model_config = REQUEST_MODEL_CONFIG
+    
     message: str = Field(..., description="User message")
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict, description="Additional metadata")
 
@@ -56,6 +70,8 @@ class HITLEvent(BaseModel):
 class HITLDecisionRequest(BaseModel):
     """Request to submit a HITL decision."""
     
+    model_config = REQUEST_MODEL_CONFIG
+    
     approved: bool = Field(..., description="Whether the action is approved")
     reason: Optional[str] = Field(None, description="Optional reason for the decision")
 
@@ -68,6 +84,21 @@ class HITLDecisionResponse(BaseModel):
     message: str = Field(..., description="Confirmation message")
 
 
+class RecordingCompleteEvent(BaseModel):
+    """Recording completion event delivered over the HITL SSE stream."""
+    
+    type: str = Field("recording_complete", description="Event type")
+    recording_id: str = Field(..., description="Recording identifier")
+    session_id: str = Field(..., description="Session the recording belongs to")
+    title: str = Field(..., description="Recording title")
+    summary: str = Field(..., description="Text shown to the user (transcript preview or summary)")
+    action_items: list = Field(default_factory=list, description="Extracted action items")
+    topics: list = Field(default_factory=list, description="Extracted topics")
+    timestamp: str = Field(
+        default_factory=lambda: datetime.now().isoformat(), description="ISO timestamp of completion"
+    )
+
+
 class SessionResponse(BaseModel):
     """Response schema for session operations."""
     
@@ -89,3 +120,6 @@ class SessionResponse(BaseModel):
         default_factory=list, description="List of tool calls made during execution"
     )
 
+
+# Built once at import: routes serialize through it instead of a per-response adapter
+SESSION_RESPONSE_ADAPTER = TypeAdapter(SessionResponse)
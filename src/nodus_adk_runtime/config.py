@@ -4,12 +4,20 @@ Configuration Management
 Centralized configuration using pydantic-settings.
 """
 
-from pydantic_settings import BaseSettings
+from functools import cached_property
+from pydantic import model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 
 class Settings(BaseSettings):
-    """Application settings."""
+    """Application settings (loaded once, read-only afterwards)."""
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        frozen=True,
+    )
 
     # Server
     host: str = "0.0.0.0"
@@ -25,10 +33,14 @@ class Settings(BaseSettings):
     # Backoffice
     backoffice_url: str = "http://backoffice:5001"
     backoffice_api_key: Optional[str] = None
+    jwks_cache_ttl_seconds: int = 300  # Used when the JWKS response has no Cache-Control max-age
 
     # MCP Gateway
     mcp_gateway_url: str = "http://mcp-gateway:7443"
 
+    # A2A agents
+    a2a_card_cache_ttl_seconds: int = 300  # How long a discovered Agent Card is reused before re-probing
+
     # Memory Layer - Qdrant (documents/RAG)
     qdrant_url: str = "http://qdrant:6333"
     qdrant_api_key: Optional[str] = None
@@ -69,6 +81,7 @@ class Settings(BaseSettings):
     otel_service_name: str = "nodus-adk-runtime"
     otel_traces_sampler: str = "parentbased_traceidratio"
     otel_traces_sampler_arg: float = 1.0
+    otel_instrument_asyncio: bool = False  # Span per asyncio task: costly, debugging only
     
     # ADK Telemetry
     adk_capture_message_content_in_spans: bool = True
@@ -78,6 +91,7 @@ class Settings(BaseSettings):
 
     # CORS
     cors_origins: str = "http://localhost:5002,http://localhost:5001,http://localhost:3000,http://localhost:5005,http://localhost:5173"
+    cors_max_age_seconds: int = 86400  # How long browsers may cache a preflight response
     
     # S3/MinIO Configuration
     s3_endpoint_url: str = "http://minio:9000"
@@ -89,16 +103,30 @@ class Settings(BaseSettings):
     # Recorder Configuration
     runtime_url: str = "http://localhost:8080"
     recorder_url: str = "http://localhost:5005"
+    recording_worker_count: int = 2  # Background workers processing /api/recordings/complete
+    recording_queue_max_size: int = 100  # Jobs waiting for a worker; /complete answers 503 when full
+    transcription_timeout_seconds: int = 900  # Long recordings take ~2.6 s/MiB to transcribe
+    transcription_connect_timeout_seconds: float = 10.0  # Fail fast if backoffice is down
+    min_transcript_chars_for_agent: int = 40  # Shorter transcripts skip the agent (no LLM call)
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-
-    @property
+    @cached_property
     def cors_origins_list(self) -> list[str]:
         """Parse CORS origins from comma-separated string."""
         return [origin.strip() for origin in self.cors_origins.split(",") if origin.strip()]
 
+    @cached_property
+    def litellm_base_normalized(self) -> str:
+        """LiteLLM proxy base URL without trailing slash, ready for path concatenation."""
+        return self.litellm_proxy_api_base.rstrip("/")
+
+    @model_validator(mode="after")
+    def _precompute_derived(self) -> "Settings":
+        """Compute derived values at load time so request paths never re-parse them."""
+        # Reading a cached_property stores its value on the instance: these reads are the point
+        _ = self.cors_origins_list
+        _ = self.litellm_base_normalized
+        return self
+
 
 settings = Settings()
 
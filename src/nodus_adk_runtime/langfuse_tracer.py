@@ -5,6 +5,13 @@ Lightweight wrapper around Langfuse SDK for tracing agent executions.
 This is a fallback when OpenTelemetry is not available or not working.
 
 Usage:
+    from nodus_adk_runtime.langfuse_tracer import langfuse_trace
+    
+    with langfuse_trace("create_session", user_ctx=user_ctx, session_id=session_id):
+        # Nested code can reach the active trace with get_current_trace()
+        result = ...
+    
+Or, when the caller needs to decide success/failure itself:
     from nodus_adk_runtime.langfuse_tracer import start_trace, end_trace
     
     async def create_session(...):
@@ -19,33 +26,39 @@ Usage:
             raise
 """
 
-import logging
-from typing import Optional, Any, Dict
+from typing import Iterator, Optional, Any, Dict
 from datetime import datetime
 from contextlib import contextmanager
+from contextvars import ContextVar
+
+import structlog
 
 from .config import settings
 
-logger = logging.getLogger(__name__)
+logger = structlog.get_logger()
 
 # Global Langfuse client (lazy initialization)
 _langfuse_client: Optional[Any] = None
 _langfuse_available = False
 
+# Settings are frozen: decide once whether tracing can be on at all
+_tracing_enabled = bool(
+    settings.langfuse_enabled and settings.langfuse_public_key and settings.langfuse_secret_key
+)
+
+# Trace of the operation currently running in this task (set by langfuse_trace)
+_current_trace: ContextVar[Optional[Any]] = ContextVar("langfuse_trace", default=None)
+
 
 def get_langfuse_client():
     """Get or create Langfuse client (lazy initialization)."""
-    global _langfuse_client, _langfuse_available
+    global _langfuse_client, _langfuse_available, _tracing_enabled
     
     if _langfuse_client is not None:
         return _langfuse_client
     
-    if not settings.langfuse_enabled:
-        logger.debug("Langfuse tracing disabled (LANGFUSE_ENABLED=false)")
-        return None
-    
-    if not settings.langfuse_public_key or not settings.langfuse_secret_key:
-        logger.debug("Langfuse credentials not configured, tracing disabled")
+    # Disabled, missing credentials, or a previous init failure: one boolean check
+    if not _tracing_enabled:
         return None
     
     try:
@@ -57,17 +70,16 @@ def get_langfuse_client():
             host=settings.langfuse_host,
         )
         _langfuse_available = True
-        logger.info(
-            "✅ Langfuse SDK tracer initialized",
-            extra={"host": settings.langfuse_host}
-        )
+        logger.info("✅ Langfuse SDK tracer initialized", host=settings.langfuse_host)
         return _langfuse_client
         
     except ImportError:
         logger.warning("Langfuse SDK not installed, tracing disabled")
+        _tracing_enabled = False
         return None
     except Exception as e:
-        logger.error(f"Failed to initialize Langfuse client: {e}")
+        logger.error("Failed to initialize Langfuse client", error=str(e))
+        _tracing_enabled = False
         return None
 
 
@@ -82,7 +94,7 @@ def start_trace(
     
     Args:
         operation_name: Name of the operation (e.g., "create_session", "add_message")
-        user_ctx: User context object (with sub, tenant_id, email attributes)
+        user_ctx: UserContext from validate_token (sub, tenant_id)
         session_id: Session ID for grouping related operations
         input_data: Optional input data to log
     
@@ -94,10 +106,13 @@ def start_trace(
     if client is None:
         return None
     
-    # Extract user info
-    user_id = getattr(user_ctx, 'sub', None) if user_ctx else None
-    tenant_id = getattr(user_ctx, 'tenant_id', None) if user_ctx else None
-    user_email = getattr(user_ctx, 'email', None) if user_ctx else None
+    # Extract user info (user_ctx is the UserContext from validate_token)
+    if user_ctx is not None:
+        user_id, tenant_id = user_ctx.sub, user_ctx.tenant_id
+    else:
+        user_id = tenant_id = None
+    
+    log = logger.bind(operation=operation_name, user_id=user_id, session_id=session_id)
     
     try:
         # Use trace() instead of start_span() for top-level operations
@@ -108,20 +123,15 @@ def start_trace(
             session_id=session_id,
             metadata={
                 "tenant_id": tenant_id,
-                "user_email": user_email,
                 "operation": operation_name,
                 "service": "nodus-adk-runtime",
             },
             input=input_data,
         )
-        logger.info(f"🔍 Langfuse trace started: {operation_name}", extra={
-            "operation": operation_name,
-            "user_id": user_id,
-            "session_id": session_id,
-        })
+        log.info("🔍 Langfuse trace started")
         return trace
     except Exception as e:
-        logger.warning(f"Failed to start Langfuse trace: {e}")
+        log.warning("Failed to start Langfuse trace", error=str(e))
         return None
 
 
@@ -154,15 +164,58 @@ def end_trace(
             output=output,
             status_message=error if error else "success",
         )
-        logger.info(f"🔍 Langfuse trace ended (success={success})")
+        logger.info("🔍 Langfuse trace ended", success=success)
     except Exception as e:
-        logger.warning(f"Failed to end Langfuse trace: {e}")
-    
-    # Flush to ensure trace is sent
+        logger.warning("Failed to end Langfuse trace", error=str(e))
+    # No flush here: the SDK batches events and sends them from its own background
+    # thread; flush_langfuse() drains what is left on shutdown.
+
+
+def flush_langfuse() -> None:
+    """Send any buffered Langfuse events (called once on app shutdown)."""
+    if _langfuse_client is None:
+        return
     try:
-        client = get_langfuse_client()
-        if client:
-            client.flush()
-    except:
-        pass
+        _langfuse_client.flush()
+    except Exception as e:
+        logger.warning("Failed to flush Langfuse events", error=str(e))
+
+
+def get_current_trace() -> Optional[Any]:
+    """Return the Langfuse trace of the enclosing langfuse_trace() block, if any."""
+    return _current_trace.get()
+
 
+@contextmanager
+def langfuse_trace(
+    operation_name: str,
+    user_ctx: Optional[Any] = None,
+    session_id: Optional[str] = None,
+    input_data: Optional[Dict] = None,
+) -> Iterator[Optional[Any]]:
+    """
+    Trace a block of code, ending the trace even if the block raises.
+    
+    The trace is exposed through get_current_trace() to nested calls (contextvars
+    follow asyncio tasks), so it does not need to be passed around explicitly.
+    
+    Args:
+        operation_name: Name of the operation (e.g., "create_session", "add_message")
+        user_ctx: UserContext from validate_token (sub, tenant_id)
+        session_id: Session ID for grouping related operations
+        input_data: Optional input data to log
+    
+    Yields:
+        Langfuse trace object or None if tracing is disabled
+    """
+    trace = start_trace(operation_name, user_ctx=user_ctx, session_id=session_id, input_data=input_data)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except Exception as e:
+        end_trace(trace, success=False, error=str(e))
+        raise
+    else:
+        end_trace(trace, success=True)
+    finally:
+        _current_trace.reset(token)
@@ -7,13 +7,16 @@ Uses JWKS endpoint for Ed25519 token validation.
 
 from fastapi import HTTPException, Security, status, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from jose import jwt as jose_jwt, jwk
-from jose.utils import base64url_decode
-from jose.exceptions import JWTError, ExpiredSignatureError, JWTClaimsError
-import jwt as pyjwt  # PyJWT for EdDSA support (better EdDSA handling)
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, Optional, List, Tuple
+from collections import OrderedDict
+import asyncio
+import base64
+import hashlib
+import re
+import time
 import httpx
+import orjson
 import structlog
 
 from ..config import settings
@@ -21,6 +24,47 @@ from ..config import settings
 logger = structlog.get_logger()
 security = HTTPBearer()
 
+# Backoffice uses "backoffice" as issuer and audience
+JWT_ISSUER = "backoffice"
+JWT_AUDIENCE = "backoffice"
+JWT_ALGORITHMS = ["EdDSA"]
+# Signature, exp, iss and aud are verified; sub/exp/iss/aud must also be present
+JWT_DECODE_OPTIONS = {
+    "verify_signature": True,
+    "verify_exp": True,
+    "verify_aud": True,
+    "verify_iss": True,
+    "require": ["sub", "exp", "iss", "aud"],
+}
+
+# JWKS rotate on the order of hours/days: keep the decoded keys in memory for
+# Cache-Control max-age, or settings.jwks_cache_ttl_seconds when none is sent.
+# Unknown kids force a refresh (key rotation), but never more often than this
+JWKS_MIN_REFRESH_INTERVAL_SECONDS = 10
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+_jwks_keys: Dict[str, Any] = {}  # kid -> Ed25519PublicKey
+_jwks_fetched_at: float = 0.0
+_jwks_expires_at: float = 0.0
+_jwks_lock = asyncio.Lock()
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+# PyJWT (and the cryptography backend it pulls in) is imported on first use, not at startup
+_pyjwt: Any = None
+
+# Validated tokens: sha256(token) -> (exp, UserContext), LRU-evicted past capacity.
+# Entries stop being served a few seconds before exp to absorb clock skew.
+TOKEN_CACHE_MAX_SIZE = 10_000
+TOKEN_CACHE_EXPIRY_MARGIN_SECONDS = 5
+_token_cache: "OrderedDict[bytes, Tuple[float, UserContext]]" = OrderedDict()
+
+# Rejected tokens: sha256(token) -> (monotonic expiry, detail), so a client replaying
+# the same bad token gets its 401 without another signature check
+BAD_TOKEN_CACHE_MAX_SIZE = 1024
+BAD_TOKEN_CACHE_TTL_SECONDS = 30
+_bad_tokens: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+
 
 class UserContext(BaseModel):
     """User context extracted from JWT token."""
@@ -33,12 +77,74 @@ class UserContext(BaseModel):
     client_id: Optional[str] = Field(None, description="Client ID if applicable")
 
 
-async def fetch_jwks() -> dict:
+def _load_pyjwt() -> Any:
+    """Import PyJWT once, on the first token that needs verification."""
+    global _pyjwt
+    if _pyjwt is None:
+        import jwt  # PyJWT handles EdDSA with cryptography key objects
+
+        _pyjwt = jwt
+    return _pyjwt
+
+
+def _unverified_kid(token: str) -> Optional[str]:
+    """
+    Read the key ID from the (not yet verified) JWT header.
+    
+    Only the header segment is base64-decoded and parsed; the signature is checked
+    afterwards by PyJWT with the key this kid selects.
+    """
+    header_b64, _, _ = token.partition(".")
+    header = orjson.loads(base64.urlsafe_b64decode(header_b64 + "=" * (-len(header_b64) % 4)))
+    kid = header.get("kid") if isinstance(header, dict) else None
+    return kid if isinstance(kid, str) else None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared HTTP client used for JWKS fetches."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        # JWKS refreshes are single-flight (see get_jwk_for_kid): a handful of connections is plenty
+        _http_client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+    return _http_client
+
+
+def set_http_client(client: Optional[httpx.AsyncClient]) -> None:
+    """
+    Use a caller-provided client for JWKS fetches (e.g. custom transport, proxies or tests).
+    
+    close_http_client() closes whichever client is installed at shutdown.
+    Passing None goes back to the lazily created default client.
+    """
+    global _http_client
+    _http_client = client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (called on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def _jwks_ttl(response: httpx.Response) -> float:
+    """Cache lifetime of a JWKS response: its max-age if present, else the configured TTL."""
+    match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+    if match is None:
+        return settings.jwks_cache_ttl_seconds
+    return max(int(match.group(1)), JWKS_MIN_REFRESH_INTERVAL_SECONDS)
+
+
+async def fetch_jwks() -> Tuple[dict, float]:
     """
     Fetch JWKS from Backoffice endpoint.
     
     Returns:
-        JWKS dictionary with keys
+        JWKS dictionary with keys, and how long it may be cached (seconds)
         
     Raises:
         HTTPException: If JWKS cannot be fetched
@@ -46,10 +152,9 @@ async def fetch_jwks() -> dict:
     jwks_url = f"{settings.backoffice_url}/.well-known/jwks.json"
     
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(jwks_url)
-            response.raise_for_status()
-            return response.json()
+        response = await get_http_client().get(jwks_url)
+        response.raise_for_status()
+        return response.json(), _jwks_ttl(response)
     except httpx.RequestError as e:
         logger.error("Failed to fetch JWKS", error=str(e), url=jwks_url)
         raise HTTPException(
@@ -64,6 +169,132 @@ async def fetch_jwks() -> dict:
         )
 
 
+def _load_jwks_keys(jwks_data: dict) -> Dict[str, Any]:
+    """
+    Decode the Ed25519 keys of a JWKS document once.
+    
+    Args:
+        jwks_data: JWKS dictionary as returned by fetch_jwks()
+        
+    Returns:
+        Mapping of kid to Ed25519PublicKey (unsupported or malformed keys are skipped)
+    """
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+    keys: Dict[str, Any] = {}
+    for jwk_key in jwks_data.get("keys", []):
+        kid = jwk_key.get("kid")
+        if not kid:
+            continue
+        # EdDSA keys are OKP/Ed25519 with the public key in the "x" parameter
+        if jwk_key.get("kty") != "OKP" or jwk_key.get("crv") != "Ed25519" or not jwk_key.get("x"):
+            logger.warning("Skipping unsupported JWK", kid=kid, kty=jwk_key.get("kty"), crv=jwk_key.get("crv"))
+            continue
+        try:
+            public_key_bytes = base64.urlsafe_b64decode(jwk_key["x"] + "==")  # Add padding
+            keys[kid] = Ed25519PublicKey.from_public_bytes(public_key_bytes)
+        except Exception as e:
+            logger.error("Failed to construct EdDSA key from JWK", kid=kid, error=str(e), error_type=type(e).__name__)
+    return keys
+
+
+async def get_jwk_for_kid(kid: str) -> Any:
+    """
+    Return the Ed25519 public key for a key ID, refreshing the JWKS cache when needed.
+    
+    The JWKS is re-fetched when the cache has expired or, to follow key rotation,
+    when the kid is unknown. Concurrent misses share a single fetch.
+    
+    Args:
+        kid: Key ID from the token header
+        
+    Returns:
+        Ed25519PublicKey for the kid
+        
+    Raises:
+        HTTPException: If the key is not in the JWKS or the JWKS cannot be fetched
+    """
+    global _jwks_keys, _jwks_fetched_at, _jwks_expires_at
+
+    key = _jwks_keys.get(kid)
+    if key is not None and time.monotonic() < _jwks_expires_at:
+        return key
+
+    async with _jwks_lock:
+        now = time.monotonic()
+        key = _jwks_keys.get(kid)
+        # Another request may have refreshed the cache while we waited for the lock
+        if key is not None and now < _jwks_expires_at:
+            return key
+        if now >= _jwks_expires_at or now - _jwks_fetched_at >= JWKS_MIN_REFRESH_INTERVAL_SECONDS:
+            jwks_data, ttl = await fetch_jwks()
+            new_keys = _load_jwks_keys(jwks_data)
+            if _jwks_keys.keys() - new_keys.keys():
+                # A signing key was withdrawn: tokens it signed must be verified again
+                _token_cache.clear()
+                logger.info("JWKS key removed, validated-token cache cleared")
+            _jwks_keys = new_keys
+            _jwks_fetched_at = now
+            _jwks_expires_at = now + ttl
+            logger.debug("JWKS cache refreshed", key_count=len(_jwks_keys), ttl=ttl)
+            key = _jwks_keys.get(kid)
+
+    if key is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Key not found in JWKS",
+        )
+    return key
+
+
+def _get_cached_user(cache_key: bytes) -> Optional[UserContext]:
+    """Return the cached UserContext for a token digest if it has not expired."""
+    entry = _token_cache.get(cache_key)
+    if entry is None:
+        return None
+    exp, user_ctx = entry
+    if time.time() + TOKEN_CACHE_EXPIRY_MARGIN_SECONDS >= exp:
+        del _token_cache[cache_key]
+        return None
+    _token_cache.move_to_end(cache_key)
+    return user_ctx
+
+
+def _cache_user(cache_key: bytes, payload: Dict[str, Any], user_ctx: UserContext) -> None:
+    """Remember a validated token until its exp claim (tokens without exp are not cached)."""
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)):
+        return
+    _token_cache[cache_key] = (float(exp), user_ctx)
+    _token_cache.move_to_end(cache_key)
+    if len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+        _token_cache.popitem(last=False)
+
+
+def _get_rejection(cache_key: bytes) -> Optional[str]:
+    """Return the 401 detail for a recently rejected token digest, if still remembered."""
+    entry = _bad_tokens.get(cache_key)
+    if entry is None:
+        return None
+    expires_at, detail = entry
+    if time.monotonic() >= expires_at:
+        del _bad_tokens[cache_key]
+        return None
+    return detail
+
+
+def _reject_token(cache_key: bytes, detail: str) -> HTTPException:
+    """Remember a token that failed verification and build the 401 to raise for it."""
+    _bad_tokens[cache_key] = (time.monotonic() + BAD_TOKEN_CACHE_TTL_SECONDS, detail)
+    _bad_tokens.move_to_end(cache_key)
+    if len(_bad_tokens) > BAD_TOKEN_CACHE_MAX_SIZE:
+        _bad_tokens.popitem(last=False)
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+    )
+
+
 async def validate_token(
     credentials: HTTPAuthorizationCredentials = Security(security),
 ) -> UserContext:
@@ -79,22 +310,28 @@ async def validate_token(
     Raises:
         HTTPException: If token is invalid
     """
+    # Never empty: HTTPBearer rejects missing/blank credentials before this runs,
+    # and the recordings query-token fallback only calls in with a non-empty token
     token = credentials.credentials
 
-    if not token:
+    # Tokens are reused for many calls: skip verification for ones already validated
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached_user = _get_cached_user(cache_key)
+    if cached_user is not None:
+        return cached_user
+
+    rejection = _get_rejection(cache_key)
+    if rejection is not None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            detail=rejection,
         )
 
+    pyjwt = _load_pyjwt()
+
     try:
-        # Fetch JWKS
-        jwks_data = await fetch_jwks()
-        
         # Decode token header to get kid
-        unverified_header = jose_jwt.get_unverified_header(token)
-        kid = unverified_header.get("kid")
+        kid = _unverified_kid(token)
         
         if not kid:
             raise HTTPException(
@@ -102,108 +339,54 @@ async def validate_token(
                 detail="Token missing key ID",
             )
         
-        # Find matching key in JWKS
-        jwk_key = None
-        for key in jwks_data.get("keys", []):
-            if key.get("kid") == kid:
-                jwk_key = key
-                break
+        # Ed25519 public key for the kid (cached, see get_jwk_for_kid)
+        public_key = await get_jwk_for_kid(kid)
         
-        if not jwk_key:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Key not found in JWKS",
-            )
-        
-        # Convert JWK to format expected by python-jose for EdDSA
-        # python-jose doesn't support EdDSA well, so we use cryptography directly
-        try:
-            from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
-            from cryptography.hazmat.primitives import serialization
-            import base64
-            
-            # Extract public key from JWK (EdDSA uses "x" parameter)
-            if jwk_key.get("kty") != "OKP" or jwk_key.get("crv") != "Ed25519":
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Unsupported key type for EdDSA",
-                )
-            
-            # Decode the public key from base64url
-            x = jwk_key.get("x")
-            if not x:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Missing public key data in JWK",
-                )
-            
-            # Decode base64url to bytes
-            public_key_bytes = base64.urlsafe_b64decode(x + '==')  # Add padding
-            
-            # Create Ed25519PublicKey from bytes
-            public_key = Ed25519PublicKey.from_public_bytes(public_key_bytes)
-            
-            # Convert to PEM format for python-jose
-            public_key_pem = public_key.public_bytes(
-                encoding=serialization.Encoding.PEM,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo
-            )
-            
-        except Exception as e:
-            logger.error("Failed to construct EdDSA key from JWK", error=str(e), error_type=type(e).__name__)
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=f"Failed to process JWK: {str(e)}",
-            )
-        
-        # Verify token
-        # Extract issuer and audience from settings
-        # Backoffice uses "backoffice" as issuer and audience
-        issuer = "backoffice"
-        audience = "backoffice"
-        
-        # Decode and verify token using PyJWT (supports EdDSA better than python-jose)
+        # Decode and verify token using PyJWT
         try:
             # Use PyJWT with cryptography Ed25519PublicKey directly
             payload = pyjwt.decode(
                 token,
                 public_key,  # Use Ed25519PublicKey directly, PyJWT supports it
-                algorithms=["EdDSA"],
-                issuer=issuer,
-                audience=audience,
-                options={"verify_signature": True, "verify_exp": True, "verify_aud": True, "verify_iss": True},
+                algorithms=JWT_ALGORITHMS,
+                issuer=JWT_ISSUER,
+                audience=JWT_AUDIENCE,
+                options=JWT_DECODE_OPTIONS,
             )
         except pyjwt.ExpiredSignatureError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token expired",
-            )
+            raise _reject_token(cache_key, "Token expired")
         except pyjwt.InvalidAudienceError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid audience",
-            )
+            raise _reject_token(cache_key, "Invalid audience")
         except pyjwt.InvalidIssuerError:
+            raise _reject_token(cache_key, "Invalid issuer")
+        except pyjwt.ImmatureSignatureError:
+            # nbf/iat slightly ahead of our clock: the token may be valid in a moment,
+            # so it is not remembered as rejected
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid issuer",
+                detail="Token not yet valid",
             )
         except pyjwt.InvalidTokenError as e:
             logger.warning("JWT validation error", error=str(e))
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=f"Invalid token: {str(e)}",
-            )
+            raise _reject_token(cache_key, f"Invalid token: {str(e)}")
         
         # Extract user context
-        return UserContext(
-            sub=payload.get("sub", ""),
-            tenant_id=payload.get("tenant_id") or payload.get("tenant"),
-            scopes=payload.get("scopes", []),
-            raw_token=token,
-            role_name=payload.get("role_name"),
-            client_id=payload.get("client_id"),
-        )
+        # PyJWT checks the signature and registered claims but not the types of custom
+        # ones (e.g. a "read write" string in scopes): validate them here, once per token
+        try:
+            user_ctx = UserContext.model_validate({
+                "sub": payload.get("sub", ""),
+                "tenant_id": payload.get("tenant_id") or payload.get("tenant"),
+                "scopes": payload.get("scopes") or [],
+                "raw_token": token,
+                "role_name": payload.get("role_name"),
+                "client_id": payload.get("client_id"),
+            })
+        except ValidationError as e:
+            logger.warning("JWT claims have unexpected types", errors=e.errors(include_url=False, include_input=False))
+            raise _reject_token(cache_key, "Invalid token claims")
+        _cache_user(cache_key, payload, user_ctx)
+        return user_ctx
         
     except HTTPException:
         raise
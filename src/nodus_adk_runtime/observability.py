@@ -12,7 +12,7 @@ Architecture:
          ↓
     OpenTelemetry SDK
          ↓
-    OTLP Exporter (HTTP)
+    OTLP Exporter (HTTP/protobuf, gzip)
          ↓
     Langfuse Backend
 
@@ -25,17 +25,21 @@ Usage:
     # Now all ADK operations are automatically traced!
 """
 
+import functools
+import inspect
 import logging
 import os
+import sys
 from typing import Optional
 
 from opentelemetry import trace
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.exporter.otlp.proto.http import Compression
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.resources import Resource, SERVICE_NAME, SERVICE_VERSION
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
-from opentelemetry.instrumentation.asyncio import AsyncioInstrumentor
 
 # Import ADK's telemetry setup for advanced configuration
 try:
@@ -49,6 +53,26 @@ from .config import settings
 
 logger = logging.getLogger(__name__)
 
+# setup_telemetry()/_setup_instrumentation() may be reached more than once (tests,
+# reloads, several create_app() calls); the providers and patches are set up only once
+_telemetry_result: Optional[bool] = None
+_instrumented = False
+
+# Batch export tuning: a deeper queue so bursts are not dropped, fewer/larger exports
+BSP_MAX_QUEUE_SIZE = 8192
+BSP_MAX_EXPORT_BATCH_SIZE = 1024
+BSP_SCHEDULE_DELAY_MILLIS = 2000
+
+# Longest parameter value recorded on @traced spans
+PARAM_VALUE_MAX_LENGTH = 200
+
+# Attribute keys written by @traced on every call
+STATUS_KEY = sys.intern("function.status")
+ERR_KEY = sys.intern("error")
+ERR_TYPE_KEY = sys.intern("error.type")
+ERR_MSG_KEY = sys.intern("error.message")
+PARAM_KEY_PREFIX = "function.param."
+
 
 def setup_telemetry() -> bool:
     """
@@ -76,10 +100,20 @@ def setup_telemetry() -> bool:
         OTEL_TRACES_SAMPLER: Sampling strategy
         OTEL_TRACES_SAMPLER_ARG: Sampling rate (0.0-1.0)
         ADK_CAPTURE_MESSAGE_CONTENT_IN_SPANS: Include message content in spans
+        OTEL_INSTRUMENT_ASYNCIO: Span per asyncio task (default: false)
     
     Returns:
         True if setup successful, False otherwise
     """
+    global _telemetry_result
+    if _telemetry_result is not None:
+        return _telemetry_result
+    _telemetry_result = _setup_telemetry()
+    return _telemetry_result
+
+
+def _setup_telemetry() -> bool:
+    """Configure providers and exporters once; see setup_telemetry()."""
     if not settings.langfuse_enabled:
         logger.info("Langfuse observability disabled (LANGFUSE_ENABLED=false)")
         return False
@@ -124,6 +158,14 @@ def _setup_with_adk_telemetry() -> bool:
         "service.instance.id": os.getenv("HOSTNAME", "localhost"),
     })
     
+    # ADK builds its own providers from OTEL_* environment variables: pass the batch
+    # tuning and sampler the same way (explicit environment values still win)
+    os.environ.setdefault("OTEL_BSP_MAX_QUEUE_SIZE", str(BSP_MAX_QUEUE_SIZE))
+    os.environ.setdefault("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", str(BSP_MAX_EXPORT_BATCH_SIZE))
+    os.environ.setdefault("OTEL_BSP_SCHEDULE_DELAY", str(BSP_SCHEDULE_DELAY_MILLIS))
+    os.environ.setdefault("OTEL_TRACES_SAMPLER", settings.otel_traces_sampler)
+    os.environ.setdefault("OTEL_TRACES_SAMPLER_ARG", str(settings.otel_traces_sampler_arg))
+    
     # ADK's setup automatically detects OTEL_EXPORTER_OTLP_ENDPOINT
     # and other OTEL_* environment variables
     maybe_set_otel_providers(otel_resource=resource)
@@ -155,8 +197,11 @@ def _setup_basic_telemetry() -> bool:
         "deployment.environment": os.getenv("ENVIRONMENT", "development"),
     })
     
-    # Create tracer provider
-    tracer_provider = TracerProvider(resource=resource)
+    # Create tracer provider: child spans follow their parent's sampling decision
+    tracer_provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBased(TraceIdRatioBased(settings.otel_traces_sampler_arg)),
+    )
     
     # Configure OTLP exporter to Langfuse
     otlp_endpoint = (
@@ -164,19 +209,26 @@ def _setup_basic_telemetry() -> bool:
         or f"{settings.langfuse_host}/api/public/ingestion"
     )
     
-    # Langfuse authentication via headers (OTLP standard)
+    # Langfuse authentication via headers (OTLP standard). The exporter sends
+    # gzip-compressed protobuf and sets its own Content-Type, so none is forced here.
+    # Langfuse ingests OTLP over HTTP only, hence no gRPC exporter.
     headers = {
         "Authorization": f"Bearer {settings.langfuse_public_key}:{settings.langfuse_secret_key}",
-        "Content-Type": "application/json",
     }
     
     otlp_exporter = OTLPSpanExporter(
         endpoint=otlp_endpoint,
         headers=headers,
+        compression=Compression.Gzip,
     )
     
     # Add batch span processor for performance
-    span_processor = BatchSpanProcessor(otlp_exporter)
+    span_processor = BatchSpanProcessor(
+        otlp_exporter,
+        max_queue_size=BSP_MAX_QUEUE_SIZE,
+        max_export_batch_size=BSP_MAX_EXPORT_BATCH_SIZE,
+        schedule_delay_millis=BSP_SCHEDULE_DELAY_MILLIS,
+    )
     tracer_provider.add_span_processor(span_processor)
     
     # Set as global tracer provider
@@ -197,6 +249,11 @@ def _setup_basic_telemetry() -> bool:
 
 def _setup_instrumentation():
     """Setup automatic instrumentation for common libraries."""
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+    
     try:
         # Instrument HTTP client (for MCP calls, etc.)
         HTTPXClientInstrumentor().instrument()
@@ -204,8 +261,15 @@ def _setup_instrumentation():
     except Exception as e:
         logger.warning(f"Failed to instrument HTTPX: {e}")
     
+    # Asyncio instrumentation patches Task creation/gather and emits a span per
+    # coroutine on the event loop's hottest path. HTTPX + ADK spans already cover
+    # what Langfuse shows, so it is opt-in (OTEL_INSTRUMENT_ASYNCIO=true).
+    if not settings.otel_instrument_asyncio:
+        return
+    
     try:
-        # Instrument asyncio tasks
+        from opentelemetry.instrumentation.asyncio import AsyncioInstrumentor
+        
         AsyncioInstrumentor().instrument()
         logger.debug("✅ Asyncio instrumentation enabled")
     except Exception as e:
@@ -247,8 +311,23 @@ def add_span_attributes(attributes: dict):
     """
     span = trace.get_current_span()
     if span.is_recording():
-        for key, value in attributes.items():
-            span.set_attribute(key, value)
+        span.set_attributes(attributes)
+
+
+def _param_attribute_value(value) -> str:
+    """
+    Span attribute for a parameter value, without stringifying large objects in full.
+    
+    Strings are sliced before anything is copied; containers and other objects are
+    summarised by type (and length) instead of being rendered.
+    """
+    if isinstance(value, str):
+        return value[:PARAM_VALUE_MAX_LENGTH]
+    if value is None or isinstance(value, (bool, int, float)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, dict, list, tuple, set, frozenset)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
 
 
 # Decorator for easy function tracing
@@ -266,64 +345,80 @@ def traced(span_name: Optional[str] = None, attributes: Optional[dict] = None):
             return result
     """
     def decorator(func):
-        import functools
-        import inspect
+        # Reflect on the signature once per decorated function, not on every call
+        params = inspect.signature(func).parameters.values()
+        param_names = tuple(
+            p.name for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+        )
+        param_defaults = tuple(
+            (p.name, p.default) for p in params
+            if p.default is not p.empty and p.kind is not p.POSITIONAL_ONLY
+        )
+        # Attribute keys for the declared parameters, built once instead of per call
+        param_keys = {
+            p.name: sys.intern(PARAM_KEY_PREFIX + p.name)
+            for p in params if not p.name.startswith("_")
+        }
+        
+        # Span name, static attributes and tracer are fixed per function (the tracer is a
+        # proxy until setup_telemetry installs the provider, so caching it early is safe)
+        name = span_name or f"{func.__module__}.{func.__name__}"
+        static_attributes = dict(attributes) if attributes else None
+        tracer = get_tracer(func.__module__)
+        
+        def set_param_attributes(span, args, kwargs):
+            values = dict(zip(param_names, args))
+            values.update(kwargs)
+            for param_name, default in param_defaults:
+                values.setdefault(param_name, default)
+            for param_name, param_value in values.items():
+                if param_name.startswith("_"):
+                    continue
+                # Extra **kwargs names are not known until call time
+                key = param_keys.get(param_name) or PARAM_KEY_PREFIX + param_name
+                span.set_attribute(key, _param_attribute_value(param_value))
         
         @functools.wraps(func)
         async def async_wrapper(*args, **kwargs):
-            tracer = get_tracer(func.__module__)
-            name = span_name or f"{func.__module__}.{func.__name__}"
-            
-            with tracer.start_as_current_span(name) as span:
-                # Add custom attributes
-                if attributes:
-                    for key, value in attributes.items():
-                        span.set_attribute(key, value)
+            # Custom attributes are set in one go when the span is created
+            with tracer.start_as_current_span(name, attributes=static_attributes) as span:
+                # Sampled-out spans skip all attribute work
+                recording = span.is_recording()
                 
                 # Add function parameters as attributes
-                sig = inspect.signature(func)
-                try:
-                    bound = sig.bind(*args, **kwargs)
-                    bound.apply_defaults()
-                    
-                    for param_name, param_value in bound.arguments.items():
-                        if not param_name.startswith("_"):
-                            # Truncate long values
-                            str_value = str(param_value)[:200]
-                            span.set_attribute(f"function.param.{param_name}", str_value)
-                except Exception:
-                    pass  # Skip if binding fails
+                if recording:
+                    set_param_attributes(span, args, kwargs)
                 
                 try:
                     result = await func(*args, **kwargs)
-                    span.set_attribute("function.status", "success")
+                    if recording:
+                        span.set_attribute(STATUS_KEY, "success")
                     return result
                 except Exception as e:
-                    span.set_attribute("error", True)
-                    span.set_attribute("error.type", type(e).__name__)
-                    span.set_attribute("error.message", str(e))
+                    if recording:
+                        span.set_attribute(ERR_KEY, True)
+                        span.set_attribute(ERR_TYPE_KEY, type(e).__name__)
+                        span.set_attribute(ERR_MSG_KEY, str(e))
                     span.record_exception(e)
                     raise
         
         @functools.wraps(func)
         def sync_wrapper(*args, **kwargs):
-            tracer = get_tracer(func.__module__)
-            name = span_name or f"{func.__module__}.{func.__name__}"
-            
-            with tracer.start_as_current_span(name) as span:
-                # Add custom attributes
-                if attributes:
-                    for key, value in attributes.items():
-                        span.set_attribute(key, value)
+            # Custom attributes are set in one go when the span is created
+            with tracer.start_as_current_span(name, attributes=static_attributes) as span:
+                # Sampled-out spans skip all attribute work
+                recording = span.is_recording()
                 
                 try:
                     result = func(*args, **kwargs)
-                    span.set_attribute("function.status", "success")
+                    if recording:
+                        span.set_attribute(STATUS_KEY, "success")
                     return result
                 except Exception as e:
-                    span.set_attribute("error", True)
-                    span.set_attribute("error.type", type(e).__name__)
-                    span.set_attribute("error.message", str(e))
+                    if recording:
+                        span.set_attribute(ERR_KEY, True)
+                        span.set_attribute(ERR_TYPE_KEY, type(e).__name__)
+                        span.set_attribute(ERR_MSG_KEY, str(e))
                     span.record_exception(e)
                     raise
         
@@ -5,17 +5,66 @@ Entry point for the Nodus ADK runtime server.
 Initializes FastAPI app, configures routes, and starts the ADK server.
 """
 
-from fastapi import FastAPI, Depends
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+import orjson
 import structlog
 
 from .config import settings
-from .api import assistant
+from .api import assistant, hitl, recording
+from .api.responses import ORJSONResponse
+from .middleware import auth
 from .middleware.auth import get_current_user, UserContext
 from .observability import setup_telemetry
+from .langfuse_tracer import flush_langfuse, get_langfuse_client
 
 logger = structlog.get_logger()
 
+# Static bodies for the probe endpoints, encoded once instead of per request
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "nodus-adk-runtime"})
+_ROOT_BODY = orjson.dumps({"service": "nodus-adk-runtime", "version": "0.1.0", "docs": "/docs"})
+
+
+async def _close_a2a_tools() -> None:
+    # Imported lazily like the rest of the agent stack (see api/assistant.py)
+    from .tools.a2a_dynamic_tool_builder import close_a2a_tools
+    await close_a2a_tools()
+
+
+async def _shutdown_step(name: str, step) -> None:
+    """Run one teardown step, logging failures so the remaining steps still run."""
+    try:
+        result = step()
+        if asyncio.iscoroutine(result):
+            await result
+    except Exception as e:
+        logger.error("Shutdown step failed", step=name, error=str(e), exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared clients and background workers on startup, release them on shutdown."""
+    app.state.db_pool = await recording.create_db_pool()
+    try:
+        recording.get_s3_client()
+        recording.get_http_client()
+        await recording.start_recording_workers(app.state.db_pool)
+        # Importing and constructing the Langfuse SDK blocks: do it off the loop, before traffic
+        await asyncio.to_thread(get_langfuse_client)
+        yield
+    finally:
+        await _shutdown_step("recording_workers", lambda: recording.stop_recording_workers(app.state.db_pool))
+        await _shutdown_step("langfuse", lambda: asyncio.to_thread(flush_langfuse))
+        await _shutdown_step("recording_http_client", recording.close_http_client)
+        await _shutdown_step("auth_http_client", auth.close_http_client)
+        await _shutdown_step("a2a_tools", _close_a2a_tools)
+        await _shutdown_step("s3_client", recording.close_s3_client)
+        # Last: the workers above may still write job status while draining
+        if app.state.db_pool is not None:
+            await _shutdown_step("db_pool", app.state.db_pool.close)
+
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
@@ -31,6 +80,8 @@ def create_app() -> FastAPI:
         title="Nodus ADK Runtime",
         description="ADK-based assistant runtime for Nodus OS",
         version="0.1.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
     # CORS middleware - specific origins for Llibreta and Backoffice
@@ -40,32 +91,24 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Returning clients skip the OPTIONS preflight before each authenticated POST
+        max_age=settings.cors_max_age_seconds,
     )
 
     # Register API routers
     app.include_router(assistant.router)
-    
-    # HITL router
-    from .api import hitl
     app.include_router(hitl.router)
-    
-    # Recording router
-    from .api import recording
     app.include_router(recording.router)
 
     @app.get("/health")
     async def health():
         """Health check endpoint."""
-        return {"status": "healthy", "service": "nodus-adk-runtime"}
+        return Response(content=_HEALTH_BODY, media_type="application/json")
 
     @app.get("/")
     async def root():
         """Root endpoint."""
-        return {
-            "service": "nodus-adk-runtime",
-            "version": "0.1.0",
-            "docs": "/docs",
-        }
+        return Response(content=_ROOT_BODY, media_type="application/json")
 
     @app.get("/v1/debug/me", response_model=dict)
     async def debug_me(user_ctx: UserContext = Depends(get_current_user)):
@@ -88,11 +131,13 @@ app = create_app()
 if __name__ == "__main__":
     import uvicorn
 
+    # uvicorn[standard] ships uvloop and httptools and picks them automatically.
+    # Single worker: HITL queues and pending decisions live in process memory.
     uvicorn.run(
         "nodus_adk_runtime.server:app",
         host="0.0.0.0",
         port=8080,
-        reload=True,
+        reload=settings.debug,
         log_level="info",
     )
 
@@ -0,0 +1,111 @@
+"""
+Per-user HITL event buffers feeding the SSE streams
+
+Kept free of FastAPI imports so both the HITL service (producer) and the
+SSE endpoint (consumer) can import it at module level.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List
+import structlog
+
+logger = structlog.get_logger()
+
+# Most events buffered per stream; past this the oldest undelivered event is dropped
+HITL_QUEUE_MAX_EVENTS = 1000
+
+# Events discarded from full buffers since startup
+_dropped_events = 0
+
+
+class EventRing:
+    """
+    Bounded event buffer feeding one SSE stream.
+    
+    Producers append without awaiting; the SSE consumer drains the buffer and
+    waits on a notify-only event while it is empty.
+    """
+    
+    __slots__ = ("_events", "_ready")
+    
+    def __init__(self, maxlen: int = HITL_QUEUE_MAX_EVENTS):
+        self._events: Deque[Any] = deque(maxlen=maxlen)
+        self._ready = asyncio.Event()
+    
+    def __len__(self) -> int:
+        return len(self._events)
+    
+    def put_nowait(self, item: Any) -> None:
+        global _dropped_events
+        if len(self._events) == self._events.maxlen:
+            # The deque discards the oldest event on append: count it
+            _dropped_events += 1
+            logger.warning("HITL event buffer full, dropping oldest event", dropped=_dropped_events)
+        self._events.append(item)
+        self._ready.set()
+    
+    async def get(self) -> Any:
+        while not self._events:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._events.popleft()
+
+
+class UserEventChannel:
+    """
+    Fan-out point for one user's events.
+    
+    Every open SSE stream of the user (several tabs or devices) subscribes its own
+    EventRing and receives each frame; the frames themselves are shared. While no
+    stream is open, events wait in a backlog that the next subscriber takes over.
+    """
+    
+    __slots__ = ("_subscribers", "_backlog")
+    
+    def __init__(self):
+        self._subscribers: List[EventRing] = []
+        self._backlog = EventRing()
+    
+    def put_nowait(self, item: Any) -> None:
+        if not self._subscribers:
+            self._backlog.put_nowait(item)
+            return
+        for ring in self._subscribers:
+            ring.put_nowait(item)
+    
+    def subscribe(self) -> EventRing:
+        """Register a new SSE stream; the first one inherits the undelivered backlog"""
+        if self._subscribers:
+            ring = EventRing()
+        else:
+            ring, self._backlog = self._backlog, EventRing()
+        self._subscribers.append(ring)
+        return ring
+    
+    def unsubscribe(self, ring: EventRing) -> None:
+        """Remove a closed SSE stream; if it was the last one, keep what it had not sent"""
+        try:
+            self._subscribers.remove(ring)
+        except ValueError:
+            return
+        if not self._subscribers and len(ring):
+            self._backlog = ring
+
+
+# In-memory event channels (per user)
+# In production: use Redis pub/sub
+hitl_event_queues: Dict[str, UserEventChannel] = {}
+
+
+def get_user_queue(user_id: str) -> UserEventChannel:
+    """Get or create event channel for user"""
+    if user_id not in hitl_event_queues:
+        hitl_event_queues[user_id] = UserEventChannel()
+        logger.info("Created event queue for user", user_id=user_id)
+    return hitl_event_queues[user_id]
+
+
+def dropped_event_count() -> int:
+    """Total events dropped from full per-user buffers since startup"""
+    return _dropped_events
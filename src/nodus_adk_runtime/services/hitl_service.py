@@ -2,23 +2,62 @@
 HITL Service for managing confirmation requests and decisions
 """
 
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 import asyncio
-from pydantic import BaseModel, Field
+import functools
+import time
+from dataclasses import dataclass, field
+from pydantic import BaseModel
 from datetime import datetime
+import orjson
 import structlog
 
+from .hitl_queues import get_user_queue
+
+__all__ = ["HITLDecision", "HITLEvent", "HITLService", "get_hitl_service", "sse_frame"]
+
 logger = structlog.get_logger()
 
+# Pending decisions are checked against their deadline by one periodic sweep
+# instead of a timer per request, so timeouts fire up to this much late
+HITL_TIMEOUT_SWEEP_INTERVAL_SECONDS = 5.0
+
+
+def _epoch_ms() -> int:
+    """Current wall-clock time as integer epoch milliseconds"""
+    return time.time_ns() // 1_000_000
+
+
+def sse_frame(event_type: str, data: bytes) -> bytes:
+    """Build a complete SSE frame, written to the stream as-is by the SSE endpoint"""
+    return b"event: " + event_type.encode() + b"\r\ndata: " + data + b"\r\n\r\n"
 
-class HITLEvent(BaseModel):
-    """HITL Event model for SSE streaming"""
+
+@dataclass(slots=True, frozen=True)
+class HITLEvent:
+    """HITL Event for SSE streaming"""
     event_id: str
     event_type: str  # "confirmation_required"
     action_description: str
     action_data: dict
     metadata: Optional[dict] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp_ms: int = field(default_factory=_epoch_ms)
+    
+    def to_sse_bytes(self) -> bytes:
+        """Encode the event as an SSE frame (once per event, shared by every send)"""
+        data = orjson.dumps(
+            {
+                "event_id": self.event_id,
+                "event_type": self.event_type,
+                "action_description": self.action_description,
+                "action_data": self.action_data,
+                "metadata": self.metadata,
+                # Same ISO string clients received from the former pydantic model
+                "timestamp": datetime.fromtimestamp(self.timestamp_ms / 1000),
+            },
+            option=orjson.OPT_NON_STR_KEYS,
+        )
+        return sse_frame(self.event_type, data)
 
 
 class HITLDecision(BaseModel):
@@ -32,7 +71,11 @@ class HITLService:
     
     def __init__(self):
         # In-memory storage (use Redis in production)
-        self.pending_decisions: Dict[str, asyncio.Future] = {}
+        # key: event_id, value: (decision future, monotonic deadline)
+        self.pending_decisions: Dict[str, Tuple[asyncio.Future, float]] = {}
+        self._timeout_sweeper: Optional[asyncio.Task] = None
+        # Decisions received for events that were not pending (stale or unknown ids)
+        self.unknown_decisions = 0
         # Store events for resumability (key: event_id, value: HITLEvent)
         self.pending_events: Dict[str, HITLEvent] = {}
         self._instance_id = id(self)
@@ -67,15 +110,6 @@ class HITLService:
         Returns:
             HITLDecision with user's approval/rejection
         """
-        from nodus_adk_runtime.api.hitl import get_user_queue
-        
-        logger.info(
-            "HITL confirmation requested",
-            user_id=user_id,
-            event_id=event_id,
-            action=action_description
-        )
-        
         # Create event
         event = HITLEvent(
             event_id=event_id,
@@ -87,35 +121,53 @@ class HITLService:
         
         # Create future for decision
         decision_future: asyncio.Future[HITLDecision] = asyncio.Future()
-        self.pending_decisions[event_id] = decision_future
+        self.pending_decisions[event_id] = (decision_future, time.monotonic() + timeout)
+        self._ensure_timeout_sweeper()
         
         # Send event to user via SSE
-        queue = get_user_queue(user_id)
-        await queue.put(event)
+        get_user_queue(user_id).put_nowait(event.to_sse_bytes())
         
-        logger.info("HITL event queued for SSE", event_id=event_id, user_id=user_id)
+        # One log line per request: written once the event is queued
+        logger.info(
+            "HITL confirmation requested",
+            user_id=user_id,
+            event_id=event_id,
+            action=action_description
+        )
         
-        # Wait for decision (with timeout)
-        try:
-            decision = await asyncio.wait_for(
-                decision_future,
-                timeout=timeout
-            )
-            logger.info(
-                "HITL decision received",
-                event_id=event_id,
-                approved=decision.approved
-            )
-            return decision
-            
-        except asyncio.TimeoutError:
-            logger.warning("HITL decision timeout", event_id=event_id)
-            # Auto-reject on timeout
-            return HITLDecision(approved=False, reason="Timeout - no response within 5 minutes")
-        finally:
-            # Cleanup
-            if event_id in self.pending_decisions:
-                del self.pending_decisions[event_id]
+        # Wait for decision (the timeout sweeper auto-rejects it past the deadline)
+        decision = await decision_future
+        logger.info(
+            "HITL decision received",
+            event_id=event_id,
+            approved=decision.approved
+        )
+        return decision
+    
+    def _ensure_timeout_sweeper(self) -> None:
+        """Start the timeout sweeper if it is not already running"""
+        if self._timeout_sweeper is None or self._timeout_sweeper.done():
+            self._timeout_sweeper = asyncio.create_task(self._sweep_timeouts())
+    
+    async def _sweep_timeouts(self) -> None:
+        """Reject decisions past their deadline; runs while any decision is pending"""
+        while self.pending_decisions:
+            await asyncio.sleep(HITL_TIMEOUT_SWEEP_INTERVAL_SECONDS)
+            now = time.monotonic()
+            # Also drops entries whose waiter was cancelled
+            expired = [
+                event_id
+                for event_id, (future, deadline) in self.pending_decisions.items()
+                if future.done() or now >= deadline
+            ]
+            for event_id in expired:
+                future, _ = self.pending_decisions.pop(event_id)
+                if not future.done():
+                    logger.warning("HITL decision timeout", event_id=event_id)
+                    # Auto-reject on timeout
+                    future.set_result(
+                        HITLDecision(approved=False, reason="Timeout - no response within 5 minutes")
+                    )
     
     async def create_event_async(
         self,
@@ -142,15 +194,6 @@ class HITLService:
         Returns:
             event_id (for reference)
         """
-        from nodus_adk_runtime.api.hitl import get_user_queue
-        
-        logger.info(
-            "Creating HITL event (non-blocking)",
-            user_id=user_id,
-            event_id=event_id,
-            action=action_description
-        )
-        
         # Create event
         event = HITLEvent(
             event_id=event_id,
@@ -164,13 +207,13 @@ class HITLService:
         self.pending_events[event_id] = event
         
         # Send event to user via SSE (NO crear Future, NO esperar)
-        queue = get_user_queue(user_id)
-        await queue.put(event)
+        get_user_queue(user_id).put_nowait(event.to_sse_bytes())
         
         logger.info(
             "HITL event created and queued for SSE (non-blocking)",
             event_id=event_id,
             user_id=user_id,
+            action=action_description,
             invocation_id=metadata.get('invocation_id') if metadata else None
         )
         
@@ -190,25 +233,29 @@ class HITLService:
             decision: User's decision (approve/reject)
             user_id: User ID who made the decision
         """
-        logger.info(
-            "Storing HITL decision",
-            event_id=event_id,
-            approved=decision.approved,
-            user_id=user_id
-        )
-        
         if event_id in self.pending_decisions:
-            future = self.pending_decisions[event_id]
+            future, _ = self.pending_decisions.pop(event_id)
             if not future.done():
                 future.set_result(decision)
-                logger.info("HITL decision future resolved", event_id=event_id)
+                logger.info(
+                    "HITL decision stored",
+                    event_id=event_id,
+                    approved=decision.approved,
+                    user_id=user_id
+                )
             else:
-                logger.warning("HITL decision future already resolved", event_id=event_id)
+                logger.warning(
+                    "HITL decision future already resolved",
+                    event_id=event_id,
+                    user_id=user_id
+                )
         else:
+            self.unknown_decisions += 1
             logger.warning(
                 "Decision for unknown event",
                 event_id=event_id,
-                available_events=list(self.pending_decisions.keys())
+                user_id=user_id,
+                known_count=len(self.pending_decisions)
             )
     
     def get_event(self, event_id: str) -> Optional[HITLEvent]:
@@ -235,16 +282,9 @@ class HITLService:
             logger.debug("Removed HITL event from storage", event_id=event_id)
 
 
-# Singleton instance
-_hitl_service_instance: Optional[HITLService] = None
-
-
+@functools.lru_cache(maxsize=1)
 def get_hitl_service() -> HITLService:
-    """Get singleton HITL service instance"""
-    global _hitl_service_instance
-    if _hitl_service_instance is None:
-        _hitl_service_instance = HITLService()
-        logger.info("HITLService singleton created")
-    return _hitl_service_instance
+    """Get singleton HITL service instance (created once, on first call)"""
+    return HITLService()
 
 
@@ -5,7 +5,15 @@ This service provides centralized prompt management using Langfuse,
 with full tracing, metrics, and automatic fallback support.
 """
 
-from typing import Dict, Any, Optional
+import asyncio
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, NamedTuple, Optional, Tuple
+import orjson
 import structlog
 from langfuse import Langfuse
 from opentelemetry import trace
@@ -14,6 +22,24 @@ from opentelemetry.trace import Status, StatusCode
 logger = structlog.get_logger()
 tracer = trace.get_tracer(__name__)
 
+# Default number of (name, label) prompts kept; least recently used ones are evicted
+PROMPT_CACHE_MAX_SIZE = 256
+
+# Max age of the on-disk prompt snapshot (persist_path) still used to warm the cache
+PROMPT_PERSIST_TTL_SECONDS = 3600
+
+# Cache keys are (name, label) tuples: hashing two strings is cheaper than building "name:label"
+_PromptKey = Tuple[str, str]
+
+
+class _CachedPrompt(NamedTuple):
+    """Prompt text and config plus the metadata reported by get_prompt_metadata()"""
+    text: str
+    source: str  # "langfuse" or "fallback"
+    version: Any
+    label: str
+    config: Dict[str, Any]  # Langfuse prompt config (model, temperature, ...); {} for fallback
+
 
 class PromptService:
     """
@@ -32,20 +58,45 @@ class PromptService:
         langfuse_public_key: str,
         langfuse_secret_key: str,
         langfuse_host: str,
-        enable_cache: bool = True
+        enable_cache: bool = True,
+        max_cache_size: int = PROMPT_CACHE_MAX_SIZE,
+        persist_path: Optional[str] = None,
+        persist_ttl_seconds: float = PROMPT_PERSIST_TTL_SECONDS
     ):
+        """
+        Args:
+            persist_path: Optional JSON file where prompts loaded from Langfuse are
+                snapshotted; a fresh enough snapshot warms the cache on startup so
+                those prompts need no Langfuse round-trip after a restart
+            persist_ttl_seconds: Snapshots older than this are ignored
+        """
         self.langfuse = Langfuse(
             public_key=langfuse_public_key,
             secret_key=langfuse_secret_key,
             host=langfuse_host
         )
         self.enable_cache = enable_cache
-        self._cache: Dict[str, Dict[str, Any]] = {}
+        self.max_cache_size = max_cache_size
+        self._cache: "OrderedDict[_PromptKey, _CachedPrompt]" = OrderedDict()
+        # Fetches also run in worker threads (aget_prompt): inserts + evictions are locked
+        self._cache_lock = threading.Lock()
+        # Concurrent misses for one cache key share a single Langfuse fetch:
+        # per-key locks for sync callers, in-flight tasks for aget_prompt()
+        self._fetch_locks: "weakref.WeakValueDictionary[_PromptKey, threading.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._fetch_locks_guard = threading.Lock()
+        self._inflight: Dict[_PromptKey, asyncio.Future] = {}
+        self._persist_path = Path(persist_path).expanduser() if persist_path else None
+        self._persist_lock = threading.Lock()
+        
+        warmed = self._load_persisted(persist_ttl_seconds) if self.enable_cache else 0
         
         logger.info(
             "PromptService initialized",
             langfuse_host=langfuse_host,
-            cache_enabled=enable_cache
+            cache_enabled=enable_cache,
+            warmed_from_disk=warmed
         )
     
     def get_prompt(
@@ -58,61 +109,133 @@ class PromptService:
         """
         Fetch prompt from Langfuse with automatic fallback and full observability.
         
-        This method creates a span in the current trace with detailed attributes
-        about the prompt loading process, including source, version, and cache status.
+        Cache hits return straight away; a miss creates a span in the current trace
+        with detailed attributes about the fetch, including source and version.
         
         Args:
             name: Prompt name in Langfuse
             fallback: Hardcoded prompt to use if Langfuse fails
             label: Version label (production, staging, etc.)
-            cache_key: Optional cache key (defaults to f"{name}:{label}")
+            cache_key: Optional cache key, scoped to the prompt name (defaults to label)
         
         Returns:
             Prompt string from Langfuse or fallback
         """
-        cache_key = cache_key or f"{name}:{label}"
+        return self._load_prompt(name, fallback, label, cache_key).text
+    
+    def get_prompt_with_config(
+        self,
+        name: str,
+        fallback: str,
+        label: str = "production",
+        cache_key: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Fetch prompt text and its config (model, temperature, etc.) in one Langfuse call.
         
-        # Create observability span
-        with tracer.start_as_current_span("prompt_service.get_prompt") as span:
-            # Set base attributes
-            span.set_attribute("prompt.name", name)
-            span.set_attribute("prompt.label", label)
-            span.set_attribute("prompt.cache_enabled", self.enable_cache)
-            
-            # Check cache first
-            if self.enable_cache and cache_key in self._cache:
-                cached_data = self._cache[cache_key]
-                
-                span.set_attribute("prompt.cache_hit", True)
-                span.set_attribute("prompt.source", cached_data["source"])
-                span.set_attribute("prompt.version", cached_data.get("version", "unknown"))
-                span.set_attribute("prompt.length", len(cached_data["text"]))
-                
-                span.add_event("prompt_loaded_from_cache", {
-                    "cache_key": cache_key,
-                    "source": cached_data["source"]
-                })
-                
-                logger.debug(
-                    "Prompt loaded from cache",
-                    prompt_name=name,
-                    label=label,
-                    source=cached_data["source"],
-                    version=cached_data.get("version", "unknown"),
-                    cache_hit=True
-                )
-                
-                return cached_data["text"]
-            
-            span.set_attribute("prompt.cache_hit", False)
-            
-            # Try to fetch from Langfuse
+        Same arguments and caching as get_prompt(); the config is {} when the
+        fallback is used.
+        
+        Returns:
+            (prompt string, config dict)
+        """
+        entry = self._load_prompt(name, fallback, label, cache_key)
+        return entry.text, entry.config
+    
+    async def aget_prompt(
+        self,
+        name: str,
+        fallback: str,
+        label: str = "production",
+        cache_key: Optional[str] = None
+    ) -> str:
+        """
+        Async get_prompt() for use on the event loop.
+        
+        The Langfuse fetch runs in a worker thread, and concurrent callers missing
+        the same prompt await one shared fetch instead of each calling Langfuse.
+        """
+        key = (name, cache_key or label)
+        if self.enable_cache:
+            cached_data = self._cached_entry(key)
+            if cached_data is not None:
+                return cached_data.text
+        
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(
+                asyncio.to_thread(self._load_prompt, name, fallback, label, cache_key)
+            )
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # A cancelled caller must not cancel the fetch other callers are waiting on
+        entry = await asyncio.shield(inflight)
+        return entry.text
+    
+    def _load_prompt(
+        self,
+        name: str,
+        fallback: str,
+        label: str,
+        cache_key: Optional[str]
+    ) -> _CachedPrompt:
+        """Return the cache entry for a prompt, fetching it from Langfuse on a miss."""
+        key = (name, cache_key or label)
+        
+        if not self.enable_cache:
+            return self._fetch_prompt(name, fallback, label, key)
+        
+        # Cache hits are a dict lookup: served without opening a span
+        cached_data = self._cached_entry(key)
+        if cached_data is not None:
+            return cached_data
+        
+        # One fetch per prompt at a time; whoever waited reuses its result
+        with self._fetch_lock(key):
+            cached_data = self._cache.get(key)
+            if cached_data is not None:
+                return cached_data
+            return self._fetch_prompt(name, fallback, label, key)
+    
+    def _cached_entry(self, cache_key: _PromptKey) -> Optional[_CachedPrompt]:
+        """Look up a cache entry and mark it as recently used."""
+        # Hits are not logged: they are the common case, and get_prompt_metadata()
+        # reports what is cached
+        with self._cache_lock:
+            cached_data = self._cache.get(cache_key)
+            if cached_data is not None:
+                self._cache.move_to_end(cache_key)
+        return cached_data
+    
+    def _fetch_lock(self, cache_key: _PromptKey) -> threading.Lock:
+        """Per-cache-key lock, alive only while some caller holds it."""
+        with self._fetch_locks_guard:
+            lock = self._fetch_locks.get(cache_key)
+            if lock is None:
+                lock = threading.Lock()
+                self._fetch_locks[cache_key] = lock
+            return lock
+    
+    def _fetch_prompt(
+        self,
+        name: str,
+        fallback: str,
+        label: str,
+        cache_key: _PromptKey
+    ) -> _CachedPrompt:
+        """Fetch a prompt from Langfuse (or fall back) and cache the result."""
+        # Create observability span for the Langfuse fetch
+        with tracer.start_as_current_span(
+            "prompt_service.get_prompt",
+            attributes={
+                "prompt.name": name,
+                "prompt.label": label,
+                "prompt.cache_enabled": self.enable_cache,
+                "prompt.cache_hit": False,
+            },
+        ) as span:
+            # Outcome goes in span attributes (no span events): one payload per fetch
             try:
-                span.add_event("fetching_from_langfuse", {
-                    "prompt_name": name,
-                    "label": label
-                })
-                
                 prompt_obj = self.langfuse.get_prompt(
                     name,
                     label=label,
@@ -123,54 +246,40 @@ class PromptService:
                 prompt_version = prompt_obj.version
                 
                 # Set success attributes
-                span.set_attribute("prompt.source", "langfuse")
-                span.set_attribute("prompt.version", prompt_version)
-                span.set_attribute("prompt.length", len(prompt_text))
-                span.set_attribute("prompt.fallback_used", False)
-                span.set_status(Status(StatusCode.OK))
-                
-                span.add_event("prompt_loaded_from_langfuse", {
-                    "version": prompt_version,
-                    "length": len(prompt_text)
+                span.set_attributes({
+                    "prompt.source": "langfuse",
+                    "prompt.version": prompt_version,
+                    "prompt.length": len(prompt_text),
+                    "prompt.fallback_used": False,
                 })
+                span.set_status(Status(StatusCode.OK))
                 
                 logger.info(
                     "✅ Prompt loaded from Langfuse",
                     prompt_name=name,
                     prompt_version=prompt_version,
                     label=label,
-                    source="langfuse",
-                    fallback_used=False,
-                    cache_hit=False,
                     length=len(prompt_text)
                 )
                 
-                # Cache the result with metadata
+                # Cache the result with metadata and config
+                entry = _CachedPrompt(
+                    prompt_text, "langfuse", prompt_version, label, prompt_obj.config or {}
+                )
                 if self.enable_cache:
-                    self._cache[cache_key] = {
-                        "text": prompt_text,
-                        "source": "langfuse",
-                        "version": prompt_version,
-                        "label": label
-                    }
+                    self._cache_put(cache_key, entry)
                 
-                return prompt_text
+                return entry
                 
             except Exception as e:
                 # Fallback path
-                span.set_attribute("prompt.source", "fallback")
-                span.set_attribute("prompt.version", "hardcoded")
-                span.set_attribute("prompt.length", len(fallback))
-                span.set_attribute("prompt.fallback_used", True)
-                span.set_attribute("prompt.error", str(e))
-                
-                span.add_event("langfuse_fetch_failed", {
-                    "error": str(e),
-                    "error_type": type(e).__name__
-                })
-                
-                span.add_event("using_hardcoded_fallback", {
-                    "fallback_length": len(fallback)
+                span.set_attributes({
+                    "prompt.source": "fallback",
+                    "prompt.version": "hardcoded",
+                    "prompt.length": len(fallback),
+                    "prompt.fallback_used": True,
+                    "prompt.error": str(e),
+                    "prompt.error_type": type(e).__name__,
                 })
                 
                 # Warning level (no error) - fallback is expected behavior
@@ -180,24 +289,71 @@ class PromptService:
                     "⚠️  Failed to load prompt from Langfuse, using hardcoded fallback",
                     prompt_name=name,
                     label=label,
-                    source="fallback",
-                    fallback_used=True,
-                    cache_hit=False,
                     error=str(e),
                     error_type=type(e).__name__,
                     length=len(fallback)
                 )
                 
                 # Cache the fallback too (to avoid repeated failures)
+                entry = _CachedPrompt(fallback, "fallback", "hardcoded", label, {})
                 if self.enable_cache:
-                    self._cache[cache_key] = {
-                        "text": fallback,
-                        "source": "fallback",
-                        "version": "hardcoded",
-                        "label": label
-                    }
+                    self._cache_put(cache_key, entry)
                 
-                return fallback
+                return entry
+    
+    def _cache_put(self, cache_key: _PromptKey, entry: _CachedPrompt) -> None:
+        """Insert or refresh a cache entry, evicting the least recently used past capacity."""
+        with self._cache_lock:
+            self._cache[cache_key] = entry
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.max_cache_size:
+                self._cache.popitem(last=False)
+        # Fallbacks are not persisted: after a restart Langfuse gets another chance
+        if self._persist_path is not None and entry.source == "langfuse":
+            self._persist()
+    
+    def _load_persisted(self, ttl_seconds: float) -> int:
+        """Warm the cache from the persist_path snapshot. Returns the number of prompts loaded."""
+        if self._persist_path is None:
+            return 0
+        try:
+            if time.time() - self._persist_path.stat().st_mtime > ttl_seconds:
+                return 0
+            records = orjson.loads(self._persist_path.read_bytes())
+            for name, key, text, version, label, config in records[-self.max_cache_size:]:
+                self._cache[(name, key)] = _CachedPrompt(text, "langfuse", version, label, config)
+            return len(self._cache)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning(
+                "Failed to load persisted prompt cache",
+                path=str(self._persist_path),
+                error=str(e)
+            )
+            self._cache.clear()
+            return 0
+    
+    def _persist(self) -> None:
+        """Snapshot the Langfuse-sourced cache entries to persist_path (atomic replace)."""
+        with self._cache_lock:
+            records = [
+                (key[0], key[1], entry.text, entry.version, entry.label, entry.config)
+                for key, entry in self._cache.items()
+                if entry.source == "langfuse"
+            ]
+        try:
+            with self._persist_lock:
+                self._persist_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self._persist_path.with_name(self._persist_path.name + ".tmp")
+                tmp_path.write_bytes(orjson.dumps(records))
+                os.replace(tmp_path, self._persist_path)
+        except Exception as e:
+            logger.warning(
+                "Failed to persist prompt cache",
+                path=str(self._persist_path),
+                error=str(e)
+            )
     
     def get_prompt_metadata(
         self,
@@ -210,15 +366,13 @@ class PromptService:
         Returns:
             Dict with source, version, label, length (empty if not cached)
         """
-        cache_key = f"{name}:{label}"
-        
-        if cache_key in self._cache:
-            cached_data = self._cache[cache_key]
+        cached_data = self._cache.get((name, label))
+        if cached_data is not None:
             return {
-                "source": cached_data["source"],
-                "version": cached_data.get("version", "unknown"),
-                "label": cached_data["label"],
-                "length": len(cached_data["text"]),
+                "source": cached_data.source,
+                "version": cached_data.version,
+                "label": cached_data.label,
+                "length": len(cached_data.text),
                 "cached": True
             }
         
@@ -226,33 +380,27 @@ class PromptService:
     
     def clear_cache(self, name: Optional[str] = None):
         """Clear cache for a specific prompt or all prompts."""
-        with tracer.start_as_current_span("prompt_service.clear_cache") as span:
-            if name:
-                keys_to_remove = [k for k in self._cache if k.startswith(f"{name}:")]
-                count = len(keys_to_remove)
-                
+        # In-memory only: logged, not traced
+        if name:
+            with self._cache_lock:
+                keys_to_remove = [k for k in self._cache if k[0] == name]
                 for key in keys_to_remove:
                     del self._cache[key]
-                
-                span.set_attribute("cache.cleared_count", count)
-                span.set_attribute("cache.prompt_name", name)
-                
-                logger.info(
-                    "Prompt cache cleared",
-                    prompt_name=name,
-                    cleared_count=count
-                )
-            else:
+            
+            logger.info(
+                "Prompt cache cleared",
+                prompt_name=name,
+                cleared_count=len(keys_to_remove)
+            )
+        else:
+            with self._cache_lock:
                 count = len(self._cache)
                 self._cache.clear()
-                
-                span.set_attribute("cache.cleared_count", count)
-                span.set_attribute("cache.cleared_all", True)
-                
-                logger.info(
-                    "All prompt cache cleared",
-                    cleared_count=count
-                )
+            
+            logger.info(
+                "All prompt cache cleared",
+                cleared_count=count
+            )
     
     def get_prompt_config(
         self,
@@ -262,8 +410,16 @@ class PromptService:
         """
         Get config (model, temperature, etc.) from Langfuse prompt.
         
+        Served from the cache when get_prompt() already loaded the prompt; prefer
+        get_prompt_with_config() when both are needed.
+        
         Returns empty dict if not found or on error.
         """
+        cache_key = (name, label)
+        cached_data = self._cached_entry(cache_key)
+        if cached_data is not None:
+            return cached_data.config
+        
         with tracer.start_as_current_span("prompt_service.get_config") as span:
             span.set_attribute("prompt.name", name)
             span.set_attribute("prompt.label", label)
@@ -272,6 +428,13 @@ class PromptService:
                 prompt_obj = self.langfuse.get_prompt(name, label=label, type="text")
                 config = prompt_obj.config or {}
                 
+                # Keep the whole prompt so a following get_prompt() needs no fetch
+                if self.enable_cache:
+                    self._cache_put(
+                        cache_key,
+                        _CachedPrompt(prompt_obj.prompt, "langfuse", prompt_obj.version, label, config)
+                    )
+                
                 span.set_attribute("config.found", True)
                 span.set_attribute("config.keys", list(config.keys()))
                 
@@ -5,12 +5,15 @@ Generates ADK tools from A2A agent configuration without code changes
 Follows the official ADK pattern from McpTool for dynamic tool creation.
 """
 
-import json
-import sys
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 import structlog
 
 from nodus_adk_runtime.config import settings
@@ -18,9 +21,11 @@ from nodus_adk_runtime.tools.a2a_tool import A2ATool
 
 logger = structlog.get_logger()
 
-# Import A2AClient from nodus-adk-agents (needed for discover_capabilities)
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent.parent / "nodus-adk-agents" / "src"))
+# Timeout for Agent Card discovery probes
+A2A_DISCOVERY_TIMEOUT_SECONDS = 10.0
 
+# Import A2AClient from nodus-adk-agents (needed for discover_capabilities).
+# The package is installed alongside the runtime, as for nodus_adk_agents.root_agent.
 try:
     from nodus_adk_agents.a2a_client import A2AClient
 except ImportError:
@@ -28,26 +33,18 @@ except ImportError:
     A2AClient = None
 
 
+@dataclass(slots=True, frozen=True)
 class A2AAgentConfig:
     """Configuration for an A2A agent"""
     
-    def __init__(
-        self,
-        name: str,
-        endpoint: str,
-        card_url: str,
-        enabled: bool = True,
-        timeout: float = 30.0,
-        description: str = "",
-        capabilities: Optional[List[str]] = None,
-    ):
-        self.name = name
-        self.endpoint = endpoint
-        self.card_url = card_url
-        self.enabled = enabled
-        self.timeout = timeout
-        self.description = description
-        self.capabilities = capabilities or []
+    name: str
+    endpoint: str
+    card_url: str
+    enabled: bool = True
+    timeout: float = 30.0
+    description: str = ""
+    # Lists are unhashable: leave capabilities out of __hash__ so configs stay usable as keys
+    capabilities: List[str] = field(default_factory=list, hash=False)
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "A2AAgentConfig":
@@ -59,7 +56,7 @@ class A2AAgentConfig:
             enabled=data.get("enabled", True),
             timeout=data.get("timeout", 30.0),
             description=data.get("description", ""),
-            capabilities=data.get("capabilities", []),
+            capabilities=data.get("capabilities") or [],
         )
 
 
@@ -90,6 +87,15 @@ class A2AToolBuilder:
         self.config_path = Path(config_path)
         self.agents: Dict[str, A2AAgentConfig] = {}
         self.tools: List[A2ATool] = []
+        # Last parsed config file: (st_mtime_ns, config), reused while the file is unchanged
+        self._config_cache: Optional[Tuple[int, Dict[str, Any]]] = None
+        # One A2AClient per (endpoint, timeout), reused by discovery and by the tools
+        self._clients: Dict[Tuple[str, float], Any] = {}
+        # Discovered Agent Cards keyed by (endpoint, card_url): (monotonic expiry, card)
+        self._card_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        # Tools from the last build, keyed by (agent, method, endpoint, timeout, method_info JSON):
+        # unchanged capabilities reuse the same A2ATool instead of constructing a new one
+        self._tool_cache: Dict[Tuple[str, str, str, float, bytes], A2ATool] = {}
         
         if A2AClient is None:
             logger.error("A2AClient not available, cannot build A2A tools")
@@ -104,8 +110,12 @@ class A2AToolBuilder:
             return
         
         try:
-            with open(self.config_path, "r") as f:
-                config = json.load(f)
+            mtime_ns = self.config_path.stat().st_mtime_ns
+            if self._config_cache is not None and self._config_cache[0] == mtime_ns:
+                config = self._config_cache[1]
+            else:
+                config = orjson.loads(self.config_path.read_bytes())
+                self._config_cache = (mtime_ns, config)
             
             for agent_data in config.get("agents", []):
                 agent_config = A2AAgentConfig.from_dict(agent_data)
@@ -136,10 +146,39 @@ class A2AToolBuilder:
                 path=str(self.config_path),
             )
     
+    def _get_client(self, endpoint: str, timeout: float) -> Optional[Any]:
+        """Get or create the shared A2AClient for an endpoint (None if A2AClient is unavailable)."""
+        key = (endpoint, timeout)
+        client = self._clients.get(key)
+        if client is None and A2AClient is not None:
+            client = A2AClient(endpoint, timeout=timeout)
+            self._clients[key] = client
+        return client
+    
+    async def aclose(self) -> None:
+        """Close the shared A2A clients (called on app shutdown)."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        # Cached tools hold these clients
+        self._tool_cache.clear()
+        for client in clients:
+            close = getattr(client, "aclose", None) or getattr(client, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning("Failed to close A2A client", error=str(e))
+    
     async def discover_capabilities(self, agent_config: A2AAgentConfig) -> Dict[str, Any]:
         """
         Discover agent capabilities via Agent Card
         
+        Cards are reused for settings.a2a_card_cache_ttl_seconds; failed discoveries
+        are not cached, so the agent is probed again on the next build.
+        
         Args:
             agent_config: Agent configuration
             
@@ -149,8 +188,13 @@ class A2AToolBuilder:
         if A2AClient is None:
             return {}
         
+        cache_key = (agent_config.endpoint, agent_config.card_url)
+        cached = self._card_cache.get(cache_key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        
         try:
-            client = A2AClient(agent_config.endpoint, timeout=10.0)
+            client = self._get_client(agent_config.endpoint, A2A_DISCOVERY_TIMEOUT_SECONDS)
             card = await client.discover()
             
             logger.info(
@@ -159,6 +203,9 @@ class A2AToolBuilder:
                 capabilities=list(card.get("capabilities", {}).keys()),
             )
             
+            if card:
+                expires_at = time.monotonic() + settings.a2a_card_cache_ttl_seconds
+                self._card_cache[cache_key] = (expires_at, card)
             return card
         
         except Exception as e:
@@ -184,10 +231,23 @@ class A2AToolBuilder:
             List of A2ATool instances ready for ADK Agent
         """
         self.tools = []
+        tool_cache: Dict[Tuple[str, str, str, float, bytes], A2ATool] = {}
         
-        for agent_config in self.agents.values():
-            # Discover capabilities
-            card = await self.discover_capabilities(agent_config)
+        # Discover all agents concurrently: each probe is an independent round-trip
+        agent_configs = list(self.agents.values())
+        cards = await asyncio.gather(
+            *(self.discover_capabilities(agent_config) for agent_config in agent_configs),
+            return_exceptions=True,
+        )
+        
+        for agent_config, card in zip(agent_configs, cards):
+            if isinstance(card, BaseException):
+                logger.error(
+                    "Failed to discover A2A agent",
+                    name=agent_config.name,
+                    error=str(card),
+                )
+                card = {}
             
             if not card:
                 logger.warning(
@@ -200,6 +260,19 @@ class A2AToolBuilder:
             capabilities = card.get("capabilities", {})
             
             for method, method_info in capabilities.items():
+                tool_key = (
+                    agent_config.name,
+                    method,
+                    agent_config.endpoint,
+                    agent_config.timeout,
+                    orjson.dumps(method_info, option=orjson.OPT_SORT_KEYS),
+                )
+                tool = self._tool_cache.get(tool_key)
+                if tool is not None:
+                    tool_cache[tool_key] = tool
+                    self.tools.append(tool)
+                    continue
+                
                 # Detect if this is a HITL tool (methods ending with _confirmation or containing _with_confirmation)
                 is_hitl_tool = (
                     method.endswith("_confirmation") or 
@@ -215,8 +288,10 @@ class A2AToolBuilder:
                     endpoint=agent_config.endpoint,
                     timeout=agent_config.timeout,
                     is_hitl_tool=is_hitl_tool,
+                    client=self._get_client(agent_config.endpoint, agent_config.timeout),
                 )
                 
+                tool_cache[tool_key] = tool
                 self.tools.append(tool)
                 
                 logger.info(
@@ -228,18 +303,25 @@ class A2AToolBuilder:
                     is_long_running=tool.is_long_running,
                 )
         
+        # Keep only this build's tools: removed agents/methods are released
+        self._tool_cache = tool_cache
         logger.info("A2A tools built (ADK-compliant)", count=len(self.tools))
         return self.tools
     
-    async def reload(self) -> List[A2ATool]:
+    async def reload(self, force: bool = False) -> List[A2ATool]:
         """
         Reload configuration and rebuild tools
         
         Useful for hot reload without restarting the service
+        
+        Args:
+            force: Drop cached Agent Cards and re-discover every agent
         """
-        logger.info("Reloading A2A agents configuration")
+        logger.info("Reloading A2A agents configuration", force=force)
         self.agents.clear()
         self.tools.clear()
+        if force:
+            self._card_cache.clear()
         
         self.load_config()
         return await self.build_tools()
@@ -278,12 +360,15 @@ async def get_a2a_tools(config_path: Optional[str] = None) -> List[A2ATool]:
     return await _tool_builder.build_tools()
 
 
-async def reload_a2a_tools() -> List[A2ATool]:
+async def reload_a2a_tools(force: bool = False) -> List[A2ATool]:
     """
     Reload A2A tools from configuration
     
     Useful for hot reload without restarting
     
+    Args:
+        force: Drop cached Agent Cards and re-discover every agent
+        
     Returns:
         List of A2ATool instances
     """
@@ -293,7 +378,13 @@ async def reload_a2a_tools() -> List[A2ATool]:
         _tool_builder = A2AToolBuilder()
         _tool_builder.load_config()
     
-    return await _tool_builder.reload()
+    return await _tool_builder.reload(force=force)
+
+
+async def close_a2a_tools() -> None:
+    """Close the A2A clients held by the tool builder (called on app shutdown)."""
+    if _tool_builder is not None:
+        await _tool_builder.aclose()
 
 
 def get_agent_config(agent_name: str) -> Optional[A2AAgentConfig]:
@@ -52,6 +52,7 @@ class A2ATool(BaseTool):
         timeout: float = 30.0,
         require_confirmation: Union[bool, Callable[..., bool]] = False,
         is_hitl_tool: bool = False,
+        client: Optional[Any] = None,
     ):
         """
         Initialize an A2A tool.
@@ -64,6 +65,7 @@ class A2ATool(BaseTool):
             timeout: Request timeout in seconds
             require_confirmation: Whether this tool requires HITL confirmation
             is_hitl_tool: Whether this tool requires HITL (marks as long_running for ADK resumability)
+            client: Shared A2AClient for the endpoint (a new one is created per call if omitted)
         """
         tool_name = f"{agent_name}_{method}"
         description = method_info.get("description", f"Call {method} on {agent_name}")
@@ -82,6 +84,7 @@ class A2ATool(BaseTool):
         self._timeout = timeout
         self._require_confirmation = require_confirmation
         self._is_hitl_tool = is_hitl_tool
+        self._client = client
         
         logger.info(
             "A2ATool created",
@@ -150,12 +153,15 @@ class A2ATool(BaseTool):
         Returns:
             Result from the A2A agent, or HITL marker if confirmation required
         """
-        # Import here to avoid circular dependency
-        try:
-            from nodus_adk_agents.a2a_client import A2AClient
-        except ImportError:
-            logger.error("A2AClient not available")
-            return {"error": "A2AClient not available"}
+        client = self._client
+        if client is None:
+            # Import here to avoid circular dependency
+            try:
+                from nodus_adk_agents.a2a_client import A2AClient
+            except ImportError:
+                logger.error("A2AClient not available")
+                return {"error": "A2AClient not available"}
+            client = A2AClient(self._endpoint, timeout=self._timeout)
         
         logger.info(
             "A2A tool called",
@@ -165,8 +171,7 @@ class A2ATool(BaseTool):
         )
         
         try:
-            # Create A2A client and call the agent
-            client = A2AClient(self._endpoint, timeout=self._timeout)
+            # Call the agent
             result = await client.call(self._method, args)
             
             # Check if agent requires HITL confirmation
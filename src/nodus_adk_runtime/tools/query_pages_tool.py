@@ -68,7 +68,7 @@ class QueryPagesTool(BaseTool):
         if openai_api_key:
             self.openai_client = AsyncOpenAI(
                 api_key=openai_api_key,
-                base_url=settings.litellm_proxy_api_base + "/v1",
+                base_url=settings.litellm_base_normalized + "/v1",
             )
         else:
             self.openai_client = None
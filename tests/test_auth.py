@@ -0,0 +1,173 @@
+"""
+Tests for JWT validation caches in the auth middleware
+
+- Positive cache: validated tokens served without re-verification, LRU-bounded
+- Negative cache: rejected tokens answered without re-verification for a while
+- Clock skew: not-yet-valid tokens are never remembered as rejected
+"""
+
+import time
+from collections import OrderedDict
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from nodus_adk_runtime.middleware import auth
+
+
+@pytest.fixture
+def signing_key():
+    return Ed25519PrivateKey.generate()
+
+
+@pytest.fixture
+def jwk_lookups(monkeypatch, signing_key):
+    """Serve the test public key for every kid and count the lookups (cache misses)"""
+    lookups = []
+    
+    async def fake_get_jwk_for_kid(kid):
+        lookups.append(kid)
+        return signing_key.public_key()
+    
+    monkeypatch.setattr(auth, "get_jwk_for_kid", fake_get_jwk_for_kid)
+    monkeypatch.setattr(auth, "_token_cache", OrderedDict())
+    monkeypatch.setattr(auth, "_bad_tokens", OrderedDict())
+    return lookups
+
+
+def _make_token(key, **claims) -> str:
+    now = int(time.time())
+    payload = {
+        "sub": "user_123",
+        "iss": auth.JWT_ISSUER,
+        "aud": auth.JWT_AUDIENCE,
+        "exp": now + 3600,
+        "scopes": ["read", "write"],
+        "tenant_id": "tenant_1",
+    }
+    payload.update(claims)
+    return jwt.encode(payload, key, algorithm="EdDSA", headers={"kid": "test-kid"})
+
+
+async def _validate(token: str) -> auth.UserContext:
+    return await auth.validate_token(
+        HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    )
+
+
+class TestValidatedTokenCache:
+    """Test the positive (validated token) cache"""
+    
+    @pytest.mark.asyncio
+    async def test_valid_token_is_verified_once(self, signing_key, jwk_lookups):
+        """Test that a validated token is served from the cache afterwards"""
+        token = _make_token(signing_key)
+        
+        first = await _validate(token)
+        second = await _validate(token)
+        
+        assert first.sub == "user_123"
+        assert first.tenant_id == "tenant_1"
+        assert first.scopes == ["read", "write"]
+        assert second is first
+        assert len(jwk_lookups) == 1
+    
+    @pytest.mark.asyncio
+    async def test_cache_evicts_least_recently_used(self, monkeypatch, signing_key, jwk_lookups):
+        """Test that the cache keeps at most TOKEN_CACHE_MAX_SIZE tokens, dropping the LRU one"""
+        monkeypatch.setattr(auth, "TOKEN_CACHE_MAX_SIZE", 2)
+        tokens = [_make_token(signing_key, sub=f"user_{i}") for i in range(3)]
+        
+        await _validate(tokens[0])
+        await _validate(tokens[1])
+        await _validate(tokens[0])  # tokens[1] becomes least recently used
+        await _validate(tokens[2])
+        assert len(auth._token_cache) == 2
+        assert len(jwk_lookups) == 3
+        
+        await _validate(tokens[0])
+        assert len(jwk_lookups) == 3
+        await _validate(tokens[1])
+        assert len(jwk_lookups) == 4
+    
+    @pytest.mark.asyncio
+    async def test_token_close_to_expiry_is_verified_again(self, signing_key, jwk_lookups):
+        """Test that entries within the expiry margin are not served from the cache"""
+        token = _make_token(
+            signing_key, exp=int(time.time()) + auth.TOKEN_CACHE_EXPIRY_MARGIN_SECONDS - 2
+        )
+        
+        await _validate(token)
+        await _validate(token)
+        
+        assert len(jwk_lookups) == 2
+
+
+class TestRejectedTokenCache:
+    """Test the negative (rejected token) cache"""
+    
+    @pytest.mark.asyncio
+    async def test_rejected_token_is_not_verified_again(self, signing_key, jwk_lookups):
+        """Test that a replayed bad token gets the same 401 without another verification"""
+        token = _make_token(Ed25519PrivateKey.generate())  # Signed with another key
+        
+        with pytest.raises(HTTPException) as first:
+            await _validate(token)
+        with pytest.raises(HTTPException) as second:
+            await _validate(token)
+        
+        assert first.value.status_code == 401
+        assert second.value.status_code == 401
+        assert second.value.detail == first.value.detail
+        assert len(jwk_lookups) == 1
+    
+    @pytest.mark.asyncio
+    async def test_rejection_expires(self, monkeypatch, signing_key, jwk_lookups):
+        """Test that a rejection is only remembered for BAD_TOKEN_CACHE_TTL_SECONDS"""
+        monkeypatch.setattr(auth, "BAD_TOKEN_CACHE_TTL_SECONDS", 0)
+        token = _make_token(signing_key, exp=int(time.time()) - 60)
+        
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc_info:
+                await _validate(token)
+            assert exc_info.value.detail == "Token expired"
+        
+        assert len(jwk_lookups) == 2
+    
+    @pytest.mark.asyncio
+    async def test_immature_token_is_not_remembered(self, signing_key, jwk_lookups):
+        """Test that a not-yet-valid token (clock skew) is checked again on the next call"""
+        token = _make_token(signing_key, nbf=int(time.time()) + 60)
+        
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc_info:
+                await _validate(token)
+            assert exc_info.value.status_code == 401
+            assert exc_info.value.detail == "Token not yet valid"
+        
+        assert len(auth._bad_tokens) == 0
+        assert len(jwk_lookups) == 2
+
+
+class TestClaimValidation:
+    """Test that custom claims are type-checked before building the UserContext"""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("claims", [
+        {"scopes": "read write"},
+        {"role_name": 5},
+        {"tenant_id": ["tenant_1"]},
+    ])
+    async def test_wrongly_typed_claims_are_rejected(self, signing_key, jwk_lookups, claims):
+        """Test that a signed token with wrongly typed custom claims gets a 401"""
+        token = _make_token(signing_key, **claims)
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await _validate(token)
+        
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Invalid token claims"
+        assert len(auth._token_cache) == 0
@@ -0,0 +1,129 @@
+"""
+Tests for the per-user HITL event buffers (services/hitl_queues.py)
+
+- EventRing: bounded buffer, drop-oldest and the dropped-events counter
+- UserEventChannel: backlog, fan-out to several SSE streams, unsubscribe
+"""
+
+import asyncio
+
+import pytest
+
+from nodus_adk_runtime.services import hitl_queues
+from nodus_adk_runtime.services.hitl_queues import (
+    EventRing,
+    UserEventChannel,
+    dropped_event_count,
+    get_user_queue,
+)
+
+
+def _drain(ring: EventRing) -> list:
+    """Read everything currently buffered in a ring"""
+    async def read_all():
+        return [await ring.get() for _ in range(len(ring))]
+    return asyncio.run(read_all())
+
+
+class TestEventRing:
+    """Test the bounded per-stream buffer"""
+    
+    def test_put_and_get_in_order(self):
+        """Test that events come out in the order they were queued"""
+        ring = EventRing(maxlen=10)
+        for frame in (b"a", b"b", b"c"):
+            ring.put_nowait(frame)
+        
+        assert len(ring) == 3
+        assert _drain(ring) == [b"a", b"b", b"c"]
+        assert len(ring) == 0
+    
+    def test_full_ring_drops_oldest_and_counts(self):
+        """Test that a full ring drops the oldest event and counts the drop"""
+        ring = EventRing(maxlen=2)
+        before = dropped_event_count()
+        
+        ring.put_nowait(b"1")
+        ring.put_nowait(b"2")
+        assert dropped_event_count() == before
+        
+        ring.put_nowait(b"3")
+        ring.put_nowait(b"4")
+        
+        assert dropped_event_count() == before + 2
+        assert _drain(ring) == [b"3", b"4"]
+    
+    @pytest.mark.asyncio
+    async def test_get_waits_for_next_event(self):
+        """Test that get() blocks on an empty ring until an event arrives"""
+        ring = EventRing()
+        getter = asyncio.create_task(ring.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        
+        ring.put_nowait(b"frame")
+        assert await asyncio.wait_for(getter, timeout=1.0) == b"frame"
+
+
+class TestUserEventChannel:
+    """Test fan-out of one user's events to their SSE streams"""
+    
+    def test_events_without_subscribers_go_to_first_subscriber(self):
+        """Test that events queued with no stream open are handed to the next one"""
+        channel = UserEventChannel()
+        channel.put_nowait(b"early")
+        
+        first = channel.subscribe()
+        second = channel.subscribe()
+        
+        assert _drain(first) == [b"early"]
+        assert len(second) == 0
+    
+    def test_fan_out_to_all_subscribers(self):
+        """Test that every open stream receives each event"""
+        channel = UserEventChannel()
+        rings = [channel.subscribe() for _ in range(3)]
+        
+        channel.put_nowait(b"frame")
+        
+        for ring in rings:
+            assert _drain(ring) == [b"frame"]
+    
+    def test_unsubscribed_ring_stops_receiving(self):
+        """Test that a closed stream no longer receives events"""
+        channel = UserEventChannel()
+        kept = channel.subscribe()
+        closed = channel.subscribe()
+        
+        channel.unsubscribe(closed)
+        channel.put_nowait(b"frame")
+        
+        assert _drain(kept) == [b"frame"]
+        assert len(closed) == 0
+    
+    def test_last_unsubscribe_keeps_undelivered_events(self):
+        """Test that events the last stream did not send go back to the backlog"""
+        channel = UserEventChannel()
+        ring = channel.subscribe()
+        channel.put_nowait(b"pending")
+        
+        channel.unsubscribe(ring)
+        channel.put_nowait(b"later")
+        
+        assert _drain(channel.subscribe()) == [b"pending", b"later"]
+    
+    def test_unsubscribe_unknown_ring_is_ignored(self):
+        """Test that unsubscribing twice does not raise"""
+        channel = UserEventChannel()
+        ring = channel.subscribe()
+        channel.unsubscribe(ring)
+        channel.unsubscribe(ring)
+
+
+def test_get_user_queue_returns_same_channel(monkeypatch):
+    """Test that get_user_queue creates one channel per user"""
+    monkeypatch.setattr(hitl_queues, "hitl_event_queues", {})
+    
+    channel = get_user_queue("user_1")
+    assert get_user_queue("user_1") is channel
+    assert get_user_queue("user_2") is not channel
@@ -9,7 +9,8 @@ Tests for Phase 1, 2, and 3 of HITL resumability implementation:
 
 import pytest
 import asyncio
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import Mock, patch
+from nodus_adk_runtime.services import hitl_service
 from nodus_adk_runtime.services.hitl_service import (
     HITLService,
     HITLEvent,
@@ -39,9 +40,9 @@ class TestHITLService:
             'method': 'test_method'
         }
         
-        # Mock the queue
+        # Mock the queue (put_nowait is synchronous)
         with patch('nodus_adk_runtime.services.hitl_service.get_user_queue') as mock_queue:
-            mock_queue_instance = AsyncMock()
+            mock_queue_instance = Mock()
             mock_queue.return_value = mock_queue_instance
             
             # Create event
@@ -53,6 +54,13 @@ class TestHITLService:
                 metadata=metadata
             ))
             
+            # Verify the encoded SSE frame was queued for the user
+            mock_queue.assert_called_once_with("user_123")
+            mock_queue_instance.put_nowait.assert_called_once()
+            frame = mock_queue_instance.put_nowait.call_args.args[0]
+            assert frame.startswith(b"event: confirmation_required\r\ndata: ")
+            assert event_id.encode() in frame
+            
             # Verify event was stored
             assert event_id in service.pending_events
             stored_event = service.pending_events[event_id]
@@ -110,24 +118,72 @@ class TestHITLService:
         # Verify it's gone
         assert event_id not in service.pending_events
     
-    def test_store_decision_resolves_future(self):
+    @pytest.mark.asyncio
+    async def test_store_decision_resolves_future(self):
         """Test that store_decision resolves waiting future (legacy mode)"""
         service = HITLService()
         event_id = "test_event_future"
         
         # Create future
-        future = asyncio.Future()
-        service.pending_decisions[event_id] = future
+        future = asyncio.get_running_loop().create_future()
+        service.pending_decisions[event_id] = (future, float("inf"))
         
         # Store decision
         decision = HITLDecision(approved=True, reason="Test reason")
-        asyncio.run(service.store_decision(event_id, decision, "user_123"))
+        await service.store_decision(event_id, decision, "user_123")
         
         # Verify future was resolved
         assert future.done()
-        result = asyncio.run(asyncio.wrap_future(future))
+        result = await future
         assert result.approved is True
         assert result.reason == "Test reason"
+        assert event_id not in service.pending_decisions
+    
+    @pytest.mark.asyncio
+    async def test_request_confirmation_auto_rejects_after_deadline(self):
+        """Test that the timeout sweeper rejects a decision past its deadline"""
+        service = HITLService()
+        
+        with patch.object(hitl_service, "HITL_TIMEOUT_SWEEP_INTERVAL_SECONDS", 0.01), \
+                patch('nodus_adk_runtime.services.hitl_service.get_user_queue') as mock_queue:
+            mock_queue.return_value = Mock()
+            decision = await asyncio.wait_for(
+                service.request_confirmation(
+                    user_id="user_123",
+                    event_id="timeout_event",
+                    action_description="Test action",
+                    action_data={},
+                    timeout=0.05,
+                ),
+                timeout=2.0,
+            )
+        
+        assert decision.approved is False
+        assert decision.reason.startswith("Timeout")
+        assert "timeout_event" not in service.pending_decisions
+    
+    @pytest.mark.asyncio
+    async def test_sweeper_keeps_decisions_before_deadline(self):
+        """Test that the sweeper leaves decisions alone until their deadline"""
+        service = HITLService()
+        
+        with patch.object(hitl_service, "HITL_TIMEOUT_SWEEP_INTERVAL_SECONDS", 0.01), \
+                patch('nodus_adk_runtime.services.hitl_service.get_user_queue') as mock_queue:
+            mock_queue.return_value = Mock()
+            waiter = asyncio.create_task(service.request_confirmation(
+                user_id="user_123",
+                event_id="live_event",
+                action_description="Test action",
+                action_data={},
+                timeout=60.0,
+            ))
+            await asyncio.sleep(0.05)
+            assert not waiter.done()
+            
+            await service.store_decision("live_event", HITLDecision(approved=True), "user_123")
+            decision = await asyncio.wait_for(waiter, timeout=2.0)
+        
+        assert decision.approved is True
 
 
 class TestHITLResumabilityFlow:
@@ -150,7 +206,7 @@ class TestHITLResumabilityFlow:
         
         # Phase 2: Create event (non-blocking)
         with patch('nodus_adk_runtime.services.hitl_service.get_user_queue') as mock_queue:
-            mock_queue_instance = AsyncMock()
+            mock_queue_instance = Mock()
             mock_queue.return_value = mock_queue_instance
             
             await service.create_event_async(
@@ -160,6 +216,8 @@ class TestHITLResumabilityFlow:
                 action_data={"param": "value"},
                 metadata=metadata
             )
+            
+            mock_queue_instance.put_nowait.assert_called_once()
         
         # Verify event stored
         assert event_id in service.pending_events
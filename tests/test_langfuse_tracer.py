@@ -0,0 +1,99 @@
+"""
+Tests for the langfuse_trace() context manager
+
+- The active trace is visible through get_current_trace() inside the block only
+- The trace is ended as success or error, and the ContextVar reset, even on exceptions
+- Concurrent asyncio tasks each see their own trace
+"""
+
+import asyncio
+
+import pytest
+
+from nodus_adk_runtime import langfuse_tracer
+from nodus_adk_runtime.langfuse_tracer import get_current_trace, langfuse_trace
+from nodus_adk_runtime.middleware.auth import UserContext
+
+
+class FakeTrace:
+    def __init__(self, name, **kwargs):
+        self.name = name
+        self.kwargs = kwargs
+        self.updates = []
+
+    def update(self, **kwargs):
+        self.updates.append(kwargs)
+
+
+class FakeLangfuse:
+    def __init__(self):
+        self.traces = []
+
+    def trace(self, name, **kwargs):
+        trace = FakeTrace(name, **kwargs)
+        self.traces.append(trace)
+        return trace
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeLangfuse()
+    monkeypatch.setattr(langfuse_tracer, "get_langfuse_client", lambda: fake)
+    return fake
+
+
+def test_trace_is_current_inside_block_only(client):
+    """Test that get_current_trace() returns the trace inside the block and None after"""
+    user_ctx = UserContext(sub="user-1", tenant_id="tenant-1", raw_token="token")
+
+    assert get_current_trace() is None
+    with langfuse_trace("add_message", user_ctx=user_ctx, session_id="s1") as trace:
+        assert get_current_trace() is trace
+    assert get_current_trace() is None
+
+    assert trace.kwargs["user_id"] == "user-1"
+    assert trace.kwargs["session_id"] == "s1"
+    assert trace.updates == [{"output": {"status": "success"}, "status_message": "success"}]
+
+
+def test_exception_ends_trace_as_error_and_resets(client):
+    """Test that a raising block ends the trace as error, re-raises and resets the ContextVar"""
+    with pytest.raises(RuntimeError, match="boom"):
+        with langfuse_trace("create_session"):
+            raise RuntimeError("boom")
+
+    assert get_current_trace() is None
+    (trace,) = client.traces
+    assert trace.updates == [
+        {"output": {"status": "error", "error": "boom"}, "status_message": "boom"}
+    ]
+
+
+def test_nested_blocks_restore_outer_trace(client):
+    """Test that leaving an inner block makes the outer trace current again"""
+    with langfuse_trace("outer") as outer:
+        with langfuse_trace("inner") as inner:
+            assert get_current_trace() is inner
+        assert get_current_trace() is outer
+    assert get_current_trace() is None
+
+
+def test_tracing_disabled_yields_none(monkeypatch):
+    """Test that the block runs untraced when there is no Langfuse client"""
+    monkeypatch.setattr(langfuse_tracer, "get_langfuse_client", lambda: None)
+
+    with langfuse_trace("add_message") as trace:
+        assert trace is None
+        assert get_current_trace() is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_see_their_own_trace(client):
+    """Test that the ContextVar does not leak between concurrent requests"""
+    async def handle(name):
+        with langfuse_trace(name) as trace:
+            await asyncio.sleep(0.01)
+            return get_current_trace() is trace
+
+    assert await asyncio.gather(handle("a"), handle("b"), handle("c")) == [True, True, True]
+    assert get_current_trace() is None
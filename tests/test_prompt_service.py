@@ -0,0 +1,184 @@
+"""
+Tests for PromptService caching
+
+- Concurrent misses (async and threaded) share one Langfuse fetch
+- LRU eviction at max_cache_size
+- get_prompt_config() reuses the cached prompt
+- On-disk snapshot round-trip and its TTL
+"""
+
+import asyncio
+import os
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("langfuse")
+
+from nodus_adk_runtime.services import prompt_service
+from nodus_adk_runtime.services.prompt_service import PromptService
+
+
+class FakeLangfuse:
+    """Langfuse client whose get_prompt() is slow enough for callers to overlap"""
+
+    calls = []
+    delay = 0.05
+
+    def __init__(self, **kwargs):
+        pass
+
+    def get_prompt(self, name, label=None, type=None):
+        FakeLangfuse.calls.append((name, label, threading.get_ident()))
+        time.sleep(FakeLangfuse.delay)
+        if name == "missing":
+            raise RuntimeError("Prompt not found")
+        return types.SimpleNamespace(
+            prompt=f"prompt:{name}:{label}", version=3, config={"model": "gemini", "temperature": 0.2}
+        )
+
+
+@pytest.fixture(autouse=True)
+def fake_langfuse(monkeypatch):
+    monkeypatch.setattr(prompt_service, "Langfuse", FakeLangfuse)
+    monkeypatch.setattr(FakeLangfuse, "calls", [])
+    return FakeLangfuse
+
+
+def _service(**kwargs) -> PromptService:
+    return PromptService("pk", "sk", "http://langfuse", **kwargs)
+
+
+class TestFetchCoalescing:
+    """Test that concurrent misses for one prompt make a single Langfuse call"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_aget_prompt_fetches_once(self):
+        """Test that N awaiting callers share one in-flight fetch"""
+        service = _service()
+
+        results = await asyncio.gather(*(service.aget_prompt("system", "fb") for _ in range(20)))
+
+        assert set(results) == {"prompt:system:production"}
+        assert len(FakeLangfuse.calls) == 1
+        assert service._inflight == {}
+
+    def test_threaded_get_prompt_fetches_once(self):
+        """Test that N threads missing the same prompt make one call"""
+        service = _service()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: service.get_prompt("system", "fb"), range(16)))
+
+        assert set(results) == {"prompt:system:production"}
+        assert len(FakeLangfuse.calls) == 1
+
+    def test_fallback_is_cached(self):
+        """Test that a failed fetch serves and caches the fallback"""
+        service = _service()
+
+        assert service.get_prompt("missing", "fb") == "fb"
+        assert service.get_prompt("missing", "fb") == "fb"
+        assert len(FakeLangfuse.calls) == 1
+        assert service.get_prompt_metadata("missing")["source"] == "fallback"
+
+
+class TestLRUCache:
+    """Test eviction of the least recently used prompts"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that a hit refreshes an entry and the oldest one is evicted"""
+        service = _service(max_cache_size=2)
+
+        service.get_prompt("a", "fb")
+        service.get_prompt("b", "fb")
+        service.get_prompt("a", "fb")  # Hit: "b" becomes the oldest
+        service.get_prompt("c", "fb")
+
+        assert list(service._cache) == [("a", "production"), ("c", "production")]
+        assert [call[0] for call in FakeLangfuse.calls] == ["a", "b", "c"]
+
+    def test_clear_cache_by_name(self):
+        """Test that clear_cache(name) only drops that prompt's labels"""
+        service = _service()
+        service.get_prompt("a", "fb")
+        service.get_prompt("a", "fb", label="staging")
+        service.get_prompt("b", "fb")
+
+        service.clear_cache("a")
+
+        assert list(service._cache) == [("b", "production")]
+        service.clear_cache()
+        assert len(service._cache) == 0
+
+
+class TestPromptConfig:
+    """Test that the prompt and its config come from one fetch"""
+
+    def test_config_after_get_prompt_needs_no_fetch(self):
+        """Test get_prompt() then get_prompt_config() calls Langfuse once"""
+        service = _service()
+
+        service.get_prompt("system", "fb")
+        config = service.get_prompt_config("system")
+
+        assert config == {"model": "gemini", "temperature": 0.2}
+        assert len(FakeLangfuse.calls) == 1
+
+    def test_get_prompt_after_config_needs_no_fetch(self):
+        """Test get_prompt_config() caches the whole prompt for get_prompt()"""
+        service = _service()
+
+        service.get_prompt_config("system")
+        text, config = service.get_prompt_with_config("system", "fb")
+
+        assert text == "prompt:system:production"
+        assert config["model"] == "gemini"
+        assert len(FakeLangfuse.calls) == 1
+
+
+class TestPersistedSnapshot:
+    """Test warming the cache from the on-disk snapshot"""
+
+    def test_round_trip(self, tmp_path):
+        """Test that a new service serves snapshotted prompts without calling Langfuse"""
+        path = tmp_path / "prompts.json"
+        _service(persist_path=str(path)).get_prompt_with_config("system", "fb")
+        _service(persist_path=str(path)).get_prompt("missing", "fb")  # Fallbacks are not persisted
+        FakeLangfuse.calls.clear()
+
+        service = _service(persist_path=str(path))
+
+        assert service.get_prompt_with_config("system", "fb") == (
+            "prompt:system:production",
+            {"model": "gemini", "temperature": 0.2},
+        )
+        assert service.get_prompt_metadata("system")["version"] == 3
+        assert service.get_prompt_metadata("missing") == {"cached": False}
+        assert FakeLangfuse.calls == []
+
+    def test_stale_snapshot_is_ignored(self, tmp_path):
+        """Test that a snapshot older than persist_ttl_seconds does not warm the cache"""
+        path = tmp_path / "prompts.json"
+        _service(persist_path=str(path)).get_prompt("system", "fb")
+        old = time.time() - 120
+        os.utime(path, (old, old))
+        FakeLangfuse.calls.clear()
+
+        service = _service(persist_path=str(path), persist_ttl_seconds=60)
+
+        assert len(service._cache) == 0
+        service.get_prompt("system", "fb")
+        assert len(FakeLangfuse.calls) == 1
+
+    def test_corrupt_snapshot_is_ignored(self, tmp_path):
+        """Test that an unreadable snapshot starts with an empty cache"""
+        path = tmp_path / "prompts.json"
+        path.write_bytes(b"not json")
+
+        service = _service(persist_path=str(path))
+
+        assert len(service._cache) == 0
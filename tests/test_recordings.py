@@ -0,0 +1,451 @@
+"""
+Tests for the recordings API
+
+- POST /complete: 202 + status_url, background job status transitions,
+  error handling (failed job, full queue) and auth before DB access
+- GET /{recording_id}: only the owner's recordings are visible
+- _AgentBatcher: per-user batches that do not block each other
+- save_many_to_database: COPY-based bulk upsert
+
+The asyncpg pool, the S3 client and the backoffice transcription endpoint are faked.
+"""
+
+import asyncio
+import uuid
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, HTTPException
+
+pytest.importorskip("google.adk.runners")
+
+from nodus_adk_runtime.api import recording
+from nodus_adk_runtime.middleware.auth import UserContext
+from nodus_adk_runtime.services import hitl_queues
+
+
+OWNER_SUB = "11111111-1111-1111-1111-111111111111"
+OTHER_SUB = "22222222-2222-2222-2222-222222222222"
+TOKENS = {
+    "owner-token": OWNER_SUB,
+    "other-token": OTHER_SUB,
+    "legacy-token": "legacy-user",  # sub that is not a UUID
+}
+
+
+class FakePool:
+    """In-memory stand-in for the asyncpg pool, modelling the recordings table"""
+
+    def __init__(self):
+        self.rows = {}
+        self.writes = []  # (kind, recording_id, status) in execution order
+        self.fetches = []
+
+    async def execute(self, sql, *args):
+        if "INSERT INTO recordings" in sql:
+            columns = recording.RECORDING_COPY_COLUMNS
+            row = dict(zip(columns, args))
+            self.rows[row["id"]] = row
+            self.writes.append(("upsert", row["id"], row["status"]))
+        elif "UPDATE recordings SET status" in sql:
+            recording_id, status = args
+            self.rows[recording_id]["status"] = status
+            self.writes.append(("update", recording_id, status))
+        else:
+            raise AssertionError(f"Unexpected SQL: {sql}")
+
+    async def fetchrow(self, sql, recording_id, user_id):
+        self.fetches.append((recording_id, user_id))
+        row = self.rows.get(recording_id)
+        if row is None or row["user_id"] != user_id:
+            return None
+        return {**row, "updated_at": None}
+
+
+class FakeS3:
+    """S3 client accepting single-part uploads"""
+
+    def __init__(self):
+        self.objects = {}
+
+    def head_bucket(self, Bucket):
+        return {}
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body
+
+
+@pytest.fixture
+def pool():
+    return FakePool()
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(recording, "_s3_client", fake)
+    return fake
+
+
+@pytest.fixture
+def transcription(monkeypatch):
+    """Backoffice /api/transcribe stub; set status to make it fail"""
+    state = {"status": 200, "text": "Reunión de equipo sobre el lanzamiento del producto en marzo.", "calls": 0}
+
+    def handler(request):
+        state["calls"] += 1
+        return httpx.Response(state["status"], json={"text": state["text"]})
+
+    monkeypatch.setattr(
+        recording, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return state
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """Replace the LLM agent with a canned result"""
+    calls = []
+
+    async def fake_process_with_agent(recording_id, transcript, duration, user_ctx):
+        calls.append(recording_id)
+        return {"summary": "Resumen", "action_items": [], "topics": ["lanzamiento"]}
+
+    monkeypatch.setattr(recording, "process_with_agent", fake_process_with_agent)
+    return calls
+
+
+@pytest.fixture(autouse=True)
+def fake_auth(monkeypatch):
+    async def fake_validate_token(credentials):
+        sub = TOKENS.get(credentials.credentials)
+        if sub is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return UserContext(sub=sub, raw_token=credentials.credentials)
+
+    monkeypatch.setattr(recording, "validate_token", fake_validate_token)
+    monkeypatch.setattr(hitl_queues, "hitl_event_queues", {})
+
+
+@pytest_asyncio.fixture
+async def workers(monkeypatch, pool):
+    """Fresh job queue + one worker, stopped at teardown"""
+    monkeypatch.setattr(recording, "_job_queue", None)
+    monkeypatch.setattr(recording, "_workers", [])
+    monkeypatch.setattr(recording, "_active_jobs", set())
+    await recording.start_recording_workers(pool, count=1)
+    yield
+    await recording.stop_recording_workers(pool)
+
+
+def _client(pool) -> httpx.AsyncClient:
+    app = FastAPI()
+    app.include_router(recording.router)
+    app.state.db_pool = pool
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _complete(client, token="owner-token", recording_id=None, audio=b"audio-bytes", **form):
+    data = {
+        "recording_id": recording_id or str(uuid.uuid4()),
+        "session_id": "33333333-3333-3333-3333-333333333333",
+        "user_id": OWNER_SUB,
+        "recording_type": "audio",
+        "title": "Reunión",
+        "duration_seconds": "60",
+    }
+    data.update(form)
+    files = {"audio": ("rec.webm;codecs=opus", audio, "audio/webm")} if audio is not None else None
+    params = {"token": token} if token else None
+    return await client.post("/api/recordings/complete", data=data, files=files, params=params)
+
+
+class TestRecordingComplete:
+    """Test POST /api/recordings/complete and the background job"""
+
+    @pytest.mark.asyncio
+    async def test_returns_202_with_status_url(self, pool, s3, transcription, agent, workers):
+        """Test that /complete answers 202 with the recording id and its status URL"""
+        recording_id = str(uuid.uuid4())
+        async with _client(pool) as client:
+            response = await _complete(client, recording_id=recording_id)
+
+        assert response.status_code == 202
+        assert response.json() == {
+            "status": "pending",
+            "recording_id": recording_id,
+            "status_url": f"/api/recordings/{recording_id}",
+        }
+        assert s3.objects == {f"recordings/{recording_id}/rec.webm": b"audio-bytes"}
+
+    @pytest.mark.asyncio
+    async def test_status_transitions_in_order(self, pool, s3, transcription, agent, workers):
+        """Test the row goes pending -> transcribing -> processing -> done, then notifies via SSE"""
+        recording_id = str(uuid.uuid4())
+        async with _client(pool) as client:
+            await _complete(client, recording_id=recording_id)
+        await recording._job_queue.join()
+
+        assert pool.writes == [
+            ("upsert", recording_id, "pending"),
+            ("update", recording_id, "transcribing"),
+            ("update", recording_id, "processing"),
+            ("upsert", recording_id, "done"),
+        ]
+        row = pool.rows[recording_id]
+        assert row["transcript"] == transcription["text"]
+        assert row["summary"] == "Resumen"
+        assert agent == [recording_id]
+
+        ring = hitl_queues.get_user_queue(OWNER_SUB).subscribe()
+        frame = await asyncio.wait_for(ring.get(), timeout=1.0)
+        assert frame.startswith(b"event: recording_complete\r\n")
+
+    @pytest.mark.asyncio
+    async def test_ids_are_normalized_once(self, pool, s3, transcription, agent, workers):
+        """Test that non-UUID form ids map to one stable id and the owner is the token sub"""
+        async with _client(pool) as client:
+            response = await _complete(
+                client, recording_id="rec-1", session_id="session-1", user_id="form-user"
+            )
+        await recording._job_queue.join()
+
+        recording_id = response.json()["recording_id"]
+        assert recording._UUID_RE.match(recording_id)
+        assert {write[1] for write in pool.writes} == {recording_id}
+
+        row = pool.rows[recording_id]
+        assert row["user_id"] == OWNER_SUB
+        assert recording._UUID_RE.match(row["session_id"])
+        upserts = [write for write in pool.writes if write[0] == "upsert"]
+        assert len(upserts) == 2  # pending + done; the session id did not change in between
+
+    @pytest.mark.asyncio
+    async def test_failed_job_is_marked_error(self, pool, s3, transcription, agent, workers):
+        """Test that an exception in the job marks the recording as error"""
+        transcription["status"] = 500
+        recording_id = str(uuid.uuid4())
+        async with _client(pool) as client:
+            await _complete(client, recording_id=recording_id)
+        await recording._job_queue.join()
+
+        assert pool.writes[-1] == ("upsert", recording_id, "error")
+        assert pool.rows[recording_id]["status"] == "error"
+        assert agent == []
+
+    @pytest.mark.asyncio
+    async def test_full_queue_returns_503_and_marks_error(self, monkeypatch, pool, s3, transcription, agent):
+        """Test that a full job queue rejects the upload and does not leave it pending"""
+        monkeypatch.setattr(recording, "_job_queue", asyncio.Queue(maxsize=1))
+        recording._job_queue.put_nowait(object())  # No workers: stays full
+        recording_id = str(uuid.uuid4())
+
+        async with _client(pool) as client:
+            response = await _complete(client, recording_id=recording_id)
+
+        assert response.status_code == 503
+        assert pool.writes == [
+            ("upsert", recording_id, "pending"),
+            ("upsert", recording_id, "error"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_unauthenticated_is_401_before_db(self):
+        """Test that a missing token is a 401 even when the database is unavailable"""
+        async with _client(None) as client:
+            response = await _complete(client, token=None)
+
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_authenticated_without_db_is_503(self):
+        """Test that an authenticated upload gets 503 when there is no database pool"""
+        async with _client(None) as client:
+            response = await _complete(client)
+
+        assert response.status_code == 503
+
+
+class TestRecordingStatus:
+    """Test GET /api/recordings/{recording_id}"""
+
+    @pytest.fixture
+    def stored(self, pool):
+        recording_id = str(uuid.uuid4())
+        pool.rows[recording_id] = {
+            "id": recording_id,
+            "user_id": OWNER_SUB,
+            "status": "done",
+            "title": "Reunión",
+            "transcript": None,
+            "summary": "Resumen",
+            "action_items": [],
+            "topics": ["lanzamiento"],
+        }
+        return recording_id
+
+    @pytest.mark.asyncio
+    async def test_owner_gets_their_recording(self, pool, stored):
+        """Test that the owner reads status and results"""
+        async with _client(pool) as client:
+            response = await client.get(f"/api/recordings/{stored}", params={"token": "owner-token"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["recording_id"] == stored
+        assert body["status"] == "done"
+        assert body["summary"] == "Resumen"
+        assert body["topics"] == ["lanzamiento"]
+
+    @pytest.mark.asyncio
+    async def test_other_user_gets_404(self, pool, stored):
+        """Test that another user's recording looks like a missing one"""
+        async with _client(pool) as client:
+            response = await client.get(f"/api/recordings/{stored}", params={"token": "other-token"})
+
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_invalid_ids_get_404_without_query(self, pool, stored):
+        """Test that non-UUID recording ids and subs are rejected without a DB lookup"""
+        async with _client(pool) as client:
+            bad_id = await client.get("/api/recordings/not-a-uuid", params={"token": "owner-token"})
+            legacy = await client.get(f"/api/recordings/{stored}", params={"token": "legacy-token"})
+
+        assert bad_id.status_code == 404
+        assert legacy.status_code == 404
+        assert pool.fetches == []
+
+
+class TestAgentBatcher:
+    """Test grouping of agent prompts into per-user batches"""
+
+    @pytest.fixture
+    def fake_agent_runtime(self, monkeypatch):
+        builds = []
+        delays = {}
+
+        async def fake_get_agent_for_user(user_ctx):
+            builds.append(user_ctx.sub)
+            return object(), object()
+
+        async def fake_run_agent_prompt(runner, recording_id, prompt, user_ctx):
+            await asyncio.sleep(delays.get(user_ctx.sub, 0))
+            return f"{user_ctx.sub}:{prompt}"
+
+        monkeypatch.setattr(recording, "_get_agent_for_user", fake_get_agent_for_user)
+        monkeypatch.setattr(recording, "_run_agent_prompt", fake_run_agent_prompt)
+        monkeypatch.setattr(recording, "Runner", lambda **kwargs: object())
+        monkeypatch.setattr(recording, "get_session_service", lambda: None)
+        return builds, delays
+
+    @pytest.mark.asyncio
+    async def test_same_user_prompts_share_one_agent(self, fake_agent_runtime):
+        """Test that prompts arriving within the window are answered by one agent build"""
+        builds, _ = fake_agent_runtime
+        batcher = recording._AgentBatcher(window=0.05)
+        user_ctx = UserContext(sub=OWNER_SUB, raw_token="owner-token")
+
+        try:
+            results = await asyncio.gather(
+                *(batcher.submit(f"rec-{i}", f"p{i}", user_ctx) for i in range(3))
+            )
+        finally:
+            await batcher.stop()
+
+        assert results == [f"{OWNER_SUB}:p{i}" for i in range(3)]
+        assert builds == [OWNER_SUB]
+
+    @pytest.mark.asyncio
+    async def test_slow_batch_does_not_block_other_users(self, fake_agent_runtime):
+        """Test that a long-running batch does not hold back prompts submitted later"""
+        _, delays = fake_agent_runtime
+        delays[OWNER_SUB] = 10
+        batcher = recording._AgentBatcher(window=0.01)
+        slow = asyncio.create_task(
+            batcher.submit("rec-slow", "p", UserContext(sub=OWNER_SUB, raw_token="owner-token"))
+        )
+
+        try:
+            await asyncio.sleep(0.05)
+            fast = await asyncio.wait_for(
+                batcher.submit("rec-fast", "p", UserContext(sub=OWNER_SUB.replace("1", "3"), raw_token="t")),
+                timeout=1.0,
+            )
+            assert fast.endswith(":p")
+        finally:
+            await batcher.stop()
+
+        with pytest.raises(asyncio.CancelledError):
+            await slow
+
+
+class TestSaveManyToDatabase:
+    """Test the COPY-based bulk upsert"""
+
+    class FakeConnection:
+        def __init__(self, log):
+            self.log = log
+
+        async def execute(self, sql):
+            self.log.append(("execute", " ".join(sql.split())[:40]))
+
+        async def copy_records_to_table(self, table, records, columns):
+            self.log.append(("copy", table, records, columns))
+
+        def transaction(self):
+            log = self.log
+
+            class Transaction:
+                async def __aenter__(self):
+                    log.append(("begin",))
+
+                async def __aexit__(self, *exc_info):
+                    log.append(("commit",) if exc_info[0] is None else ("rollback",))
+
+            return Transaction()
+
+    class FakeCopyPool:
+        def __init__(self):
+            self.log = []
+
+        def acquire(self):
+            conn = TestSaveManyToDatabase.FakeConnection(self.log)
+
+            class Acquire:
+                async def __aenter__(self):
+                    return conn
+
+                async def __aexit__(self, *exc_info):
+                    return False
+
+            return Acquire()
+
+    @pytest.mark.asyncio
+    async def test_rows_are_copied_then_upserted(self):
+        """Test that rows go through COPY into the temp table and one upsert, in a transaction"""
+        pool = self.FakeCopyPool()
+        row = (
+            str(uuid.uuid4()), str(uuid.uuid4()), OWNER_SUB, "Reunión", "audio",
+            60, None, "texto", "Resumen", [{"task": "x"}], ["tema"], "done",
+        )
+
+        assert await recording.save_many_to_database(pool, [row]) == 1
+
+        kinds = [entry[0] for entry in pool.log]
+        assert kinds == ["begin", "execute", "copy", "execute", "commit"]
+        _, table, records, columns = pool.log[2]
+        assert table == "_recordings_import"
+        assert columns == recording.RECORDING_COPY_COLUMNS
+        assert records[0][9] == '[{"task":"x"}]'
+        assert records[0][10] == '["tema"]'
+        assert pool.log[3][1].startswith("INSERT INTO recordings")
+
+    @pytest.mark.asyncio
+    async def test_empty_batch_skips_database(self):
+        """Test that no connection is used for an empty batch"""
+        pool = self.FakeCopyPool()
+
+        assert await recording.save_many_to_database(pool, []) == 0
+        assert pool.log == []